@@ -0,0 +1,33 @@
+"""Archive cache index
+
+Revision ID: 4135f7114c81
+Revises: 9e2609adbaaf
+Create Date: 2026-10-17 14:22:51.094617
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4135f7114c81'
+down_revision = '9e2609adbaaf'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('archive_cache',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('url', sa.Text(), nullable=False, index=True),
+        sa.Column('build', sa.String(16), nullable=True),
+        sa.Column('sha256', sa.String(64), nullable=False, index=True),
+        sa.Column('path', sa.Text(), nullable=False),
+        sa.Column('size', sa.BigInteger, nullable=False),
+        sa.Column('added_on', sa.DateTime, nullable=False),
+        sa.Column('last_used', sa.DateTime, nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('archive_cache')
@@ -0,0 +1,33 @@
+"""Executable identity cache
+
+Revision ID: 8c1d3b6e02fa
+Revises: 402ce1583e3f
+Create Date: 2026-10-17 09:12:40.318204
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8c1d3b6e02fa'
+down_revision = '402ce1583e3f'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('exe_identity',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('path', sa.Text(), nullable=False, index=True),
+        sa.Column('size', sa.BigInteger, nullable=False),
+        sa.Column('mtime_ns', sa.BigInteger, nullable=False),
+        sa.Column('file_id', sa.String(64), nullable=False),
+        sa.Column('sha256', sa.String(64), nullable=False),
+        sa.Column('version', sa.String(32), nullable=False),
+        sa.Column('identified_on', sa.DateTime, nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('exe_identity')
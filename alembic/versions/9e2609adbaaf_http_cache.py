@@ -0,0 +1,31 @@
+"""HTTP response cache
+
+Revision ID: 9e2609adbaaf
+Revises: 8c1d3b6e02fa
+Create Date: 2026-10-17 11:04:27.561930
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '9e2609adbaaf'
+down_revision = '8c1d3b6e02fa'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('http_cache',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('url', sa.Text(), nullable=False, index=True),
+        sa.Column('etag', sa.Text(), nullable=True),
+        sa.Column('last_modified', sa.Text(), nullable=True),
+        sa.Column('body', sa.LargeBinary(), nullable=False),
+        sa.Column('fetched_on', sa.DateTime, nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('http_cache')
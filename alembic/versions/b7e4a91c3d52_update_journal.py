@@ -0,0 +1,45 @@
+"""Update journal
+
+Revision ID: b7e4a91c3d52
+Revises: 4135f7114c81
+Create Date: 2026-10-17 18:05:12.537940
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'b7e4a91c3d52'
+down_revision = '4135f7114c81'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('update_journal',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('game_dir', sa.Text(), nullable=False),
+        sa.Column('url', sa.Text(), nullable=False),
+        sa.Column('build', sa.String(16), nullable=True),
+        sa.Column('build_date', sa.DateTime, nullable=True),
+        sa.Column('archive_path', sa.Text(), nullable=False),
+        sa.Column('delta', sa.Boolean, nullable=False),
+        sa.Column('stage', sa.String(32), nullable=False),
+        sa.Column('staging_dir', sa.Text(), nullable=True),
+        sa.Column('old_dir', sa.Text(), nullable=True),
+        sa.Column('copying_dir', sa.Text(), nullable=True),
+        sa.Column('started_on', sa.DateTime, nullable=False),
+        sa.Column('updated_on', sa.DateTime, nullable=False),
+    )
+    op.create_table('update_journal_member',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('journal', sa.Integer, sa.ForeignKey('update_journal.id'),
+            nullable=False, index=True),
+        sa.Column('name', sa.Text(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('update_journal_member')
+    op.drop_table('update_journal')
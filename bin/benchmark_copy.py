@@ -0,0 +1,116 @@
+# Measure the directory tree copy used when updating the game. The threaded
+# TreeCopy of the engine is compared with the previous copy, which moved one
+# 16 KiB buffer per timer tick on the GUI thread.
+#
+# Usage: python bin/benchmark_copy.py [WORK_DIR] [RUNS]
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(basedir)
+
+from PyQt5.QtCore import QCoreApplication, QTimer
+
+from cddagl.engine import TreeCopy, READ_BUFFER_SIZE
+
+TREES = (
+    ('5000 files x 4 KiB', 5000, 4 * 1024),
+    ('4 files x 64 MiB', 4, 64 * 1024 * 1024)
+)
+
+
+def make_tree(path, count, size):
+    os.makedirs(path)
+    for index in range(count):
+        directory = os.path.join(path, 'dir{0}'.format(index // 500))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(os.path.join(directory, 'file{0}'.format(index)),
+            'wb') as f:
+            f.write(os.urandom(size))
+
+def timer_copy(app, src, dst):
+    files = []
+    for root, dirs, filenames in os.walk(src):
+        for filename in filenames:
+            files.append(os.path.relpath(os.path.join(root, filename), src))
+
+    state = {'source': None, 'target': None}
+
+    def timeout():
+        if state['source'] is None:
+            if len(files) == 0:
+                timer.stop()
+                app.quit()
+                return
+
+            relpath = files.pop()
+            target_dir = os.path.dirname(os.path.join(dst, relpath))
+            if not os.path.isdir(target_dir):
+                os.makedirs(target_dir)
+            state['source'] = open(os.path.join(src, relpath), 'rb')
+            state['target'] = open(os.path.join(dst, relpath), 'wb')
+
+        buf = state['source'].read(READ_BUFFER_SIZE)
+        if len(buf) == 0:
+            state['source'].close()
+            state['target'].close()
+            state['source'] = None
+        else:
+            state['target'].write(buf)
+
+    timer = QTimer()
+    timer.timeout.connect(timeout)
+    timer.start(0)
+    app.exec_()
+
+def worker_copy(app, src, dst):
+    TreeCopy(src, dst).run()
+
+def tree_size(path):
+    size = 0
+    for root, dirs, filenames in os.walk(path):
+        for filename in filenames:
+            size += os.path.getsize(os.path.join(root, filename))
+    return size
+
+def main():
+    work_dir = tempfile.mkdtemp(dir=sys.argv[1] if len(sys.argv) > 1
+        else None)
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    app = QCoreApplication(sys.argv)
+
+    try:
+        for label, count, size in TREES:
+            src = os.path.join(work_dir, 'src')
+            dst = os.path.join(work_dir, 'dst')
+            make_tree(src, count, size)
+            total_size = tree_size(src)
+
+            for name, copy in (('old', timer_copy), ('new', worker_copy)):
+                speeds = []
+                for run in range(runs):
+                    started = time.perf_counter()
+                    copy(app, src, dst)
+                    elapsed = time.perf_counter() - started
+
+                    if tree_size(dst) != total_size:
+                        raise RuntimeError('Incomplete copy')
+                    shutil.rmtree(dst)
+
+                    speeds.append(total_size / elapsed / 1000000)
+
+                print('{0}: {1} {2:.1f}-{3:.1f} MB/s'.format(label, name,
+                    min(speeds), max(speeds)))
+
+            shutil.rmtree(src)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+# Measure the download of a game build. A local HTTP server supporting range
+# requests serves a random archive with a limited rate per connection, like
+# the build mirrors do. A single stream download is compared with a download
+# split in segments, each on its own connection. Both downloads are also
+# interrupted half way and resumed to check that only the missing part is
+# fetched again.
+#
+# Usage: python bin/benchmark_download.py [WORK_DIR] [RUNS] [CONNECTIONS]
+
+import os
+import re
+import sys
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(basedir)
+
+from cddagl.downloads import (
+    download_file, DownloadCancelled, DOWNLOAD_BUFFER_SIZE)
+
+ARCHIVE_SIZE = 64 * 1024 * 1024
+# Bytes per second and per connection sent by the local server
+CONNECTION_RATE = 8 * 1024 * 1024
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return None
+
+        f = open(path, 'rb')
+        size = os.fstat(f.fileno()).st_size
+        etag = '"{0:x}-{1:x}"'.format(size, int(os.path.getmtime(path)))
+
+        start = 0
+        end = size - 1
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        match = None
+        if range_header is not None and if_range in (None, etag):
+            match = re.match(r'bytes=(\d+)-(\d*)$', range_header)
+
+        if match is not None:
+            start = int(match.group(1))
+            if match.group(2) != '':
+                end = min(int(match.group(2)), size - 1)
+            if start >= size:
+                f.close()
+                self.send_response(416)
+                self.send_header('Content-Range', 'bytes */{0}'.format(size))
+                self.end_headers()
+                return None
+
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {0}-{1}/{2}'.format(
+                start, end, size))
+        else:
+            self.send_response(200)
+
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', etag)
+        self.end_headers()
+
+        f.seek(start)
+        self.remaining = end - start + 1
+        return f
+
+    def copyfile(self, source, outputfile):
+        started = time.perf_counter()
+        sent = 0
+        while self.remaining > 0:
+            data = source.read(min(DOWNLOAD_BUFFER_SIZE, self.remaining))
+            if len(data) == 0:
+                break
+            outputfile.write(data)
+            self.remaining -= len(data)
+
+            sent += len(data)
+            self.server.add_sent(len(data))
+
+            delay = sent / CONNECTION_RATE - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+
+class ArchiveServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, directory):
+        self.sent = 0
+        self.lock = threading.Lock()
+
+        def handler(*args, **kwargs):
+            return RangeRequestHandler(*args, directory=directory, **kwargs)
+
+        super(ArchiveServer, self).__init__(('127.0.0.1', 0), handler)
+
+    def handle_error(self, request, client_address):
+        # Cancelled downloads close their connections while data is sent
+        pass
+
+    def add_sent(self, count):
+        with self.lock:
+            self.sent += count
+
+    def url(self, filename):
+        return 'http://127.0.0.1:{0}/{1}'.format(self.server_address[1],
+            filename)
+
+
+def file_hash(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(1024 * 1024)
+            if len(data) == 0:
+                break
+            sha256.update(data)
+    return sha256.hexdigest()
+
+def timed_download(url, path, connections):
+    started = time.perf_counter()
+    download_file(url, path, connections)
+    return time.perf_counter() - started
+
+def interrupted_download(server, url, path, connections):
+    # Stop when half of the archive was received, then resume
+    state = {'done': 0}
+
+    def progress(done, total):
+        state['done'] = done
+
+    def cancelled():
+        return state['done'] >= ARCHIVE_SIZE // 2
+
+    try:
+        download_file(url, path, connections, progress, cancelled)
+    except DownloadCancelled:
+        pass
+    else:
+        raise RuntimeError('Download was not interrupted')
+
+    sent = server.sent
+    elapsed = timed_download(url, path, connections)
+    return elapsed, server.sent - sent
+
+def main():
+    work_dir = tempfile.mkdtemp(dir=sys.argv[1] if len(sys.argv) > 1
+        else None)
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    connections = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    serve_dir = os.path.join(work_dir, 'serve')
+    download_dir = os.path.join(work_dir, 'download')
+    os.makedirs(serve_dir)
+
+    archive = os.path.join(serve_dir, 'cataclysmdda.zip')
+    with open(archive, 'wb') as f:
+        for index in range(ARCHIVE_SIZE // (1024 * 1024)):
+            f.write(os.urandom(1024 * 1024))
+    archive_hash = file_hash(archive)
+
+    server = ArchiveServer(serve_dir)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    url = server.url('cataclysmdda.zip')
+    path = os.path.join(download_dir, 'cataclysmdda.zip')
+
+    try:
+        for name, count in (('single', 1),
+            ('{0} segments'.format(connections), connections)):
+            speeds = []
+            for run in range(runs):
+                os.makedirs(download_dir)
+                elapsed = timed_download(url, path, count)
+
+                if file_hash(path) != archive_hash:
+                    raise RuntimeError('Corrupted download')
+                shutil.rmtree(download_dir)
+
+                speeds.append(ARCHIVE_SIZE / elapsed / 1000000)
+
+            print('{0} MiB: {1} {2:.1f}-{3:.1f} MB/s'.format(
+                ARCHIVE_SIZE // (1024 * 1024), name, min(speeds),
+                max(speeds)))
+
+        for name, count in (('single', 1),
+            ('{0} segments'.format(connections), connections)):
+            os.makedirs(download_dir)
+            elapsed, sent = interrupted_download(server, url, path, count)
+
+            if file_hash(path) != archive_hash:
+                raise RuntimeError('Corrupted download')
+            shutil.rmtree(download_dir)
+
+            print('Resumed {0}: {1:.1f} MiB fetched again in {2:.2f} '
+                's'.format(name, sent / (1024 * 1024), elapsed))
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# Measure the extraction of a game build. A synthetic archive shaped like a
+# build, with many small data files and a few large ones, is extracted with
+# the BuildExtractor of the engine and with the previous extraction, which
+# called ZipFile.extract for one member at a time. The engine extraction is
+# also measured when most members did not change since the previous version
+# and are linked from it.
+#
+# Usage: python bin/benchmark_extract.py [WORK_DIR] [RUNS]
+
+import os
+import sys
+import time
+import random
+import shutil
+import zipfile
+import tempfile
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(basedir)
+
+from cddagl.engine import BuildExtractor
+
+SMALL_FILES = 5000
+SMALL_FILE_SIZE = 8 * 1024
+LARGE_FILES = 4
+LARGE_FILE_SIZE = 16 * 1024 * 1024
+# Share of the members that did not change since the previous version
+UNCHANGED_RATIO = 0.9
+
+WORDS = [b'monster', b'item', b'id', b'name', b'description', b'volume',
+    b'weight', b'color', b'symbol', b'material', b'flags', b'"type":']
+
+
+def member_data(size):
+    # Text a little like the json data of the game so that it compresses
+    data = bytearray()
+    while len(data) < size:
+        data += random.choice(WORDS) + b' ' + str(random.randrange(
+            100000)).encode() + b'\n'
+    return bytes(data[:size])
+
+def make_archive(path):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        for index in range(SMALL_FILES):
+            name = 'cataclysmdda/data/json/dir{0}/file{1}.json'.format(
+                index // 250, index)
+            z.writestr(name, member_data(SMALL_FILE_SIZE))
+        for index in range(LARGE_FILES):
+            name = 'cataclysmdda/gfx/tileset{0}.png'.format(index)
+            z.writestr(name, os.urandom(LARGE_FILE_SIZE),
+                zipfile.ZIP_STORED)
+
+def serial_extract(archive, target_dir, previous_dir):
+    with zipfile.ZipFile(archive) as z:
+        for info in z.infolist():
+            z.extract(info, target_dir)
+
+def engine_extract(archive, target_dir, previous_dir, unchanged=frozenset()):
+    with zipfile.ZipFile(archive) as z:
+        infolist = z.infolist()
+
+    extractor = BuildExtractor(lambda: zipfile.ZipFile(archive), infolist,
+        target_dir, unchanged, previous_dir)
+    extractor.run()
+
+def unchanged_extract(archive, target_dir, previous_dir):
+    with zipfile.ZipFile(archive) as z:
+        names = [info.filename for info in z.infolist()
+            if not info.is_dir()]
+
+    count = int(len(names) * UNCHANGED_RATIO)
+    unchanged = frozenset(random.Random(0).sample(names, count))
+    engine_extract(archive, target_dir, previous_dir, unchanged)
+
+def tree_size(path):
+    size = 0
+    for root, dirs, filenames in os.walk(path):
+        for filename in filenames:
+            size += os.path.getsize(os.path.join(root, filename))
+    return size
+
+def main():
+    work_dir = tempfile.mkdtemp(dir=sys.argv[1] if len(sys.argv) > 1
+        else None)
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    try:
+        archive = os.path.join(work_dir, 'cataclysmdda.zip')
+        make_archive(archive)
+        with zipfile.ZipFile(archive) as z:
+            total_size = sum(info.file_size for info in z.infolist())
+
+        previous_dir = os.path.join(work_dir, 'previous')
+        serial_extract(archive, previous_dir, None)
+
+        target_dir = os.path.join(work_dir, 'target')
+        for name, extract in (('old', serial_extract), ('new', engine_extract),
+            ('new with unchanged', unchanged_extract)):
+            times = []
+            for run in range(runs):
+                started = time.perf_counter()
+                extract(archive, target_dir, previous_dir)
+                elapsed = time.perf_counter() - started
+
+                if tree_size(target_dir) != total_size:
+                    raise RuntimeError('Incomplete extraction')
+                shutil.rmtree(target_dir)
+
+                times.append(elapsed)
+
+            print('{0} files: {1} {2:.2f}-{3:.2f} s'.format(
+                SMALL_FILES + LARGE_FILES, name, min(times), max(times)))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# Measure the parsing of the build listing page. The incremental
+# BuildListingParser of the engine is compared with the previous parser,
+# which built an html5lib tree of the whole page once the reply finished and
+# searched it with cssselect. The listing is fed in network sized chunks to
+# also show the longest time spent in a single call on the GUI thread.
+#
+# Usage: python bin/benchmark_listing.py [LISTING] [RUNS]
+
+import os
+import re
+import sys
+import time
+
+from io import BytesIO
+from datetime import datetime
+from urllib.parse import urljoin
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(basedir)
+
+import html5lib
+
+from cddagl.engine import BASE_URLS, BuildListingParser
+
+LISTING = os.path.join(basedir, 'bin', 'fixtures', 'build_listing.html')
+CHUNK_SIZE = 16 * 1024
+
+
+def html5lib_parse(html_file, base_url):
+    document = html5lib.parse(html_file, treebuilder='lxml',
+        transport_encoding='utf8', namespaceHTMLElements=False)
+
+    builds = []
+    for row in document.getroot().cssselect('tr'):
+        build = {}
+        for index, cell in enumerate(row.cssselect('td')):
+            if index == 1:
+                if len(cell) > 0 and cell[0].text.startswith(
+                    'cataclysmdda'):
+                    anchor = cell[0]
+                    url = urljoin(base_url, anchor.get('href'))
+                    name = anchor.text
+
+                    build_number = None
+                    match = re.search(
+                        'cataclysmdda-[01]\\.[A-F]-(?P<build>\d+)', name)
+                    if match is not None:
+                        build_number = match.group('build')
+
+                    build['url'] = url
+                    build['name'] = name
+                    build['number'] = build_number
+            elif index == 2:
+                # build date
+                str_date = cell.text.strip()
+                if str_date != '':
+                    build_date = datetime.strptime(str_date,
+                        '%Y-%m-%d %H:%M')
+                    build['date'] = build_date
+
+        if 'url' in build:
+            builds.append(build)
+
+    builds.reverse()
+    return builds
+
+def old_parse(data, base_url):
+    # The whole page was parsed in the finished handler
+    started = time.perf_counter()
+    builds = html5lib_parse(BytesIO(data), base_url)
+    elapsed = time.perf_counter() - started
+    return builds, elapsed, elapsed
+
+def new_parse(data, base_url):
+    parser = BuildListingParser(base_url)
+    longest = 0
+    started = time.perf_counter()
+    for offset in range(0, len(data), CHUNK_SIZE):
+        call_started = time.perf_counter()
+        parser.feed(data[offset:offset + CHUNK_SIZE])
+        longest = max(longest, time.perf_counter() - call_started)
+
+    call_started = time.perf_counter()
+    builds = parser.close()
+    finished = time.perf_counter()
+    longest = max(longest, finished - call_started)
+    return builds, finished - started, longest
+
+def main():
+    listing = sys.argv[1] if len(sys.argv) > 1 else LISTING
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with open(listing, 'rb') as f:
+        data = f.read()
+    base_url = BASE_URLS['Tiles']['x64']
+
+    results = {}
+    for name, parse in (('old', old_parse), ('new', new_parse)):
+        totals = []
+        longests = []
+        for run in range(runs):
+            builds, total, longest = parse(data, base_url)
+            totals.append(total * 1000)
+            longests.append(longest * 1000)
+        results[name] = builds
+
+        print('{0} builds: {1} {2:.1f}-{3:.1f} ms total, {4:.1f} ms longest '
+            'call'.format(len(builds), name, min(totals), max(totals),
+            max(longests)))
+
+    if results['old'] != results['new']:
+        raise RuntimeError('Parsers found different builds')
+
+if __name__ == '__main__':
+    main()
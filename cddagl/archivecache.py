@@ -0,0 +1,148 @@
+import os
+import shutil
+import hashlib
+
+from cddagl.config import (
+    get_config_value, config_true, get_archive_cache_entry,
+    get_archive_cache_entries, set_archive_cache_entry,
+    touch_archive_cache_entry, delete_archive_cache_entries)
+
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+def cache_directory():
+    if not config_true(get_config_value('keep_archive_copy', 'False')):
+        return None
+
+    archive_dir = get_config_value('archive_directory', '')
+    if not os.path.isdir(archive_dir):
+        return None
+
+    return archive_dir
+
+def cache_size_limit():
+    # The limit is stored in MiB, 0 means no limit
+    try:
+        limit = int(get_config_value('archive_cache_size', '0'))
+    except (TypeError, ValueError):
+        return 0
+    return limit * 1024 * 1024
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(READ_BUFFER_SIZE)
+            if len(data) == 0:
+                break
+            sha256.update(data)
+    return sha256.hexdigest()
+
+def link_or_copy(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+def fetch_cached_archive(url, destination):
+    # Place a cached copy of the archive for url at destination. Returns True
+    # if the archive was found in the cache.
+    if cache_directory() is None:
+        return False
+
+    entry = get_archive_cache_entry(url=url)
+    if entry is None:
+        return False
+
+    path = entry['path']
+    if not os.path.isfile(path) or os.path.getsize(path) != entry['size']:
+        delete_archive_cache_entries(path)
+        return False
+
+    # The file could have been changed without changing its size
+    if file_sha256(path) != entry['sha256']:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        delete_archive_cache_entries(path)
+        return False
+
+    if os.path.exists(destination):
+        os.remove(destination)
+    link_or_copy(path, destination)
+
+    touch_archive_cache_entry(entry['id'])
+
+    return True
+
+def store_archive(path, url, build=None):
+    # Move a downloaded archive into the cache. Archives are indexed by their
+    # sha256 so the same file downloaded from different urls is only kept
+    # once.
+    archive_dir = cache_directory()
+    if archive_dir is None:
+        return False
+
+    sha256 = file_sha256(path)
+    size = os.path.getsize(path)
+
+    existing = get_archive_cache_entry(sha256=sha256)
+    if existing is not None and os.path.isfile(existing['path']):
+        cache_path = existing['path']
+    else:
+        cache_path = os.path.join(archive_dir, '{0}-{1}'.format(sha256[:16],
+            os.path.basename(path)))
+        if not os.path.exists(cache_path):
+            shutil.move(path, cache_path)
+
+    set_archive_cache_entry(url, build, sha256, cache_path, size)
+
+    evict_archives(keep=cache_path)
+
+    return True
+
+def evict_archives(keep=None):
+    limit = cache_size_limit()
+    if limit <= 0:
+        return
+
+    # Entries are sorted from the least recently used. Many entries can
+    # point to the same file.
+    paths = []
+    sizes = {}
+    for entry in get_archive_cache_entries():
+        if entry['path'] in sizes:
+            paths.remove(entry['path'])
+        sizes[entry['path']] = entry['size']
+        paths.append(entry['path'])
+
+    total_size = sum(sizes.values())
+    for path in paths:
+        if total_size <= limit:
+            break
+        if path == keep:
+            continue
+
+        try:
+            if os.path.isfile(path):
+                os.remove(path)
+        except OSError:
+            continue
+
+        delete_archive_cache_entries(path)
+        total_size -= sizes[path]
+
+def discard_cached_archive(url):
+    # Remove a cached archive that turned out to be invalid
+    entry = get_archive_cache_entry(url=url)
+    if entry is None:
+        return
+
+    try:
+        if os.path.isfile(entry['path']):
+            os.remove(entry['path'])
+    except OSError:
+        pass
+
+    delete_archive_cache_entries(entry['path'])
@@ -0,0 +1,678 @@
+import os
+import json
+import zlib
+import shutil
+import hashlib
+import tempfile
+import threading
+import zipfile
+
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from cddagl.zipdelta import member_target
+from cddagl.zipwriter import (
+    COMPRESS_WORKERS, COMPRESS_BUFFER_SIZE, DEFAULT_CODEC, ZIP_STORED,
+    ZIP_DEFLATED, ZIP_BZIP2, ZIP_LZMA, ZIP_ZSTANDARD, DEFLATE_MAX_FLAG,
+    DEFLATE_FAST_FLAG, LOCAL_HEADER, LOCAL_HEADER_SIGNATURE, zstandard,
+    CompressionCancelled, compress_files)
+
+# Incremental backups are small manifests listing the files of the save
+# directory. The content of each file is stored once, compressed and named
+# by its sha256, in a store shared by all the incremental backups.
+
+WORLD_FILES = set(('worldoptions.json', 'worldoptions.txt', 'master.gsav'))
+
+MANIFEST_EXT = '.backup'
+BACKUP_EXTENSIONS = ('.zip', MANIFEST_EXT)
+MANIFEST_FORMAT = 1
+
+STORE_DIR_NAME = '.store'
+OBJECTS_DIR_NAME = 'objects'
+TEMP_DIR_NAME = 'tmp'
+
+# Members are restored in batches of at most this many files or bytes
+RESTORE_BATCH_FILES = 256
+RESTORE_BATCH_SIZE = 16 * 1024 * 1024
+
+# Metadata of the backups so they do not have to be opened each time they
+# are listed
+INDEX_NAME = '.index.json'
+INDEX_FORMAT = 2
+
+METHOD_CODECS = {
+    ZIP_STORED: 'store',
+    ZIP_BZIP2: 'bzip2',
+    ZIP_LZMA: 'lzma',
+    ZIP_ZSTANDARD: 'zstd'
+}
+
+
+class BadBackupFile(zipfile.BadZipFile): pass
+
+
+class BackupEntry(object):
+    def __init__(self, filename, sha256, file_size, mtime_ns, compress_size):
+        self.filename = filename
+        self.sha256 = sha256
+        self.file_size = file_size
+        self.mtime_ns = mtime_ns
+        self.compress_size = compress_size
+
+    def is_dir(self):
+        return False
+
+
+def is_incremental(path):
+    return path.lower().endswith(MANIFEST_EXT)
+
+def store_directory(backup_dir):
+    return os.path.join(backup_dir, STORE_DIR_NAME)
+
+def object_path(store_dir, sha256):
+    return os.path.join(store_dir, OBJECTS_DIR_NAME, sha256[:2], sha256)
+
+def read_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf8') as f:
+            manifest = json.load(f)
+    except ValueError as e:
+        raise BadBackupFile(str(e))
+
+    if (not isinstance(manifest, dict)
+        or manifest.get('format') != MANIFEST_FORMAT
+        or not isinstance(manifest.get('files'), list)):
+        raise BadBackupFile('Invalid backup manifest')
+
+    try:
+        return [BackupEntry(*values) for values in manifest['files']]
+    except TypeError as e:
+        raise BadBackupFile(str(e))
+
+def write_manifest(path, entries):
+    manifest = {
+        'format': MANIFEST_FORMAT,
+        'created': datetime.utcnow().isoformat(),
+        'files': [[entry.filename, entry.sha256, entry.file_size,
+            entry.mtime_ns, entry.compress_size] for entry in entries]
+    }
+
+    temp_path = path + '.part'
+    with open(temp_path, 'w', encoding='utf8') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    os.replace(temp_path, path)
+
+def latest_entries(backup_dir):
+    # Files of the most recent incremental backup. Files that have the same
+    # size and modification time do not need to be hashed again.
+    latest = None
+    for entry in os.scandir(backup_dir):
+        if entry.is_file() and is_incremental(entry.name):
+            mtime = entry.stat().st_mtime
+            if latest is None or mtime > latest[0]:
+                latest = (mtime, entry.path)
+
+    if latest is None:
+        return {}
+
+    try:
+        return dict((entry.filename, entry)
+            for entry in read_manifest(latest[1]))
+    except (BadBackupFile, OSError):
+        return {}
+
+def store_object(store_dir, path, stopped=None):
+    stat_result = os.stat(path)
+
+    temp_dir = os.path.join(store_dir, TEMP_DIR_NAME)
+    fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+    try:
+        sha256 = hashlib.sha256()
+        compressor = zlib.compressobj()
+        file_size = 0
+        with os.fdopen(fd, 'wb') as temp_file:
+            with open(path, 'rb') as f:
+                while True:
+                    if stopped is not None and stopped():
+                        raise CompressionCancelled()
+
+                    data = f.read(COMPRESS_BUFFER_SIZE)
+                    if len(data) == 0:
+                        break
+
+                    sha256.update(data)
+                    file_size += len(data)
+                    temp_file.write(compressor.compress(data))
+            temp_file.write(compressor.flush())
+
+        digest = sha256.hexdigest()
+        destination = object_path(store_dir, digest)
+        if os.path.isfile(destination):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            os.replace(temp_path, destination)
+    except:
+        if os.path.isfile(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return (digest, file_size, stat_result.st_mtime_ns,
+        os.path.getsize(destination))
+
+# Same as zipwriter.compress_files but for an incremental backup. Only the
+# files that changed since the last incremental backup are read and only the
+# content which is not already in the store is added to it.
+def store_files(manifest_path, files, progress=None, cancelled=None,
+    workers=COMPRESS_WORKERS):
+    backup_dir = os.path.dirname(manifest_path)
+    store_dir = store_directory(backup_dir)
+    os.makedirs(os.path.join(store_dir, TEMP_DIR_NAME), exist_ok=True)
+
+    stop_event = threading.Event()
+
+    def stopped():
+        return stop_event.is_set() or (cancelled is not None and cancelled())
+
+    previous = latest_entries(backup_dir)
+
+    total_size = sum(size for path, arcname, size in files)
+    done_size = 0
+    entries = []
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = []
+        for path, arcname, size in files:
+            arcname = arcname.replace(os.sep, '/')
+            entry = previous.get(arcname)
+            if entry is not None:
+                try:
+                    stat_result = os.stat(path)
+                except OSError:
+                    stat_result = None
+
+                if (stat_result is not None
+                    and stat_result.st_size == entry.file_size
+                    and stat_result.st_mtime_ns == entry.mtime_ns
+                    and os.path.isfile(object_path(store_dir, entry.sha256))):
+                    futures.append((arcname, size, None, entry))
+                    continue
+
+            futures.append((arcname, size, executor.submit(store_object,
+                store_dir, path, stopped), None))
+
+        for arcname, size, future, entry in futures:
+            if stopped():
+                raise CompressionCancelled()
+
+            if future is not None:
+                entry = BackupEntry(arcname, *future.result())
+            entries.append(entry)
+
+            done_size += size
+            if progress is not None:
+                progress(done_size, total_size, arcname)
+
+        write_manifest(manifest_path, entries)
+    except BaseException as e:
+        stop_event.set()
+        executor.shutdown(wait=True)
+
+        # Objects already stored are kept, the next backup can use them
+        if isinstance(e, CompressionCancelled):
+            return False
+        raise
+
+    executor.shutdown(wait=True)
+    return True
+
+def write_backup(backup_path, files, progress=None, cancelled=None,
+    codec=DEFAULT_CODEC):
+    if is_incremental(backup_path):
+        completed = store_files(backup_path, files, progress, cancelled)
+    else:
+        completed = compress_files(backup_path, files, progress, cancelled,
+            codec)
+
+    if completed:
+        record = scan_backup(backup_path, True)
+        if record is not None and not is_incremental(backup_path):
+            record['codec'] = codec
+
+        index = BackupIndex(os.path.dirname(backup_path))
+        index.add(backup_path, record)
+        index.save()
+
+    return completed
+
+
+# Read an incremental backup with the same methods as a ZipFile
+class StoreBackup(object):
+    def __init__(self, path):
+        self.path = path
+        self.store_dir = store_directory(os.path.dirname(path))
+        self.entries = read_manifest(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def infolist(self):
+        return list(self.entries)
+
+    def stored_size(self):
+        return sum(entry.compress_size for entry in self.entries)
+
+    def extract(self, entry, path):
+        target = member_target(path, entry.filename)
+        if target is None:
+            raise BadBackupFile('Invalid file name in backup: {0}'.format(
+                entry.filename))
+
+        source = object_path(self.store_dir, entry.sha256)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        sha256 = hashlib.sha256()
+        decompressor = zlib.decompressobj()
+        try:
+            with open(source, 'rb') as source_file:
+                with open(target, 'wb') as target_file:
+                    while True:
+                        data = source_file.read(COMPRESS_BUFFER_SIZE)
+                        if len(data) == 0:
+                            break
+                        data = decompressor.decompress(data)
+                        sha256.update(data)
+                        target_file.write(data)
+                    data = decompressor.flush()
+                    sha256.update(data)
+                    target_file.write(data)
+        except FileNotFoundError:
+            raise BadBackupFile('Missing content for {0}'.format(
+                entry.filename))
+        except zlib.error as e:
+            raise BadBackupFile(str(e))
+
+        if sha256.hexdigest() != entry.sha256:
+            raise BadBackupFile('Bad content for {0}'.format(entry.filename))
+
+        os.utime(target, ns=(entry.mtime_ns, entry.mtime_ns))
+        return target
+
+    def close(self):
+        pass
+
+
+# zipfile does not support zstd members so they are read from the archive
+# and decompressed here
+class BackupZipFile(zipfile.ZipFile):
+    def extract(self, member, path=None, pwd=None):
+        if not isinstance(member, zipfile.ZipInfo):
+            member = self.getinfo(member)
+        if member.compress_type != ZIP_ZSTANDARD:
+            return super(BackupZipFile, self).extract(member, path, pwd)
+
+        if zstandard is None:
+            raise BadBackupFile('zstd support is not available')
+
+        if path is None:
+            path = os.getcwd()
+        target = member_target(path, member.filename)
+        if target is None:
+            raise BadBackupFile('Invalid file name in backup: {0}'.format(
+                member.filename))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        # Use our own file object so that members can be extracted from
+        # many threads
+        with open(self.filename, 'rb') as archive_file:
+            archive_file.seek(member.header_offset)
+            header = LOCAL_HEADER.unpack(archive_file.read(LOCAL_HEADER.size))
+            if header[0] != LOCAL_HEADER_SIGNATURE:
+                raise BadBackupFile('Bad local header for {0}'.format(
+                    member.filename))
+            archive_file.seek(header[-2] + header[-1], os.SEEK_CUR)
+
+            decompressor = zstandard.ZstdDecompressor().decompressobj()
+            crc = 0
+            remaining = member.compress_size
+            with open(target, 'wb') as target_file:
+                while remaining > 0:
+                    data = archive_file.read(min(remaining,
+                        COMPRESS_BUFFER_SIZE))
+                    if len(data) == 0:
+                        raise BadBackupFile('Truncated member {0}'.format(
+                            member.filename))
+                    remaining -= len(data)
+
+                    try:
+                        data = decompressor.decompress(data)
+                    except zstandard.ZstdError as e:
+                        raise BadBackupFile(str(e))
+                    crc = zlib.crc32(data, crc)
+                    target_file.write(data)
+
+        if crc != member.CRC:
+            raise BadBackupFile('Bad CRC for {0}'.format(member.filename))
+
+        return target
+
+
+def open_backup(path):
+    if is_incremental(path):
+        return StoreBackup(path)
+    return BackupZipFile(path)
+
+def restore_batches(infolist):
+    batches = []
+    batch = []
+    batch_size = 0
+    for info in infolist:
+        batch.append(info)
+        batch_size += info.file_size
+        if (len(batch) >= RESTORE_BATCH_FILES
+            or batch_size >= RESTORE_BATCH_SIZE):
+            batches.append(batch)
+            batch = []
+            batch_size = 0
+    if len(batch) > 0:
+        batches.append(batch)
+    return batches
+
+# Extract all the files of a backup in path with a pool of workers. Members
+# are handed to the workers in batches and progress(done, total, filename) is
+# called once per batch. Returns False when cancelled() became true before
+# the end.
+def extract_backup(backup_path, path, progress=None, cancelled=None,
+    workers=COMPRESS_WORKERS):
+    stop_event = threading.Event()
+
+    def stopped():
+        return stop_event.is_set() or (cancelled is not None and cancelled())
+
+    with open_backup(backup_path) as backup:
+        infolist = backup.infolist()
+        total_size = sum(info.file_size for info in infolist)
+
+        # Directories are created first so that workers do not race to
+        # create the same ones
+        directories = set()
+        for info in infolist:
+            target = member_target(path, info.filename)
+            if target is None:
+                continue
+            if info.is_dir():
+                directories.add(target)
+            else:
+                directories.add(os.path.dirname(target))
+        for directory in sorted(directories):
+            os.makedirs(directory, exist_ok=True)
+
+        # zipfile does not keep track of the readers of an archive safely
+        # across threads, each worker opens the backup once
+        local = threading.local()
+        opened = []
+        opened_lock = threading.Lock()
+
+        def extract_batch(batch):
+            worker_backup = getattr(local, 'backup', None)
+            if worker_backup is None:
+                worker_backup = open_backup(backup_path)
+                local.backup = worker_backup
+                with opened_lock:
+                    opened.append(worker_backup)
+
+            for info in batch:
+                if stopped():
+                    raise CompressionCancelled()
+                if not info.is_dir():
+                    worker_backup.extract(info, path)
+            return batch
+
+        done_size = 0
+        futures = []
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            for batch in restore_batches(infolist):
+                futures.append(executor.submit(extract_batch, batch))
+            for future in futures:
+                batch = future.result()
+                done_size += sum(info.file_size for info in batch)
+                if progress is not None:
+                    progress(done_size, total_size, batch[-1].filename)
+        except BaseException as e:
+            stop_event.set()
+            for future in futures:
+                future.cancel()
+
+            if isinstance(e, CompressionCancelled):
+                return False
+            raise
+        finally:
+            executor.shutdown(wait=True)
+            for worker_backup in opened:
+                worker_backup.close()
+
+    return True
+
+def member_codec(info):
+    if info.compress_type == ZIP_DEFLATED:
+        level_flags = info.flag_bits & (DEFLATE_MAX_FLAG | DEFLATE_FAST_FLAG)
+        if level_flags == DEFLATE_MAX_FLAG:
+            return 'deflate_max'
+        elif level_flags != 0:
+            return 'deflate_fast'
+        return 'deflate'
+    return METHOD_CODECS.get(info.compress_type, 'unknown')
+
+def archive_codec(codecs):
+    # Guess the backup codec from the codecs of its members
+    if len(codecs) == 0:
+        return None
+    elif len(codecs) == 1:
+        return codecs.pop()
+    elif len(codecs) == 2 and 'store' in codecs and 'deflate' in codecs:
+        return 'adaptive'
+    return 'mixed'
+
+def collect_garbage(backup_dir):
+    # Remove the stored content no incremental backup refers to. Returns the
+    # number of bytes freed.
+    store_dir = store_directory(backup_dir)
+    if not os.path.isdir(store_dir):
+        return 0
+
+    referenced = set()
+    for entry in os.scandir(backup_dir):
+        if entry.is_file() and is_incremental(entry.name):
+            try:
+                referenced.update(backup_entry.sha256
+                    for backup_entry in read_manifest(entry.path))
+            except (BadBackupFile, OSError):
+                # Better keep everything than lose content a backup needs
+                return 0
+
+    freed = 0
+    objects_dir = os.path.join(store_dir, OBJECTS_DIR_NAME)
+    if os.path.isdir(objects_dir):
+        for prefix_entry in os.scandir(objects_dir):
+            if not prefix_entry.is_dir():
+                continue
+
+            remaining = 0
+            for entry in os.scandir(prefix_entry.path):
+                if entry.name in referenced:
+                    remaining += 1
+                    continue
+
+                try:
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                    freed += size
+                except OSError:
+                    remaining += 1
+
+            if remaining == 0:
+                try:
+                    os.rmdir(prefix_entry.path)
+                except OSError:
+                    pass
+
+    temp_dir = os.path.join(store_dir, TEMP_DIR_NAME)
+    if os.path.isdir(temp_dir):
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    if len(referenced) == 0:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    return freed
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(COMPRESS_BUFFER_SIZE)
+            if len(data) == 0:
+                break
+            sha256.update(data)
+    return sha256.hexdigest()
+
+# Read what the backups table shows about a backup. Returns None when it is
+# not a save backup.
+def scan_backup(path, created=False):
+    stat_result = os.stat(path)
+    if created:
+        created_on = datetime.utcnow()
+    else:
+        created_on = datetime.utcfromtimestamp(stat_result.st_mtime)
+
+    record = {
+        'format': 'incremental' if is_incremental(path) else 'zip',
+        'actual_size': 0,
+        'compressed_size': stat_result.st_size,
+        'files': 0,
+        'characters': 0,
+        'worlds': [],
+        'created': created_on.isoformat(),
+        'sha256': None,
+        'codec': None
+    }
+
+    worlds = set()
+    codecs = set()
+    try:
+        with open_backup(path) as backup:
+            if is_incremental(path):
+                record['compressed_size'] = backup.stored_size()
+
+            for info in backup.infolist():
+                if not info.filename.startswith('save/'):
+                    return None
+
+                record['actual_size'] += info.file_size
+                if not info.is_dir():
+                    record['files'] += 1
+                    if not is_incremental(path):
+                        codecs.add(member_codec(info))
+
+                path_items = info.filename.split('/')
+                if len(path_items) == 3:
+                    save_file = path_items[-1]
+                    if save_file.endswith('.sav'):
+                        record['characters'] += 1
+                    if save_file in WORLD_FILES:
+                        worlds.add(path_items[1])
+    except zipfile.BadZipFile:
+        pass
+
+    record['worlds'] = sorted(worlds)
+    if is_incremental(path):
+        record['codec'] = 'incremental'
+    else:
+        record['codec'] = archive_codec(codecs)
+
+    # Only hashed when the backup is created, while it is still cached by
+    # the system
+    if created:
+        record['sha256'] = file_sha256(path)
+
+    return record
+
+
+# Records of the backups found in a directory, kept valid as long as the
+# size and modification time of the backup file did not change
+class BackupIndex(object):
+    def __init__(self, backup_dir):
+        self.path = os.path.join(backup_dir, INDEX_NAME)
+        self.records = {}
+        self.modified = False
+        self.seen = set()
+
+        try:
+            with open(self.path, 'r', encoding='utf8') as f:
+                index = json.load(f)
+            if (isinstance(index, dict)
+                and index.get('format') == INDEX_FORMAT
+                and isinstance(index.get('backups'), dict)):
+                self.records = index['backups']
+        except (OSError, ValueError):
+            pass
+
+    def record(self, path):
+        # Scan the backup only when the index does not know it. Files that
+        # are not save backups are kept with a None record.
+        filename = os.path.basename(path)
+        self.seen.add(filename)
+
+        stat_result = os.stat(path)
+        entry = self.records.get(filename)
+        if (isinstance(entry, dict) and 'record' in entry
+            and entry.get('size') == stat_result.st_size
+            and entry.get('mtime_ns') == stat_result.st_mtime_ns):
+            return entry['record']
+
+        record = scan_backup(path)
+        self.add(path, record)
+        return record
+
+    def add(self, path, record):
+        filename = os.path.basename(path)
+        self.seen.add(filename)
+
+        stat_result = os.stat(path)
+        self.records[filename] = {
+            'size': stat_result.st_size,
+            'mtime_ns': stat_result.st_mtime_ns,
+            'record': record
+        }
+        self.modified = True
+
+    def prune(self):
+        # Forget the backups that were not seen since the index was loaded
+        for filename in list(self.records.keys()):
+            if filename not in self.seen:
+                del self.records[filename]
+                self.modified = True
+
+    def save(self):
+        if not self.modified:
+            return
+
+        index = {
+            'format': INDEX_FORMAT,
+            'backups': self.records
+        }
+
+        temp_path = self.path + '.part'
+        try:
+            with open(temp_path, 'w', encoding='utf8') as f:
+                json.dump(index, f, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+        except OSError:
+            # The index is only a cache
+            return
+
+        self.modified = False
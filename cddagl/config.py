@@ -1,14 +1,18 @@
 import os
 import sys
 
+from datetime import datetime
+
 from alembic.config import Config
 from alembic import command
 
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.orm import joinedload, joinedload_all
 
-from cddagl.configmodel import ConfigValue, GameVersion, GameBuild
+from cddagl.configmodel import (
+    ConfigValue, GameVersion, GameBuild, ExeIdentity, HttpCache,
+    ArchiveCacheEntry, UpdateJournal, UpdateJournalMember)
 
 _session = None
 
@@ -40,10 +44,10 @@ def get_session():
 
     if _session is None:
         db_engine = create_engine(get_db_url())
-        Session = sessionmaker(bind=db_engine)
-        _session = Session()
+        # Updates run in worker threads, each thread gets its own session
+        _session = scoped_session(sessionmaker(bind=db_engine))
 
-    return _session
+    return _session()
 
 def get_config_value(name, default=None):
     session = get_session()
@@ -120,5 +124,248 @@ def get_build_from_sha256(sha256):
 
     return None
 
+def exe_identity_key(path, exe_stat):
+    # The file id makes sure a replaced file with the same size and
+    # modification time is not mistaken for the previous one
+    return {
+        'path': os.path.normcase(os.path.abspath(path)),
+        'size': exe_stat.st_size,
+        'mtime_ns': exe_stat.st_mtime_ns,
+        'file_id': '{0}:{1}'.format(exe_stat.st_dev, exe_stat.st_ino)
+    }
+
+def get_exe_identity(path, exe_stat):
+    session = get_session()
+
+    key = exe_identity_key(path, exe_stat)
+
+    exe_identity = session.query(ExeIdentity).filter_by(path=key['path']
+        ).first()
+
+    if (exe_identity is None
+        or exe_identity.size != key['size']
+        or exe_identity.mtime_ns != key['mtime_ns']
+        or exe_identity.file_id != key['file_id']):
+        return None
+
+    return {
+        'sha256': exe_identity.sha256,
+        'version': exe_identity.version
+    }
+
+def set_exe_identity(path, exe_stat, sha256, version):
+    session = get_session()
+
+    key = exe_identity_key(path, exe_stat)
+
+    exe_identity = session.query(ExeIdentity).filter_by(path=key['path']
+        ).first()
+
+    if exe_identity is None:
+        exe_identity = ExeIdentity()
+        exe_identity.path = key['path']
+
+    exe_identity.size = key['size']
+    exe_identity.mtime_ns = key['mtime_ns']
+    exe_identity.file_id = key['file_id']
+    exe_identity.sha256 = sha256
+    exe_identity.version = version
+    exe_identity.identified_on = datetime.utcnow()
+
+    session.add(exe_identity)
+    session.commit()
+
+def get_http_cache(url):
+    session = get_session()
+
+    http_cache = session.query(HttpCache).filter_by(url=url).first()
+
+    if http_cache is None:
+        return None
+
+    return {
+        'etag': http_cache.etag,
+        'last_modified': http_cache.last_modified,
+        'body': http_cache.body,
+        'fetched_on': http_cache.fetched_on
+    }
+
+def set_http_cache(url, etag, last_modified, body):
+    session = get_session()
+
+    http_cache = session.query(HttpCache).filter_by(url=url).first()
+
+    if http_cache is None:
+        http_cache = HttpCache()
+        http_cache.url = url
+
+    http_cache.etag = etag
+    http_cache.last_modified = last_modified
+    http_cache.body = body
+    http_cache.fetched_on = datetime.utcnow()
+
+    session.add(http_cache)
+    session.commit()
+
+def archive_cache_entry_dict(entry):
+    return {
+        'id': entry.id,
+        'url': entry.url,
+        'build': entry.build,
+        'sha256': entry.sha256,
+        'path': entry.path,
+        'size': entry.size,
+        'last_used': entry.last_used
+    }
+
+def get_archive_cache_entry(url=None, sha256=None):
+    session = get_session()
+
+    query = session.query(ArchiveCacheEntry)
+    if url is not None:
+        query = query.filter_by(url=url)
+    if sha256 is not None:
+        query = query.filter_by(sha256=sha256)
+
+    entry = query.order_by(ArchiveCacheEntry.last_used.desc()).first()
+
+    if entry is None:
+        return None
+
+    return archive_cache_entry_dict(entry)
+
+def get_archive_cache_entries():
+    session = get_session()
+
+    entries = session.query(ArchiveCacheEntry).order_by(
+        ArchiveCacheEntry.last_used).all()
+
+    return [archive_cache_entry_dict(entry) for entry in entries]
+
+def set_archive_cache_entry(url, build, sha256, path, size):
+    session = get_session()
+
+    entry = session.query(ArchiveCacheEntry).filter_by(url=url).first()
+
+    if entry is None:
+        entry = ArchiveCacheEntry()
+        entry.url = url
+
+    entry.build = build
+    entry.sha256 = sha256
+    entry.path = path
+    entry.size = size
+    entry.last_used = datetime.utcnow()
+
+    session.add(entry)
+    session.commit()
+
+def touch_archive_cache_entry(entry_id):
+    session = get_session()
+
+    entry = session.query(ArchiveCacheEntry).filter_by(id=entry_id).first()
+
+    if entry is not None:
+        entry.last_used = datetime.utcnow()
+        session.commit()
+
+def delete_archive_cache_entries(path):
+    session = get_session()
+
+    session.query(ArchiveCacheEntry).filter_by(path=path).delete()
+    session.commit()
+
+def update_journal_dict(journal):
+    return {
+        'id': journal.id,
+        'game_dir': journal.game_dir,
+        'url': journal.url,
+        'build': journal.build,
+        'build_date': journal.build_date,
+        'archive_path': journal.archive_path,
+        'delta': journal.delta,
+        'stage': journal.stage,
+        'staging_dir': journal.staging_dir,
+        'old_dir': journal.old_dir,
+        'copying_dir': journal.copying_dir,
+        'started_on': journal.started_on,
+        'updated_on': journal.updated_on
+    }
+
+def get_update_journal():
+    session = get_session()
+
+    journal = session.query(UpdateJournal).order_by(
+        UpdateJournal.started_on.desc()).first()
+
+    if journal is None:
+        return None
+
+    return update_journal_dict(journal)
+
+def start_update_journal(game_dir, url, build, build_date, archive_path,
+    delta):
+    # Only one update can be in progress
+    delete_update_journal()
+
+    session = get_session()
+
+    journal = UpdateJournal()
+    journal.game_dir = game_dir
+    journal.url = url
+    journal.build = build
+    journal.build_date = build_date
+    journal.archive_path = archive_path
+    journal.delta = delta
+    journal.stage = 'download'
+
+    session.add(journal)
+    session.commit()
+
+def set_update_journal_values(**values):
+    session = get_session()
+
+    journal = session.query(UpdateJournal).first()
+
+    if journal is not None:
+        for name, value in values.items():
+            setattr(journal, name, value)
+        journal.updated_on = datetime.utcnow()
+        session.commit()
+
+def add_update_journal_members(names):
+    session = get_session()
+
+    journal = session.query(UpdateJournal).first()
+
+    if journal is not None and len(names) > 0:
+        session.bulk_insert_mappings(UpdateJournalMember, [
+            {'journal': journal.id, 'name': name} for name in names])
+        session.commit()
+
+def get_update_journal_members():
+    session = get_session()
+
+    journal = session.query(UpdateJournal).first()
+
+    if journal is None:
+        return set()
+
+    return set(name for name, in session.query(UpdateJournalMember.name
+        ).filter_by(journal=journal.id))
+
+def clear_update_journal_members():
+    session = get_session()
+
+    session.query(UpdateJournalMember).delete()
+    session.commit()
+
+def delete_update_journal():
+    session = get_session()
+
+    session.query(UpdateJournalMember).delete()
+    session.query(UpdateJournal).delete()
+    session.commit()
+
 def config_true(value):
     return value == 'True' or value == '1'
\ No newline at end of file
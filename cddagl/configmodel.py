@@ -42,3 +42,72 @@ class GameBuild(Base):
     released_on = sa.Column(sa.DateTime, nullable=False)
     discovered_on = sa.Column(sa.DateTime, nullable=False,
         default=datetime.utcnow)
+
+
+class ExeIdentity(Base):
+    __tablename__ = 'exe_identity'
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    path = sa.Column(sa.Text(), nullable=False)
+    size = sa.Column(sa.BigInteger, nullable=False)
+    mtime_ns = sa.Column(sa.BigInteger, nullable=False)
+    file_id = sa.Column(sa.String(64), nullable=False)
+    sha256 = sa.Column(sa.String(64), nullable=False)
+    version = sa.Column(sa.String(32), nullable=False)
+    identified_on = sa.Column(sa.DateTime, nullable=False,
+        default=datetime.utcnow)
+
+
+class HttpCache(Base):
+    __tablename__ = 'http_cache'
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    url = sa.Column(sa.Text(), nullable=False)
+    etag = sa.Column(sa.Text(), nullable=True)
+    last_modified = sa.Column(sa.Text(), nullable=True)
+    body = sa.Column(sa.LargeBinary(), nullable=False)
+    fetched_on = sa.Column(sa.DateTime, nullable=False,
+        default=datetime.utcnow)
+
+
+class ArchiveCacheEntry(Base):
+    __tablename__ = 'archive_cache'
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    url = sa.Column(sa.Text(), nullable=False)
+    build = sa.Column(sa.String(16), nullable=True)
+    sha256 = sa.Column(sa.String(64), nullable=False)
+    path = sa.Column(sa.Text(), nullable=False)
+    size = sa.Column(sa.BigInteger, nullable=False)
+    added_on = sa.Column(sa.DateTime, nullable=False, default=datetime.utcnow)
+    last_used = sa.Column(sa.DateTime, nullable=False,
+        default=datetime.utcnow)
+
+
+class UpdateJournal(Base):
+    __tablename__ = 'update_journal'
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    game_dir = sa.Column(sa.Text(), nullable=False)
+    url = sa.Column(sa.Text(), nullable=False)
+    build = sa.Column(sa.String(16), nullable=True)
+    build_date = sa.Column(sa.DateTime, nullable=True)
+    archive_path = sa.Column(sa.Text(), nullable=False)
+    delta = sa.Column(sa.Boolean, nullable=False, default=False)
+    stage = sa.Column(sa.String(32), nullable=False)
+    staging_dir = sa.Column(sa.Text(), nullable=True)
+    old_dir = sa.Column(sa.Text(), nullable=True)
+    copying_dir = sa.Column(sa.Text(), nullable=True)
+    started_on = sa.Column(sa.DateTime, nullable=False,
+        default=datetime.utcnow)
+    updated_on = sa.Column(sa.DateTime, nullable=False,
+        default=datetime.utcnow)
+
+
+class UpdateJournalMember(Base):
+    __tablename__ = 'update_journal_member'
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    journal = sa.Column(sa.Integer, sa.ForeignKey(UpdateJournal.id),
+        nullable=False)
+    name = sa.Column(sa.Text(), nullable=False)
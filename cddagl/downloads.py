@@ -0,0 +1,516 @@
+import os
+import re
+import json
+import zipfile
+
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError, URLError
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+
+from cddagl.zipdelta import (
+    ZIP_TAIL_SIZE, DELTA_MAX_RATIO, central_directory_range, plan_delta,
+    member_ranges, RangeZipFile)
+
+# Downloads of game builds with plain HTTP requests. A full download is
+# resumed with a range request when it was interrupted and can be split in
+# segments fetched on their own connection. A delta download only fetches
+# the members of an archive that changed since the installed build. Progress
+# is reported with a progress(done, total) callback.
+
+DOWNLOAD_BUFFER_SIZE = 64 * 1024
+DOWNLOAD_TIMEOUT = 60
+MIN_SEGMENT_SIZE = 1024 * 1024
+DELTA_CONNECTIONS = 4
+
+# Seconds between two progress reports of the downloads using many
+# connections
+PROGRESS_INTERVAL = 0.1
+
+
+class DownloadCancelled(Exception): pass
+
+# With resumable, what was received so far can be used by the next attempt
+class DownloadFailed(Exception):
+    def __init__(self, message, resumable=False):
+        super(DownloadFailed, self).__init__(message)
+        self.resumable = resumable
+
+# The server cannot serve the ranges a delta download needs
+class DeltaUnsupported(Exception): pass
+
+
+def read_download_journal(download_dir):
+    journal_file = os.path.join(download_dir, 'download.json')
+    try:
+        with open(journal_file, 'r', encoding='utf8') as f:
+            journal = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(journal, dict):
+        return None
+    return journal
+
+def write_download_journal(download_dir, journal):
+    journal_file = os.path.join(download_dir, 'download.json')
+    with open(journal_file, 'w', encoding='utf8') as f:
+        json.dump(journal, f)
+
+def open_request(url, headers=None):
+    # Error statuses are returned like any other response so that the caller
+    # can look at them
+    request = Request(url, headers=headers or {})
+    try:
+        return urlopen(request, timeout=DOWNLOAD_TIMEOUT)
+    except HTTPError as e:
+        return e
+
+# First byte and total size from the Content-Range header of a response
+def content_range(response):
+    value = response.headers.get('Content-Range')
+    if value is None:
+        return None, None
+
+    match = re.match(r'bytes (\d+)-\d+/(\d+)', value)
+    if match is None:
+        return None, None
+    return int(match.group(1)), int(match.group(2))
+
+def response_validator(response):
+    return (response.headers.get('ETag')
+        or response.headers.get('Last-Modified'))
+
+def split_segments(content_length, connections):
+    count = max(1, min(connections, content_length // MIN_SEGMENT_SIZE))
+    segment_size = content_length // count
+
+    segments = []
+    for index in range(count):
+        start = index * segment_size
+        if index == count - 1:
+            end = content_length - 1
+        else:
+            end = start + segment_size - 1
+        segments.append([start, end, 0])
+    return segments
+
+def segmented_journal(url, connections):
+    # Find out if the server supports ranges before splitting
+    try:
+        with urlopen(Request(url, method='HEAD'),
+            timeout=DOWNLOAD_TIMEOUT) as response:
+            headers = response.headers
+    except (URLError, OSError):
+        return None
+
+    content_length = headers.get('Content-Length')
+    accept_ranges = headers.get('Accept-Ranges')
+    etag = headers.get('ETag')
+    last_modified = headers.get('Last-Modified')
+
+    if (accept_ranges is None or accept_ranges.strip().lower() != 'bytes'
+        or content_length is None
+        or int(content_length) < 2 * MIN_SEGMENT_SIZE
+        or (etag is None and last_modified is None)):
+        return None
+
+    content_length = int(content_length)
+    return {
+        'url': url,
+        'etag': etag,
+        'last_modified': last_modified,
+        'content_length': content_length,
+        'segments': split_segments(content_length, connections)
+    }
+
+def download_file(url, path, connections=1, progress=None, cancelled=None):
+    # Download url to path. The journal kept next to path lets an interrupted
+    # download resume where it stopped.
+    download_dir = os.path.dirname(path)
+
+    journal = read_download_journal(download_dir)
+    if (journal is None or journal.get('url') != url
+        or not os.path.isfile(path)):
+        journal = None
+
+    if journal is None and connections > 1:
+        journal = segmented_journal(url, connections)
+
+    if journal is not None and 'segments' in journal:
+        download = SegmentedDownload(path, journal, progress, cancelled)
+    else:
+        download = StreamDownload(url, path, journal, progress, cancelled)
+    download.run()
+
+# Download a file with a single request
+class StreamDownload(object):
+    def __init__(self, url, path, journal=None, progress=None,
+        cancelled=None):
+        self.url = url
+        self.path = path
+        self.journal = journal
+        self.progress = progress
+        self.cancelled = cancelled
+        self.offset = 0
+
+    def is_cancelled(self):
+        return self.cancelled is not None and self.cancelled()
+
+    def run(self):
+        headers = {}
+
+        # Resume a previous partial download of the same file. If-Range makes
+        # the server send the whole file again if it changed since then.
+        if self.journal is not None:
+            offset = os.path.getsize(self.path)
+            validator = (self.journal.get('etag')
+                or self.journal.get('last_modified'))
+            if offset > 0 and validator is not None:
+                headers['Range'] = 'bytes={0}-'.format(offset)
+                headers['If-Range'] = validator
+                self.offset = offset
+
+        try:
+            response = open_request(self.url, headers)
+            with response:
+                self.receive(response)
+        except (URLError, OSError) as e:
+            raise DownloadFailed(str(e), resumable=True)
+
+        content_length = self.journal.get('content_length')
+        if content_length is None:
+            return
+        if os.path.getsize(self.path) != content_length:
+            raise DownloadFailed('Incomplete download', resumable=True)
+
+    def receive(self, response):
+        status_code = response.getcode()
+
+        if status_code == 206 and self.offset > 0:
+            # Make sure the server resumed where we asked it to
+            if content_range(response)[0] != self.offset:
+                raise DownloadFailed('Unexpected range')
+            mode = 'ab'
+        elif status_code == 200:
+            self.offset = 0
+
+            content_length = response.headers.get('Content-Length')
+            if content_length is not None:
+                content_length = int(content_length)
+
+            self.journal = {
+                'url': self.url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'content_length': content_length
+            }
+            write_download_journal(os.path.dirname(self.path), self.journal)
+            mode = 'wb'
+        elif (status_code == 416 and self.journal is not None
+            and self.journal.get('content_length') is not None):
+            # A resumed download that was already complete
+            return
+        else:
+            raise DownloadFailed('Unexpected status {0}'.format(status_code))
+
+        total = self.journal.get('content_length') or 0
+        received = self.offset
+        with open(self.path, mode) as downloaded_file:
+            while True:
+                if self.is_cancelled():
+                    raise DownloadCancelled()
+
+                data = response.read(DOWNLOAD_BUFFER_SIZE)
+                if len(data) == 0:
+                    break
+                downloaded_file.write(data)
+
+                received += len(data)
+                if self.progress is not None:
+                    self.progress(received, total)
+
+
+# Download a file in segments, each with its own connection. The segments
+# are written at their place in a file of the final size.
+class SegmentedDownload(object):
+    def __init__(self, path, journal, progress=None, cancelled=None):
+        self.path = path
+        self.journal = journal
+        self.progress = progress
+        self.cancelled = cancelled
+        self.stopping = False
+
+    def received(self):
+        return sum(segment[2] for segment in self.journal['segments'])
+
+    def run(self):
+        content_length = self.journal['content_length']
+        download_dir = os.path.dirname(self.path)
+
+        if (not os.path.isfile(self.path)
+            or os.path.getsize(self.path) != content_length):
+            for segment in self.journal['segments']:
+                segment[2] = 0
+            with open(self.path, 'wb') as f:
+                f.truncate(content_length)
+        write_download_journal(download_dir, self.journal)
+
+        segments = [segment for segment in self.journal['segments']
+            if segment[0] + segment[2] <= segment[1]]
+
+        cancelled = False
+        executor = ThreadPoolExecutor(max_workers=max(1, len(segments)))
+        with executor:
+            futures = [executor.submit(self.download_segment, segment)
+                for segment in segments]
+
+            pending = futures
+            while len(pending) > 0:
+                done, pending = wait_futures(pending,
+                    timeout=PROGRESS_INTERVAL)
+                if any(future.exception() is not None for future in done):
+                    # Stop the other segments as soon as possible
+                    self.stopping = True
+                if self.cancelled is not None and self.cancelled():
+                    cancelled = True
+                    self.stopping = True
+
+                # Segments are written without buffering, what the journal
+                # says was received is already in the file
+                write_download_journal(download_dir, self.journal)
+                if self.progress is not None:
+                    self.progress(self.received(), content_length)
+
+        write_download_journal(download_dir, self.journal)
+        if self.progress is not None:
+            self.progress(self.received(), content_length)
+
+        # A segment that cannot be resumed makes the whole download fail
+        errors = [future.exception() for future in futures
+            if future.exception() is not None]
+        errors.sort(key=lambda error: getattr(error, 'resumable', True))
+        if len(errors) > 0:
+            raise errors[0]
+        if cancelled:
+            raise DownloadCancelled()
+        if self.received() != content_length:
+            raise DownloadFailed('Incomplete download', resumable=True)
+
+    def download_segment(self, segment):
+        start, end, received = segment
+        if self.stopping:
+            return
+
+        headers = {'Range': 'bytes={0}-{1}'.format(start + received, end)}
+        validator = (self.journal.get('etag')
+            or self.journal.get('last_modified'))
+        if validator is not None:
+            headers['If-Range'] = validator
+
+        try:
+            with open_request(self.journal['url'], headers) as response:
+                if response.getcode() != 206:
+                    # The server ignored our range or the file changed
+                    raise DownloadFailed('Unexpected status {0}'.format(
+                        response.getcode()))
+
+                # Make sure we got the range we asked for before writing
+                # anything
+                range_start, total_size = content_range(response)
+                if (range_start != start + received
+                    or total_size != self.journal['content_length']):
+                    raise DownloadFailed('Unexpected range')
+
+                with open(self.path, 'r+b', buffering=0) as downloaded_file:
+                    downloaded_file.seek(start + received)
+                    while not self.stopping:
+                        remaining = end - start + 1 - segment[2]
+                        if remaining <= 0:
+                            break
+
+                        data = response.read(min(DOWNLOAD_BUFFER_SIZE,
+                            remaining))
+                        if len(data) == 0:
+                            break
+                        downloaded_file.write(data)
+                        segment[2] += len(data)
+        except (URLError, OSError) as e:
+            # What we already have will be resumed next time
+            raise DownloadFailed(str(e), resumable=True)
+
+
+# Download only the members of a build archive that changed since the
+# installed build. The central directory of the archive is fetched first to
+# find them. The ranges are stored one after the other in a local file read
+# back through a RangeZipFile.
+class DeltaDownload(object):
+    def __init__(self, url, path, manifest, game_dir, progress=None,
+        cancelled=None):
+        self.url = url
+        self.path = path
+        self.manifest = manifest
+        self.game_dir = game_dir
+        self.progress = progress
+        self.cancelled = cancelled
+        self.ranges = []
+        self.member_ranges = []
+        self.local_size = 0
+        self.archive_size = None
+        self.cd_offset = None
+        self.validator = None
+        self.unchanged = set()
+        self.total_bytes = 0
+        self.stopping = False
+
+    def is_cancelled(self):
+        return self.cancelled is not None and self.cancelled()
+
+    def run(self):
+        with open(self.path, 'wb'):
+            pass
+
+        try:
+            self.fetch_central_directory()
+            self.fetch_members()
+        except (URLError, OSError) as e:
+            raise DownloadFailed(str(e))
+
+    def fetch_range(self, header):
+        headers = {'Range': header}
+        if self.validator is not None:
+            headers['If-Range'] = self.validator
+
+        response = open_request(self.url, headers)
+        if response.getcode() != 206:
+            # The server ignored our range or the file changed
+            response.close()
+            raise DeltaUnsupported()
+        return response
+
+    def add_range(self, start, end):
+        archive_range = [start, end, self.local_size, 0]
+        self.local_size += end - start
+        self.ranges.append(archive_range)
+        return archive_range
+
+    def write_range(self, archive_range, data):
+        start, end, local_offset, count = archive_range
+        with open(self.path, 'r+b') as downloaded_file:
+            downloaded_file.seek(local_offset + count)
+            downloaded_file.write(data)
+        archive_range[3] += len(data)
+
+    def fetch_central_directory(self):
+        # The end of central directory record is at the end of the archive
+        with self.fetch_range('bytes=-{0}'.format(ZIP_TAIL_SIZE)) as response:
+            start, self.archive_size = content_range(response)
+
+            # Without a validator we could mix parts of different archives
+            self.validator = response_validator(response)
+            if start is None or self.validator is None:
+                raise DeltaUnsupported()
+
+            data = response.read()
+
+        self.write_range(self.add_range(start, start + len(data)), data)
+
+        try:
+            cd_offset, cd_size = central_directory_range(data, start)
+        except zipfile.BadZipFile:
+            raise DownloadFailed('Invalid central directory')
+
+        self.cd_offset = cd_offset
+        if cd_offset < start:
+            cd_end = min(cd_offset + cd_size, start)
+            with self.fetch_range('bytes={0}-{1}'.format(cd_offset,
+                cd_end - 1)) as response:
+                range_start, archive_size = content_range(response)
+                data = response.read()
+            if (range_start != cd_offset or archive_size != self.archive_size
+                or len(data) < cd_end - cd_offset):
+                raise DownloadFailed('Unexpected range')
+
+            self.write_range(self.add_range(cd_offset, cd_end),
+                data[:cd_end - cd_offset])
+
+    def fetch_members(self):
+        try:
+            with self.open_archive() as z:
+                infolist = z.infolist()
+        except zipfile.BadZipFile:
+            raise DownloadFailed('Invalid central directory')
+
+        changed, self.unchanged = plan_delta(infolist, self.manifest,
+            self.game_dir)
+        ranges = member_ranges(infolist, changed, self.cd_offset)
+
+        self.total_bytes = sum(end - start for start, end in ranges)
+        if self.total_bytes > self.cd_offset * DELTA_MAX_RATIO:
+            # Most of the archive changed, it is simpler to download it whole
+            raise DeltaUnsupported()
+
+        self.member_ranges = [self.add_range(start, end)
+            for start, end in ranges]
+
+        cancelled = False
+        executor = ThreadPoolExecutor(max_workers=DELTA_CONNECTIONS)
+        with executor:
+            futures = [executor.submit(self.fetch_member, archive_range)
+                for archive_range in self.member_ranges]
+
+            pending = futures
+            while len(pending) > 0:
+                done, pending = wait_futures(pending,
+                    timeout=PROGRESS_INTERVAL)
+                if any(future.exception() is not None for future in done):
+                    self.stopping = True
+                if self.is_cancelled():
+                    cancelled = True
+                    self.stopping = True
+
+                if self.progress is not None:
+                    self.progress(self.received(), self.total_bytes)
+
+        # An unsupported range means the whole archive must be downloaded
+        errors = [future.exception() for future in futures
+            if future.exception() is not None]
+        errors.sort(key=lambda error: not isinstance(error, DeltaUnsupported))
+        if len(errors) > 0:
+            raise errors[0]
+        if cancelled:
+            raise DownloadCancelled()
+
+    def fetch_member(self, archive_range):
+        start, end, local_offset, count = archive_range
+        if self.stopping:
+            return
+
+        with self.fetch_range('bytes={0}-{1}'.format(start, end - 1)
+            ) as response:
+            if content_range(response)[0] != start:
+                raise DownloadFailed('Unexpected range')
+
+            with open(self.path, 'r+b') as downloaded_file:
+                downloaded_file.seek(local_offset)
+                while not self.stopping:
+                    remaining = end - start - archive_range[3]
+                    if remaining <= 0:
+                        break
+
+                    data = response.read(min(DOWNLOAD_BUFFER_SIZE,
+                        remaining))
+                    if len(data) == 0:
+                        break
+                    downloaded_file.write(data)
+                    archive_range[3] += len(data)
+
+        if not self.stopping and archive_range[3] != end - start:
+            raise DownloadFailed('Incomplete range')
+
+    def received(self):
+        return sum(archive_range[3] for archive_range in self.member_ranges)
+
+    def open_archive(self):
+        return RangeZipFile(self.path, self.archive_size,
+            [(start, end, local_offset)
+                for start, end, local_offset, count in self.ranges])
@@ -0,0 +1,1722 @@
+import os
+import re
+import sys
+import json
+import stat
+import shutil
+import random
+import zipfile
+import zlib
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+
+from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from urllib.parse import urljoin, urlparse
+from urllib.request import urlopen
+
+import gettext
+_ = gettext.gettext
+
+from lxml import etree
+
+from cddagl.config import (
+    get_config_value, config_true, get_build_from_sha256, new_build,
+    get_exe_identity, set_exe_identity, start_update_journal,
+    set_update_journal_values, add_update_journal_members,
+    get_update_journal_members, delete_update_journal)
+from cddagl.exeinfo import ExeDigest, read_version_resource
+from cddagl.archivecache import (
+    fetch_cached_archive, store_archive, discard_cached_archive,
+    link_or_copy)
+from cddagl.zipdelta import read_manifest, write_manifest, member_target
+from cddagl.downloads import (
+    DownloadCancelled, DownloadFailed, DeltaUnsupported, DeltaDownload,
+    read_download_journal, download_file)
+from cddagl.zipwriter import (
+    DEFAULT_CODEC, available_codecs, codec_available, compress_files)
+from cddagl.backupstore import (
+    MANIFEST_EXT, BACKUP_EXTENSIONS, write_backup, extract_backup,
+    is_incremental, collect_garbage)
+
+# Update, backup and restore flows that do not depend on Qt. They are run by
+# the launcher window in worker threads and directly from the command line.
+# Long operations report their progress with a progress(stage, done, total,
+# name) callback.
+
+logger = logging.getLogger('cddagl')
+
+READ_BUFFER_SIZE = 16 * 1024
+EXE_READ_BUFFER_SIZE = 1024 * 1024
+
+# Seconds between two progress reports of the stages using worker threads
+PROGRESS_INTERVAL = 0.1
+
+EXTRACTION_WORKERS = max(1, min(8, os.cpu_count() or 1))
+PREALLOCATE_SIZE = 1024 * 1024
+COPY_WORKERS = 4
+COPY_BUFFER_SIZE = 8 * 1024 * 1024
+
+GAME_EXE_NAMES = ('cataclysm.exe', 'cataclysm-tiles.exe')
+
+BASE_URLS = {
+    'Tiles': {
+        'x64': ('http://dev.narc.ro/cataclysm/jenkins-latest/'
+            'Windows_x64/Tiles/'),
+        'x86': ('http://dev.narc.ro/cataclysm/jenkins-latest/Windows/Tiles/')
+    },
+    'Console': {
+        'x64': ('http://dev.narc.ro/cataclysm/jenkins-latest/'
+            'Windows_x64/Curses/'),
+        'x86': ('http://dev.narc.ro/cataclysm/jenkins-latest/Windows/Curses/')
+    }
+}
+
+# Player data carried over from one build to the next
+USER_DIRS = ('config', 'save', 'templates', 'memorial', 'graveyard',
+    'save_backups')
+
+
+class EngineError(Exception): pass
+
+class UpdateCancelled(EngineError): pass
+
+
+def set_translation(translation):
+    global _
+    _ = translation.gettext
+
+def safe_filename(filename):
+    keepcharacters = (' ', '.', '_', '-')
+    return ''.join(c for c in filename if c.isalnum() or c in keepcharacters
+        ).strip()
+
+# Parse a build listing page incrementally while it is being received. Each
+# table row is handled as soon as it is complete and then discarded.
+class BuildListingParser(object):
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.parser = etree.HTMLPullParser(events=('end',), tag='tr',
+            encoding='utf8')
+        self.builds = []
+
+    def feed(self, data):
+        self.parser.feed(data)
+        return self.read_builds()
+
+    def close(self):
+        try:
+            self.parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        self.read_builds()
+
+        builds = list(reversed(self.builds))
+        return builds
+
+    def read_builds(self):
+        new_builds = []
+        for event, row in self.parser.read_events():
+            build = self.parse_row(row)
+            row.clear()
+
+            if build is not None:
+                new_builds.append(build)
+                self.builds.append(build)
+
+        return new_builds
+
+    def parse_row(self, row):
+        build = {}
+        for index, cell in enumerate(row.iterchildren('td')):
+            if index == 1:
+                if (len(cell) > 0 and cell[0].text is not None
+                    and cell[0].text.startswith('cataclysmdda')):
+                    anchor = cell[0]
+                    url = urljoin(self.base_url, anchor.get('href'))
+                    name = anchor.text
+
+                    build_number = None
+                    match = re.search(
+                        'cataclysmdda-[01]\\.[A-F]-(?P<build>\d+)', name)
+                    if match is not None:
+                        build_number = match.group('build')
+
+                    build['url'] = url
+                    build['name'] = name
+                    build['number'] = build_number
+            elif index == 2:
+                # build date
+                str_date = (cell.text or '').strip()
+                if str_date != '':
+                    build_date = datetime.strptime(str_date,
+                        '%Y-%m-%d %H:%M')
+                    build['date'] = build_date
+
+        if 'url' in build:
+            return build
+        return None
+
+def parse_builds(html_file, base_url):
+    parser = BuildListingParser(base_url)
+    while True:
+        data = html_file.read(READ_BUFFER_SIZE)
+        if len(data) == 0:
+            break
+        parser.feed(data)
+    return parser.close()
+
+def tryint(s):
+    try:
+        return int(s)
+    except:
+        return s
+
+def alphanum_key(s):
+    """ Turn a string into a list of string and number chunks.
+        "z23a" -> ["z", 23, "a"]
+    """
+    return arstrip([tryint(c) for c in re.split('([0-9]+)', s)])
+
+def arstrip(value):
+    while len(value) > 1 and value[-1:] == ['']:
+        value = value[:-1]
+    return value
+
+def is_64_windows():
+    return 'PROGRAMFILES(X86)' in os.environ
+
+def remove_readonly(func, path, _):
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+def sibling_dir(path, suffix):
+    # Unused directory name next to path so that it is on the same volume
+    path = os.path.abspath(path)
+    while True:
+        candidate = '{0}-{1}-{2}'.format(path, suffix,
+            '%08x' % random.randrange(16**8))
+        if not os.path.exists(candidate):
+            return candidate
+
+def same_volume(path, other_path):
+    try:
+        return os.stat(path).st_dev == os.stat(other_path).st_dev
+    except OSError:
+        return False
+
+def asset_name(path, filename):
+    asset_file = os.path.join(path, filename)
+
+    if not os.path.isfile(asset_file):
+        disabled_asset_file = os.path.join(path, filename + '.disabled')
+        if not os.path.isfile(disabled_asset_file):
+            return None
+        else:
+            asset_file_path = disabled_asset_file
+    else:
+        asset_file_path = asset_file
+
+    try:
+        with open(asset_file_path, 'r') as f:
+            for line in f:
+                if line.startswith('NAME'):
+                    space_index = line.find(' ')
+                    name = line[space_index:].strip().replace(
+                        ',', '')
+                    return name
+    except FileNotFoundError:
+        return None
+    return None
+
+def mod_ident(path):
+    json_file = os.path.join(path, 'modinfo.json')
+    if not os.path.isfile(json_file):
+        json_file = os.path.join(path, 'modinfo.json.disabled')
+    if os.path.isfile(json_file):
+        try:
+            with open(json_file, 'r') as f:
+                try:
+                    values = json.load(f)
+                    if isinstance(values, dict):
+                        if values.get('type', '') == 'MOD_INFO':
+                            return values.get('ident', None)
+                    elif isinstance(values, list):
+                        for item in values:
+                            if (isinstance(item, dict)
+                                and item.get('type', '') == 'MOD_INFO'):
+                                    return item.get('ident', None)
+                except ValueError:
+                    pass
+        except FileNotFoundError:
+            return None
+
+    return None
+
+# Map the name of each asset found in directory to its path
+def scan_assets(directory, read_name):
+    assets = {}
+    for entry in os.listdir(directory):
+        entry_path = os.path.join(directory, entry)
+        if os.path.isdir(entry_path):
+            name = read_name(entry_path)
+            if name is not None and name not in assets:
+                assets[name] = entry_path
+    return assets
+
+# Where custom assets are found in a game directory and how they are named
+CUSTOM_ASSET_DIRS = {
+    'tilesets': (('gfx', ), lambda path: asset_name(path, 'tileset.txt')),
+    'soundpacks': (('data', 'sound'),
+        lambda path: asset_name(path, 'soundpack.txt')),
+    'mods': (('data', 'mods'), mod_ident),
+}
+
+# Find a backup filename which does not already exist or is the next backup
+# name based on an incremental counter placed at the end of the filename
+# without the extension.
+def backup_filename(backup_dir, name, ext='.zip'):
+    name_lower = name.lower()
+    name_key = alphanum_key(name_lower)
+    if len(name_key) > 1 and isinstance(name_key[-1:][0], int):
+        name_key = name_key[:-1]
+
+    duplicate_name = False
+    duplicate_basename = False
+    max_counter = 0
+
+    for entry in os.scandir(backup_dir):
+        filename, entry_ext = os.path.splitext(entry.name)
+        if entry.is_file() and entry_ext.lower() in BACKUP_EXTENSIONS:
+            filename_lower = filename.lower()
+
+            if filename_lower == name_lower:
+                duplicate_name = True
+            else:
+                filename_key = alphanum_key(filename_lower)
+
+                counter = filename_key[-1:][0]
+                if len(filename_key) > 1 and isinstance(counter, int):
+                    filename_key = filename_key[:-1]
+
+                    if name_key == filename_key:
+                        duplicate_basename = True
+                        max_counter = max(max_counter, counter)
+
+    if duplicate_basename:
+        name_key = alphanum_key(name)
+        if len(name_key) > 1 and isinstance(name_key[-1:][0], int):
+            name_key = name_key[:-1]
+
+        name_key.append(max_counter + 1)
+        backup_filename = ''.join(map(lambda x: str(x), name_key))
+    elif duplicate_name:
+        backup_filename = name + '2'
+    else:
+        backup_filename = name
+
+    return backup_filename + ext
+
+def backup_extension():
+    if config_true(get_config_value('incremental_backups', 'False')):
+        return MANIFEST_EXT
+    return '.zip'
+
+def backup_codec():
+    codec = get_config_value('backup_codec', DEFAULT_CODEC)
+    if not codec_available(codec):
+        codec = DEFAULT_CODEC
+    return codec
+
+def report(progress, stage, done, total, name=''):
+    if progress is not None:
+        progress(stage, done, total, name)
+
+def remove_path(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, onerror=remove_readonly)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+def default_game_dir():
+    if (getattr(sys, 'frozen', False)
+        and config_true(get_config_value('use_launcher_dir', 'False'))):
+        return os.path.dirname(os.path.abspath(os.path.realpath(
+            sys.executable)))
+
+    game_dir = get_config_value('game_directory')
+    if game_dir is None:
+        game_dir = os.path.join(os.path.dirname(os.path.realpath(
+            sys.executable)), 'cdda')
+    return game_dir
+
+def default_channel():
+    graphics = get_config_value('graphics')
+    if graphics not in BASE_URLS:
+        graphics = 'Tiles'
+
+    platform = get_config_value('platform')
+    if platform == 'Windows x64':
+        platform = 'x64'
+    elif platform == 'Windows x86':
+        platform = 'x86'
+
+    if platform not in ('x64', 'x86'):
+        if is_64_windows():
+            platform = 'x64'
+        else:
+            platform = 'x86'
+
+    return graphics, platform
+
+def fetch_builds(graphics, platform):
+    url = BASE_URLS[graphics][platform]
+    with urlopen(url) as response:
+        return parse_builds(response, url)
+
+def find_game_exe(game_dir):
+    for name in GAME_EXE_NAMES:
+        exe_path = os.path.join(game_dir, name)
+        if os.path.isfile(exe_path):
+            return exe_path
+    return None
+
+def identify_exe(exe_path, exe_digest=None):
+    # Returns the sha256 and the version of a game executable. It is only
+    # read again when it changed since the last time it was identified.
+    exe_stat = os.stat(exe_path)
+    identity = get_exe_identity(exe_path, exe_stat)
+    if identity is not None:
+        return identity['sha256'], identity['version']
+
+    version = read_version_resource(exe_path)
+    if exe_digest is None:
+        # The version resource only needs a few reads, fall back on scanning
+        # the whole executable when it is missing
+        exe_digest = ExeDigest(scan_version=version is None)
+        with open(exe_path, 'rb') as exe_file:
+            while True:
+                data = exe_file.read(EXE_READ_BUFFER_SIZE)
+                if len(data) == 0:
+                    break
+                exe_digest.update(data)
+    if version is None:
+        version = exe_digest.version
+
+    sha256 = exe_digest.hexdigest()
+    set_exe_identity(exe_path, exe_stat, sha256, version)
+    return sha256, version
+
+def installed_build(game_dir):
+    exe_path = find_game_exe(game_dir)
+    if exe_path is None:
+        return None
+
+    sha256, version = identify_exe(exe_path)
+    build = get_build_from_sha256(sha256)
+    if build is None:
+        return None
+    return build['build']
+
+def launcher_temp_dir():
+    temp_dir = os.path.join(tempfile.gettempdir(), 'CDDA Game Launcher')
+    if not os.path.isdir(temp_dir):
+        os.makedirs(temp_dir)
+    return temp_dir
+
+def partial_download_dir(temp_dir, url):
+    # Partial downloads are kept in a directory named after their url so
+    # they can be found again and resumed
+    url_key = hashlib.sha256(url.encode('utf8')).hexdigest()[:16]
+    return os.path.join(temp_dir, 'partial-{0}'.format(url_key))
+
+def remove_partial_downloads(temp_dir, keep):
+    # Only the partial download of the build being downloaded can still be
+    # resumed, the others would never be cleaned up. Other directories in
+    # temp_dir can belong to another launcher running an update.
+    for entry in os.scandir(temp_dir):
+        if (entry.name.startswith('partial-') and entry.is_dir()
+            and entry.path != keep):
+            try:
+                shutil.rmtree(entry.path, onerror=remove_readonly)
+            except OSError:
+                pass
+
+def remove_tree_quietly(path):
+    try:
+        shutil.rmtree(path, onerror=remove_readonly)
+    except OSError:
+        pass
+
+def log_stage(stage, started):
+    logger.info(_('Update stage {stage} took {seconds:.2f} seconds').format(
+        stage=stage, seconds=time.perf_counter() - started))
+
+def excluded_entries(game_dir):
+    excluded = set(['previous_version'])
+    if config_true(get_config_value('prevent_save_move', 'False')):
+        excluded.add('save')
+    # Prevent moving the launcher if it's in the game directory
+    if getattr(sys, 'frozen', False):
+        launcher_exe = os.path.abspath(sys.executable)
+        launcher_dir = os.path.dirname(launcher_exe)
+        if os.path.abspath(game_dir) == launcher_dir:
+            excluded.add(os.path.basename(launcher_exe))
+    return excluded
+
+def carried_user_dirs():
+    user_dirs = list(USER_DIRS)
+    if config_true(get_config_value('prevent_save_move', 'False')):
+        user_dirs.remove('save')
+    return user_dirs
+
+def create_staging_dir(game_dir):
+    game_dir = os.path.abspath(game_dir)
+
+    # A new installation or a game directory at the root of a drive is
+    # extracted in place
+    if (os.path.dirname(game_dir) == game_dir
+        or len(os.listdir(game_dir)) == 0):
+        return None
+
+    # The launcher directory cannot be renamed while we are running
+    if getattr(sys, 'frozen', False):
+        launcher_dir = os.path.dirname(os.path.abspath(sys.executable))
+        if (launcher_dir == game_dir
+            or launcher_dir.startswith(game_dir + os.sep)):
+            return None
+
+    staging_dir = sibling_dir(game_dir, 'staging')
+    os.makedirs(staging_dir)
+    return staging_dir
+
+
+# Extract the members of a build archive with a pool of threads. Each thread
+# reads the archive through its own ZipFile handle. Unchanged members are
+# linked from previous_dir and the extracted ones, which an interrupted update
+# already wrote, are only checked.
+class BuildExtractor(object):
+    def __init__(self, open_archive, infolist, target_dir,
+        unchanged=frozenset(), previous_dir=None, extracted=frozenset(),
+        cancelled=None):
+        self.open_archive = open_archive
+        self.infolist = infolist
+        self.target_dir = target_dir
+        self.unchanged = unchanged
+        self.previous_dir = previous_dir
+        self.extracted = extracted
+        self.cancelled = cancelled
+        self.extracted_members = []
+        self.exe_digests = {}
+        self.targets = {}
+        self.total_size = sum(info.file_size for info in infolist)
+        self.extracted_size = 0
+        self.current_name = ''
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.archives = []
+        self.stopping = False
+
+    def is_cancelled(self):
+        return self.cancelled is not None and self.cancelled()
+
+    def run(self, tick=None):
+        # tick is called at regular intervals while the workers extract
+        try:
+            self.create_directories()
+
+            # Start with the largest members so that the workers finish at
+            # about the same time
+            members = sorted((info for info in self.infolist
+                if not info.is_dir()), key=lambda info: info.file_size,
+                reverse=True)
+
+            executor = ThreadPoolExecutor(max_workers=EXTRACTION_WORKERS)
+            with executor:
+                futures = [executor.submit(self.extract_member, info)
+                    for info in members]
+
+                pending = futures
+                while len(pending) > 0:
+                    done, pending = wait_futures(pending,
+                        timeout=PROGRESS_INTERVAL)
+                    if any(future.exception() is not None for future in done):
+                        # Stop the other workers as soon as possible
+                        self.stopping = True
+                    if self.is_cancelled():
+                        self.stopping = True
+                    if tick is not None:
+                        tick()
+
+            for future in futures:
+                if future.exception() is not None:
+                    raise future.exception()
+        finally:
+            for archive in self.archives:
+                archive.close()
+
+        if self.is_cancelled():
+            raise UpdateCancelled(_('Update cancelled'))
+
+    def create_directories(self):
+        directories = set()
+        for info in self.infolist:
+            target = member_target(self.target_dir, info.filename)
+            self.targets[info.filename] = target
+            if target is None:
+                continue
+            if info.is_dir():
+                directories.add(target)
+            else:
+                directories.add(os.path.dirname(target))
+
+        for directory in sorted(directories):
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+
+    def archive(self):
+        archive = getattr(self.local, 'archive', None)
+        if archive is None:
+            archive = self.open_archive()
+            self.local.archive = archive
+            with self.lock:
+                self.archives.append(archive)
+        return archive
+
+    def add_progress(self, size):
+        with self.lock:
+            self.extracted_size += size
+
+    def extract_member(self, info):
+        if self.stopping:
+            return
+
+        self.current_name = info.filename
+
+        target = self.targets[info.filename]
+        if (info.filename in self.extracted and target is not None
+            and os.path.isfile(target)
+            and os.path.getsize(target) == info.file_size):
+            self.add_progress(info.file_size)
+            return
+
+        if info.filename in self.unchanged:
+            # Link the file from the previous version since it did not change
+            source = os.path.join(self.previous_dir, info.filename)
+            link_or_copy(source, target)
+            self.add_progress(info.file_size)
+        elif target is None:
+            # Let zipfile sanitize unusual names
+            self.archive().extract(info, self.target_dir)
+            self.add_progress(info.file_size)
+        else:
+            if not self.write_member(info, target):
+                return
+
+        with self.lock:
+            self.extracted_members.append(info.filename)
+
+    def write_member(self, info, target):
+        # Hash the executable while it is being written so that it does not
+        # need to be read again when analysing the new build
+        exe_digest = None
+        if info.filename in GAME_EXE_NAMES:
+            exe_digest = ExeDigest()
+
+        with self.archive().open(info) as source:
+            with open(target, 'wb') as destination:
+                if info.file_size >= PREALLOCATE_SIZE:
+                    # Reserve the space at once to limit fragmentation
+                    destination.truncate(info.file_size)
+
+                while not self.stopping:
+                    data = source.read(EXE_READ_BUFFER_SIZE)
+                    if len(data) == 0:
+                        break
+
+                    if exe_digest is not None:
+                        exe_digest.update(data)
+                    destination.write(data)
+                    self.add_progress(len(data))
+
+        if self.stopping:
+            return False
+
+        if exe_digest is not None:
+            with self.lock:
+                self.exe_digests[info.filename] = exe_digest
+
+        return True
+
+
+# Copy a directory tree. Small files are copied concurrently and large files
+# with big buffers or the kernel copy primitives. With link, files are
+# hardlinked instead as long as the file system allows it.
+class TreeCopy(object):
+    def __init__(self, src, dst, link=False, cancelled=None):
+        self.src = src
+        self.dst = dst
+        self.link = link
+        self.cancelled = cancelled
+        self.kernel_copy = hasattr(os, 'copy_file_range')
+
+        self.total_files = 0
+        self.total_copy_size = 0
+        self.copied_files = 0
+        self.copied_size = 0
+        self.current_entry = ''
+        self.lock = threading.Lock()
+        self.stopping = False
+
+    def is_cancelled(self):
+        return self.cancelled is not None and self.cancelled()
+
+    def run(self, tick=None):
+        directories, files = self.scan()
+
+        os.makedirs(self.dst)
+        for directory in directories:
+            os.makedirs(os.path.join(self.dst, directory))
+
+        # Start with the largest files so that the workers finish at about
+        # the same time
+        files.sort(key=lambda file: file[1], reverse=True)
+
+        executor = ThreadPoolExecutor(max_workers=COPY_WORKERS)
+        with executor:
+            futures = [executor.submit(self.copy_file, relpath, size)
+                for relpath, size in files]
+
+            pending = futures
+            while len(pending) > 0:
+                done, pending = wait_futures(pending,
+                    timeout=PROGRESS_INTERVAL)
+                if any(future.exception() is not None for future in done):
+                    # Stop the other workers as soon as possible
+                    self.stopping = True
+                if self.is_cancelled():
+                    self.stopping = True
+                if tick is not None:
+                    tick()
+
+        for future in futures:
+            if future.exception() is not None:
+                raise future.exception()
+
+        if self.is_cancelled():
+            raise UpdateCancelled(_('Update cancelled'))
+
+    def scan(self):
+        directories = []
+        files = []
+
+        next_scans = deque([self.src])
+        while len(next_scans) > 0:
+            for entry in os.scandir(next_scans.popleft()):
+                relpath = os.path.relpath(entry.path, self.src)
+                if entry.is_dir():
+                    directories.append(relpath)
+                    next_scans.append(entry.path)
+                elif entry.is_file():
+                    size = entry.stat().st_size
+                    files.append((relpath, size))
+                    self.total_files += 1
+                    self.total_copy_size += size
+
+        return directories, files
+
+    def add_progress(self, size):
+        with self.lock:
+            self.copied_size += size
+
+    def copy_file(self, relpath, size):
+        if self.stopping:
+            return
+
+        self.current_entry = relpath
+        src_path = os.path.join(self.src, relpath)
+        dst_path = os.path.join(self.dst, relpath)
+
+        if self.link:
+            try:
+                os.link(src_path, dst_path)
+                self.add_progress(size)
+                return
+            except OSError:
+                # The file system does not support hardlinks, copy the
+                # remaining files instead
+                self.link = False
+
+        with open(src_path, 'rb') as source_file:
+            with open(dst_path, 'wb') as destination_file:
+                while not self.stopping:
+                    copied = self.copy_chunk(source_file, destination_file)
+                    if copied == 0:
+                        break
+                    self.add_progress(copied)
+
+        shutil.copystat(src_path, dst_path)
+
+        with self.lock:
+            self.copied_files += 1
+
+    def copy_chunk(self, source_file, destination_file):
+        if self.kernel_copy:
+            try:
+                return os.copy_file_range(source_file.fileno(),
+                    destination_file.fileno(), COPY_BUFFER_SIZE)
+            except OSError:
+                # Not supported between these files, use plain reads and
+                # writes from now on
+                self.kernel_copy = False
+
+        data = source_file.read(COPY_BUFFER_SIZE)
+        destination_file.write(data)
+        return len(data)
+
+
+# Download a build and install it in a game directory. This is the update
+# run by both the launcher window and the command line. Every stage is
+# written in the update journal so that an update interrupted by a crash or
+# a closed launcher can be resumed or rolled back. Progress is reported with
+# progress(stage, done, total, name) and the update stops as soon as
+# cancelled() returns True.
+class GameUpdate(object):
+    def __init__(self, game_dir, build, progress=None, cancelled=None):
+        self.game_dir = game_dir
+        self.build = build
+        self.progress = progress
+        self.cancelled = cancelled
+
+        self.download_dir = None
+        self.archive_path = None
+        self.from_cache = False
+        self.delta_download = None
+        self.staging_dir = None
+        self.staged_switch = False
+        self.exe_digests = {}
+
+        self.exe_path = None
+        self.sha256 = None
+        self.version = None
+
+        self.asset_scan = None
+        self.current_assets = {}
+        self.removers = []
+        self.stage_starts = {}
+
+        # The update journal is kept when the game directory could not be
+        # put back in a consistent state
+        self.consistent = True
+
+    @classmethod
+    def from_journal(cls, journal, progress=None, cancelled=None):
+        build = {
+            'url': journal['url'],
+            'number': journal['build'],
+            'date': journal['build_date']
+        }
+        update = cls(journal['game_dir'], build, progress, cancelled)
+        update.archive_path = journal['archive_path']
+        update.download_dir = os.path.dirname(journal['archive_path'])
+        return update
+
+    def is_cancelled(self):
+        return self.cancelled is not None and self.cancelled()
+
+    def check_cancelled(self):
+        if self.is_cancelled():
+            raise UpdateCancelled(_('Update cancelled'))
+
+    def report(self, stage, done, total, name=''):
+        report(self.progress, stage, done, total, name)
+
+    def begin_stage(self, stage):
+        self.stage_starts[stage] = time.perf_counter()
+
+    def end_stage(self, stage):
+        started = self.stage_starts.pop(stage, None)
+        if started is not None:
+            log_stage(stage, started)
+
+    def run(self):
+        self.begin_stage('update')
+        try:
+            self.start()
+        except BaseException as e:
+            self.interrupted(e)
+            raise
+        finally:
+            self.finish()
+
+    def resume(self, journal):
+        self.begin_stage('update')
+        try:
+            self.resume_stage(journal)
+        except BaseException as e:
+            self.interrupted(e)
+            raise
+        finally:
+            self.finish()
+
+    def interrupted(self, error):
+        # Nothing was rolled back when the update was interrupted by a
+        # KeyboardInterrupt or SystemExit, keep the journal so that it can be
+        # resumed or rolled back the next time
+        if not isinstance(error, Exception):
+            self.consistent = False
+
+    def finish(self):
+        for remover in self.removers:
+            remover.join()
+            if os.path.isdir(remover.name):
+                logger.warning(_('Could not remove {path}').format(
+                    path=remover.name))
+        self.removers = []
+
+        if self.asset_scan is not None:
+            self.asset_scan.join()
+
+        self.end_stage('update')
+        self.stage_starts = {}
+
+        if self.consistent:
+            delete_update_journal()
+
+    def roll_back(self, rollback):
+        try:
+            rollback()
+        except OSError:
+            self.consistent = False
+            raise
+
+    def start(self):
+        if not os.path.exists(self.game_dir):
+            os.makedirs(self.game_dir)
+        elif os.path.isfile(self.game_dir):
+            raise EngineError(_('Cannot install game on a file'))
+
+        url = self.build['url']
+
+        temp_dir = launcher_temp_dir()
+        self.download_dir = partial_download_dir(temp_dir, url)
+        remove_partial_downloads(temp_dir, self.download_dir)
+        if not os.path.isdir(self.download_dir):
+            os.makedirs(self.download_dir)
+
+        self.archive_path = os.path.join(self.download_dir,
+            os.path.basename(urlparse(url).path))
+
+        start_update_journal(self.game_dir, url, self.build['number'],
+            self.build.get('date'), self.archive_path, False)
+
+        # Look for the custom assets of the current version while the new
+        # build is being downloaded
+        if find_game_exe(self.game_dir) is not None:
+            self.scan_current_assets()
+
+        self.download()
+        self.install()
+
+    def resume_stage(self, journal):
+        stage = journal['stage']
+        staged = journal['staging_dir'] is not None
+
+        # Partial archives from delta updates are not kept, download what is
+        # needed again
+        if stage in ('downloaded', 'backing_up', 'extracting') and (
+            journal['delta'] or not os.path.isfile(journal['archive_path'])):
+            self.roll_back(lambda: self.rollback_partial_install(journal))
+            stage = 'download'
+
+        if stage == 'download':
+            self.start()
+        elif stage == 'downloaded':
+            self.test_archive()
+            self.install()
+        elif stage == 'backing_up':
+            self.roll_back(self.restore_backup)
+            self.test_archive()
+            self.install()
+        elif stage == 'extracting':
+            if staged:
+                self.staging_dir = journal['staging_dir']
+                if not os.path.isdir(self.staging_dir):
+                    os.makedirs(self.staging_dir)
+            self.extract(get_update_journal_members())
+            self.install_extracted()
+        elif stage == 'switching' and not self.recover_staged_switch(journal):
+            self.staging_dir = journal['staging_dir']
+            self.install_extracted()
+        else:
+            if journal['copying_dir'] is not None:
+                # The directory was only partially copied
+                copying_dir = os.path.join(self.game_dir,
+                    journal['copying_dir'])
+                if os.path.isdir(os.path.join(self.game_dir,
+                    'previous_version', journal['copying_dir'])):
+                    remove_path(copying_dir)
+
+            self.staged_switch = staged
+
+            set_update_journal_values(stage='analysing', copying_dir=None)
+            self.complete()
+
+    def scan_current_assets(self):
+        def scan():
+            started = time.perf_counter()
+            for kind, (path, read_name) in CUSTOM_ASSET_DIRS.items():
+                directory = os.path.join(self.game_dir, *path)
+                if not os.path.isdir(directory):
+                    continue
+
+                try:
+                    assets = scan_assets(directory, read_name)
+                except OSError:
+                    continue
+
+                self.current_assets[kind] = dict((name,
+                    os.path.basename(entry_path))
+                    for name, entry_path in assets.items())
+            log_stage('asset scan', started)
+
+        self.asset_scan = threading.Thread(target=scan)
+        self.asset_scan.start()
+
+    def previous_assets(self, kind, previous_dir):
+        # Use what was found while the new build was downloading when it
+        # still matches the content of previous_version
+        if (self.asset_scan is not None and not self.asset_scan.is_alive()
+            and kind in self.current_assets):
+            assets = dict((name, os.path.join(previous_dir, entry))
+                for name, entry in self.current_assets[kind].items())
+            if all(os.path.isdir(path) for path in assets.values()):
+                return assets
+
+        return scan_assets(previous_dir, CUSTOM_ASSET_DIRS[kind][1])
+
+    def discard_directory(self, path):
+        # Move the directory out of the way and remove it in the background
+        # while the update goes on
+        try:
+            discarded_dir = sibling_dir(self.game_dir, 'discarded')
+            os.rename(path, discarded_dir)
+        except OSError:
+            remove_path(path)
+            return
+
+        remover = threading.Thread(target=remove_tree_quietly,
+            args=(discarded_dir,), name=discarded_dir)
+        self.removers.append(remover)
+        remover.start()
+
+    def download(self):
+        self.begin_stage('download')
+        url = self.build['url']
+
+        def progress(done, total):
+            self.report('download', done, total, url)
+
+        # Reuse a previously downloaded archive when we have one
+        self.from_cache = fetch_cached_archive(url, self.archive_path)
+        if not self.from_cache:
+            # Only fetch what changed when we know what is installed and
+            # there is no full download to resume
+            manifest = None
+            if (config_true(get_config_value('delta_updates', 'False'))
+                and read_download_journal(self.download_dir) is None):
+                manifest = read_manifest(self.game_dir)
+
+            try:
+                if manifest is not None:
+                    set_update_journal_values(delta=True)
+                    try:
+                        self.delta_download = DeltaDownload(url,
+                            self.archive_path, manifest, self.game_dir,
+                            progress, self.cancelled)
+                        self.delta_download.run()
+                    except DeltaUnsupported:
+                        # Download the whole archive instead
+                        self.delta_download = None
+                        if os.path.isfile(self.archive_path):
+                            os.remove(self.archive_path)
+                        set_update_journal_values(delta=False)
+
+                if self.delta_download is None:
+                    connections = int(get_config_value(
+                        'download_connections', '1'))
+                    download_file(url, self.archive_path, connections,
+                        progress, self.cancelled)
+            except DownloadCancelled:
+                # Keep what we have so far, the next attempt will resume it.
+                # Delta downloads cannot be resumed.
+                if self.delta_download is not None:
+                    remove_path(self.download_dir)
+                raise UpdateCancelled(_('Update cancelled'))
+            except DownloadFailed as e:
+                logger.warning(_('Could not download {url}: {error}').format(
+                    url=url, error=str(e)))
+
+                # Only keep partial downloads that can be resumed
+                if not e.resumable or self.delta_download is not None:
+                    remove_path(self.download_dir)
+                raise EngineError(_('Could not download game'))
+
+        self.end_stage('download')
+
+        if self.delta_download is None:
+            self.test_archive()
+
+    def open_archive(self):
+        if self.delta_download is not None:
+            return self.delta_download.open_archive()
+        return zipfile.ZipFile(self.archive_path)
+
+    def test_archive(self):
+        # Only make sure the archive can be opened here. The content of each
+        # member is checked against its CRC while it is being extracted so
+        # that the archive is only inflated once.
+        try:
+            with self.open_archive() as z:
+                z.infolist()
+        except (zipfile.BadZipFile, OSError):
+            if self.from_cache:
+                discard_cached_archive(self.build['url'])
+            remove_path(self.download_dir)
+            raise EngineError(_('Could not download game'))
+
+        set_update_journal_values(stage='downloaded')
+
+    def install(self):
+        if config_true(get_config_value('staged_install', 'False')):
+            self.staging_dir = create_staging_dir(self.game_dir)
+
+        if self.staging_dir is not None:
+            # The current game stays untouched until the new build is ready
+            set_update_journal_values(staging_dir=self.staging_dir)
+        else:
+            self.backup()
+
+        self.extract()
+        self.install_extracted()
+
+    def backup(self):
+        self.begin_stage('backup')
+        set_update_journal_values(stage='backing_up')
+
+        previous_version_dir = os.path.join(self.game_dir, 'previous_version')
+        if os.path.isdir(previous_version_dir):
+            self.discard_directory(previous_version_dir)
+
+        excluded = excluded_entries(self.game_dir)
+        entries = [entry for entry in os.listdir(self.game_dir)
+            if entry not in excluded]
+
+        try:
+            if len(entries) > 0:
+                os.makedirs(previous_version_dir)
+            for index, entry in enumerate(entries):
+                self.check_cancelled()
+                self.report('backup', index, len(entries), entry)
+                shutil.move(os.path.join(self.game_dir, entry),
+                    previous_version_dir)
+        except Exception:
+            self.roll_back(self.restore_backup)
+            raise
+
+        if len(entries) > 0:
+            self.report('backup', len(entries), len(entries))
+        self.end_stage('backup')
+
+    def extract(self, extracted=frozenset()):
+        self.begin_stage('extraction')
+
+        # Members already extracted before the update was interrupted are
+        # only checked again
+        set_update_journal_values(stage='extracting')
+
+        if self.delta_download is not None:
+            unchanged = self.delta_download.unchanged
+        else:
+            unchanged = set()
+
+        if self.staging_dir is not None:
+            target_dir = self.staging_dir
+            previous_dir = self.game_dir
+        else:
+            target_dir = self.game_dir
+            previous_dir = os.path.join(self.game_dir, 'previous_version')
+
+        try:
+            with self.open_archive() as z:
+                infolist = z.infolist()
+
+            extractor = BuildExtractor(self.open_archive, infolist,
+                target_dir, unchanged, previous_dir, extracted,
+                self.cancelled)
+            journaled_members = [0]
+
+            def tick():
+                self.report('extract', extractor.extracted_size,
+                    extractor.total_size, extractor.current_name)
+
+                extracted_members = extractor.extracted_members
+                count = len(extracted_members)
+                add_update_journal_members(
+                    extracted_members[journaled_members[0]:count])
+                journaled_members[0] = count
+
+            extractor.run(tick)
+            tick()
+        except UpdateCancelled:
+            remove_path(self.download_dir)
+            self.roll_back(self.rollback_new_build)
+            raise
+        except (zipfile.BadZipFile, zlib.error, EOFError):
+            self.invalid_build()
+            raise EngineError(_('Downloaded archive is invalid'))
+        except Exception:
+            # Whatever went wrong, the previous version is put back
+            self.invalid_build()
+            raise
+
+        self.exe_digests = extractor.exe_digests
+        write_manifest(target_dir, infolist)
+
+        # Keep a copy of the archive if selected in the settings
+        if not self.from_cache and self.delta_download is None:
+            store_archive(self.archive_path, self.build['url'],
+                self.build['number'])
+
+        remove_path(self.download_dir)
+
+        self.end_stage('extraction')
+
+    def invalid_build(self):
+        # Remove what was extracted so far and put the previous version back
+        # in place
+        if self.from_cache:
+            discard_cached_archive(self.build['url'])
+
+        remove_path(self.download_dir)
+
+        def rollback():
+            if self.staging_dir is not None:
+                remove_path(self.staging_dir)
+                self.staging_dir = None
+            else:
+                path = self.clean_game_dir()
+                self.restore_backup()
+                if path is not None:
+                    remove_path(path)
+
+        self.roll_back(rollback)
+
+    def install_extracted(self):
+        if self.staging_dir is not None:
+            set_update_journal_values(stage='switching')
+            try:
+                self.switch_staged_build()
+            except OSError as e:
+                remove_path(self.staging_dir)
+                self.staging_dir = None
+
+                raise EngineError(_('Could not install the new build: '
+                    '{error}').format(error=str(e)))
+
+        set_update_journal_values(stage='analysing')
+        self.complete()
+
+    def complete(self):
+        try:
+            self.analyse()
+            if self.exe_path is not None:
+                self.post_extraction()
+        except Exception:
+            self.roll_back(self.rollback_new_build)
+            raise
+
+        if self.exe_path is None:
+            raise EngineError(_('No executable found in the downloaded '
+                'archive. You might want to restore your previous version.'))
+
+    def analyse(self):
+        self.begin_stage('analysis')
+
+        self.exe_path = find_game_exe(self.game_dir)
+        if self.exe_path is None:
+            return
+
+        self.report('analysis', 0, 1, self.exe_path)
+
+        # The executable might already have been hashed while it was
+        # extracted
+        exe_digest = self.exe_digests.get(os.path.basename(self.exe_path))
+        self.sha256, self.version = identify_exe(self.exe_path, exe_digest)
+
+        if self.build.get('date') is not None:
+            new_build(self.version, self.sha256, self.build['number'],
+                self.build['date'])
+
+        self.report('analysis', 1, 1, self.exe_path)
+        self.end_stage('analysis')
+
+    def post_extraction(self):
+        self.begin_stage('post extraction')
+        set_update_journal_values(stage='post_extraction')
+
+        previous_version_dir = os.path.join(self.game_dir, 'previous_version')
+        if not os.path.isdir(previous_version_dir):
+            # New install
+            return
+
+        # Hardlink the files when both directories are on the same volume so
+        # that previous_version keeps its own copy without having to
+        # duplicate the data
+        link = same_volume(previous_version_dir, self.game_dir)
+
+        # Copy config, save, templates and memorial directory from previous
+        # version
+        for entry in carried_user_dirs():
+            self.check_cancelled()
+
+            source = os.path.join(previous_version_dir, entry)
+            target = os.path.join(self.game_dir, entry)
+            if os.path.isdir(source) and not os.path.exists(target):
+                set_update_journal_values(copying_dir=entry)
+                self.copy_tree(source, target, entry, link)
+        set_update_journal_values(copying_dir=None)
+
+        self.restore_custom_assets(previous_version_dir)
+
+        self.end_stage('post extraction')
+
+    def copy_tree(self, src, dst, name, link=False):
+        tree_copy = TreeCopy(src, dst, link, self.cancelled)
+
+        def tick():
+            self.report('copy', tree_copy.copied_size,
+                tree_copy.total_copy_size, name)
+
+        tree_copy.run(tick)
+
+    def restore_custom_assets(self, previous_version_dir):
+        # Copy custom tilesets, soundpacks and mods from previous version
+        for kind, (path, read_name) in CUSTOM_ASSET_DIRS.items():
+            assets_dir = os.path.join(self.game_dir, *path)
+            previous_assets_dir = os.path.join(previous_version_dir, *path)
+            if not (os.path.isdir(assets_dir)
+                and os.path.isdir(previous_assets_dir)):
+                continue
+
+            self.check_cancelled()
+            self.report('assets', 0, 0, kind)
+
+            official_set = scan_assets(assets_dir, read_name)
+            previous_set = self.previous_assets(kind, previous_assets_dir)
+            for name in set(previous_set.keys()) - set(official_set.keys()):
+                self.check_cancelled()
+
+                target_dir = os.path.join(assets_dir, os.path.basename(
+                    previous_set[name]))
+                if not os.path.exists(target_dir):
+                    self.copy_tree(previous_set[name], target_dir, name)
+
+        # Copy user-default-mods.json if present
+        user_default_mods_file = os.path.join(self.game_dir, 'data', 'mods',
+            'user-default-mods.json')
+        previous_user_default_mods_file = os.path.join(previous_version_dir,
+            'data', 'mods', 'user-default-mods.json')
+        if (not os.path.exists(user_default_mods_file)
+            and os.path.isfile(previous_user_default_mods_file)
+            and os.path.isdir(os.path.dirname(user_default_mods_file))):
+            shutil.copy2(previous_user_default_mods_file,
+                user_default_mods_file)
+
+        # Copy custom fonts
+        fonts_dir = os.path.join(self.game_dir, 'data', 'font')
+        previous_fonts_dir = os.path.join(previous_version_dir, 'data',
+            'font')
+        if os.path.isdir(fonts_dir) and os.path.isdir(previous_fonts_dir):
+            self.report('assets', 0, 0, 'fonts')
+
+            official_set = set(os.listdir(fonts_dir))
+            for entry in set(os.listdir(previous_fonts_dir)) - official_set:
+                source = os.path.join(previous_fonts_dir, entry)
+                target = os.path.join(fonts_dir, entry)
+                if os.path.isfile(source):
+                    shutil.copy2(source, target)
+                elif os.path.isdir(source):
+                    shutil.copytree(source, target)
+
+    def clean_game_dir(self):
+        # Move what was extracted out of the way. Returns where it was moved.
+        excluded = excluded_entries(self.game_dir)
+        entries = [entry for entry in os.listdir(self.game_dir)
+            if entry not in excluded]
+        if len(entries) == 0:
+            return None
+
+        moved_dir = sibling_dir(self.game_dir, 'moved')
+        os.makedirs(moved_dir)
+        for entry in entries:
+            shutil.move(os.path.join(self.game_dir, entry), moved_dir)
+
+        return moved_dir
+
+    def restore_previous_content(self, path):
+        if path is None:
+            return
+
+        previous_version_dir = os.path.join(self.game_dir, 'previous_version')
+        if not os.path.exists(previous_version_dir):
+            os.makedirs(previous_version_dir)
+
+        for entry in os.listdir(path):
+            shutil.move(os.path.join(path, entry), previous_version_dir)
+        os.rmdir(path)
+
+    def restore_backup(self):
+        previous_version_dir = os.path.join(self.game_dir, 'previous_version')
+        if not (os.path.isdir(previous_version_dir)
+            and os.path.isdir(self.game_dir)):
+            return
+
+        prevent_save_move = config_true(get_config_value('prevent_save_move',
+            'False'))
+        for entry in os.listdir(previous_version_dir):
+            if entry == 'save' and prevent_save_move:
+                continue
+            shutil.move(os.path.join(previous_version_dir, entry),
+                self.game_dir)
+
+        remove_path(previous_version_dir)
+
+    def switch_staged_build(self):
+        # Replace the game directory with the staged build using renames
+        game_dir = self.game_dir
+        staging_dir = self.staging_dir
+
+        previous_version_dir = os.path.join(game_dir, 'previous_version')
+        if os.path.isdir(previous_version_dir):
+            self.discard_directory(previous_version_dir)
+
+        moved_dirs = []
+        try:
+            for entry in carried_user_dirs():
+                source = os.path.join(game_dir, entry)
+                target = os.path.join(staging_dir, entry)
+                if os.path.exists(source) and not os.path.exists(target):
+                    os.rename(source, target)
+                    moved_dirs.append(entry)
+
+            old_dir = sibling_dir(game_dir, 'previous')
+            set_update_journal_values(old_dir=old_dir)
+            os.rename(game_dir, old_dir)
+            try:
+                os.rename(staging_dir, game_dir)
+            except OSError:
+                os.rename(old_dir, game_dir)
+                raise
+        except OSError:
+            for entry in moved_dirs:
+                os.rename(os.path.join(staging_dir, entry),
+                    os.path.join(game_dir, entry))
+            raise
+
+        self.staging_dir = None
+        self.staged_switch = True
+
+        os.rename(old_dir, previous_version_dir)
+
+    def unswitch_staged_build(self):
+        # Put the previous build and its player data back in place
+        game_dir = self.game_dir
+        previous_version_dir = os.path.join(game_dir, 'previous_version')
+        if not os.path.isdir(previous_version_dir):
+            return
+
+        for entry in USER_DIRS:
+            source = os.path.join(game_dir, entry)
+            target = os.path.join(previous_version_dir, entry)
+            if os.path.exists(source) and not os.path.exists(target):
+                os.rename(source, target)
+
+        discarded_dir = sibling_dir(game_dir, 'discarded')
+        os.rename(game_dir, discarded_dir)
+        os.rename(os.path.join(discarded_dir, 'previous_version'), game_dir)
+        remove_path(discarded_dir)
+
+        self.staged_switch = False
+
+    def rollback_new_build(self):
+        if self.staging_dir is not None:
+            remove_path(self.staging_dir)
+            self.staging_dir = None
+        elif self.staged_switch:
+            self.unswitch_staged_build()
+        else:
+            path = self.clean_game_dir()
+            self.restore_backup()
+            self.restore_previous_content(path)
+
+    def recover_staged_switch(self, journal):
+        # Undo a directory switch that did not complete. Returns True if the
+        # staged build was already in place.
+        game_dir = journal['game_dir']
+        staging_dir = journal['staging_dir']
+        old_dir = journal['old_dir']
+
+        if old_dir is not None and os.path.isdir(old_dir):
+            if not os.path.exists(game_dir):
+                os.rename(old_dir, game_dir)
+            elif not os.path.exists(staging_dir):
+                os.rename(old_dir, os.path.join(game_dir, 'previous_version'))
+                return True
+
+        if not os.path.isdir(staging_dir):
+            return True
+
+        for entry in USER_DIRS:
+            source = os.path.join(staging_dir, entry)
+            target = os.path.join(game_dir, entry)
+            if os.path.exists(source) and not os.path.exists(target):
+                os.rename(source, target)
+
+        return False
+
+    def rollback_partial_install(self, journal):
+        # Put the game directory back the way it was before the update
+        stage = journal['stage']
+        staged = journal['staging_dir'] is not None
+
+        if stage == 'backing_up':
+            self.restore_backup()
+        elif staged and stage in ('extracting', 'switching'):
+            if self.recover_staged_switch(journal):
+                self.unswitch_staged_build()
+            else:
+                remove_path(journal['staging_dir'])
+        elif staged and stage in ('analysing', 'post_extraction'):
+            self.unswitch_staged_build()
+        elif stage in ('extracting', 'analysing', 'post_extraction'):
+            path = self.clean_game_dir()
+            self.restore_backup()
+            self.restore_previous_content(path)
+
+def update_game(game_dir, build, progress=None, cancelled=None):
+    update = GameUpdate(game_dir, build, progress, cancelled)
+    update.run()
+    return update
+
+def resume_update(journal, progress=None, cancelled=None):
+    update = GameUpdate.from_journal(journal, progress, cancelled)
+    update.resume(journal)
+    return update
+
+def rollback_update(journal):
+    # Put the game directory back the way it was before an interrupted update
+    update = GameUpdate.from_journal(journal)
+    update.rollback_partial_install(journal)
+
+    if os.path.isdir(update.download_dir):
+        remove_path(update.download_dir)
+
+    delete_update_journal()
+
+def backup_saves(game_dir, name, single=False, progress=None):
+    name = safe_filename(name)
+    if name == '':
+        raise EngineError(_('Invalid backup name'))
+
+    save_dir = os.path.join(game_dir, 'save')
+    if not os.path.isdir(save_dir):
+        raise EngineError(_('Save directory not found'))
+
+    backup_dir = os.path.join(game_dir, 'save_backups')
+    if not os.path.isdir(backup_dir):
+        if os.path.isfile(backup_dir):
+            os.remove(backup_dir)
+        os.makedirs(backup_dir)
+
+    ext = backup_extension()
+    replaced_incremental = False
+    if single:
+        # Replace the previous backup whatever its format was
+        for previous_ext in BACKUP_EXTENSIONS:
+            previous_path = os.path.join(backup_dir, name + previous_ext)
+            if os.path.isfile(previous_path):
+                os.remove(previous_path)
+                replaced_incremental = (replaced_incremental
+                    or is_incremental(previous_path))
+        backup_path = os.path.join(backup_dir, name + ext)
+    else:
+        backup_path = os.path.join(backup_dir, backup_filename(backup_dir,
+            name, ext))
+
+    backup_files = []
+    for root, dirs, files in os.walk(save_dir):
+        for filename in files:
+            path = os.path.join(root, filename)
+            backup_files.append((path, os.path.relpath(path, game_dir),
+                os.path.getsize(path)))
+
+    write_backup(backup_path, backup_files,
+        lambda done, total, name: report(progress, 'backup', done, total,
+            name), codec=backup_codec())
+
+    if replaced_incremental:
+        collect_garbage(backup_dir)
+
+    return backup_path
+
+def find_backup(game_dir, name):
+    backup_dir = os.path.join(game_dir, 'save_backups')
+    filenames = [name + ext for ext in BACKUP_EXTENSIONS]
+    filenames.append(name)
+    for filename in filenames:
+        path = os.path.join(backup_dir, filename)
+        if (os.path.splitext(filename)[1].lower() in BACKUP_EXTENSIONS
+            and os.path.isfile(path)):
+            return path
+
+    raise EngineError(_('Backup {name} not found').format(name=name))
+
+def restore_backup(game_dir, name, progress=None):
+    backup_path = find_backup(game_dir, name)
+
+    save_dir = os.path.join(game_dir, 'save')
+    temp_save_dir = None
+    if os.path.isdir(save_dir):
+        temp_save_dir = sibling_dir(save_dir, 'restoring')
+        os.rename(save_dir, temp_save_dir)
+    elif os.path.isfile(save_dir):
+        os.remove(save_dir)
+
+    try:
+        extract_backup(backup_path, game_dir,
+            lambda done, total, name: report(progress, 'restore', done,
+                total, name))
+    except BaseException:
+        # Put the saves that were there before back in place
+        if os.path.isdir(save_dir):
+            shutil.rmtree(save_dir, onerror=remove_readonly)
+        if temp_save_dir is not None:
+            os.rename(temp_save_dir, save_dir)
+        raise
+
+    if temp_save_dir is not None:
+        shutil.rmtree(temp_save_dir, onerror=remove_readonly)
+
+    return backup_path
+
+# Write a save directory that looks like the one of a game played for a
+# while: a character, overmaps, memorized tiles and many map files
+def make_synthetic_saves(save_dir, maps=2000, seed=0):
+    rng = random.Random(seed)
+
+    terrains = ['t_grass', 't_dirt', 't_floor', 't_wall', 't_pavement',
+        't_sidewalk', 't_tree', 't_shrub', 't_water_sh', 't_door_c']
+    furnitures = ['f_null', 'f_chair', 'f_table', 'f_bed', 'f_dresser',
+        'f_rack', 'f_counter']
+    items = ['rock', 'stick', 'can_beans', 'water_clean', 'jeans', 'tshirt',
+        'knife_butcher', '2x4', 'nail', 'battery', 'flashlight']
+
+    world_dir = os.path.join(save_dir, 'Benchmark')
+    os.makedirs(world_dir)
+
+    def write_json(path, value):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf8') as f:
+            json.dump(value, f)
+
+    write_json(os.path.join(world_dir, 'worldoptions.json'), [{'info': '',
+        'default': 'true', 'name': 'OPTION_{0}'.format(index),
+        'value': str(rng.randrange(100))} for index in range(60)])
+    write_json(os.path.join(world_dir, 'master.gsav'), {'next_mission_id':
+        rng.randrange(1000), 'active_missions': [], 'factions': [{'id':
+        'faction_{0}'.format(index), 'likes_u': rng.randrange(-50, 50)}
+        for index in range(40)]})
+
+    character = {'name': 'Benchmark', 'skills': dict(('skill_{0}'.format(
+        index), rng.randrange(10)) for index in range(30)), 'inventory': [
+        {'typeid': rng.choice(items), 'charges': rng.randrange(100),
+        'bday': rng.randrange(10 ** 7)} for index in range(2000)],
+        'kills': dict((name, rng.randrange(50)) for name in items)}
+    write_json(os.path.join(world_dir, '#QmVuY2htYXJr.sav'), character)
+
+    # Overmaps are long runs of the same terrain
+    for overmap in range(4):
+        layers = []
+        for layer in range(21):
+            runs = []
+            remaining = 180 * 180
+            while remaining > 0:
+                count = min(remaining, rng.randrange(1, 400))
+                runs.append([rng.choice(terrains), count])
+                remaining -= count
+            layers.append(runs)
+        write_json(os.path.join(world_dir, 'o.{0}.0'.format(overmap)),
+            {'layers': layers})
+
+    for index in range(100):
+        write_json(os.path.join(world_dir, '#QmVuY2htYXJr.mm1',
+            '{0}.0.0.mmr'.format(index)), [[[x, y, 0], rng.choice(terrains),
+            rng.randrange(4)] for x in range(12) for y in range(12)
+            if rng.random() < 0.7])
+
+    for index in range(maps):
+        x, y = index % 64, index // 64
+        submaps = []
+        for submap in range(4):
+            submaps.append({
+                'coordinates': [x * 2 + submap % 2, y * 2 + submap // 2, 0],
+                'turn_last_touched': rng.randrange(10 ** 6),
+                'terrain': [[rng.choice(terrains[:4]), rng.randrange(1, 30)]
+                    for run in range(40)],
+                'furniture': [[rng.randrange(12), rng.randrange(12),
+                    rng.choice(furnitures)] for item in range(
+                    rng.randrange(8))],
+                'items': [[rng.randrange(12), rng.randrange(12), {
+                    'typeid': rng.choice(items), 'bday': rng.randrange(
+                    10 ** 7)}] for item in range(rng.randrange(30))]
+            })
+        write_json(os.path.join(world_dir, 'maps', '{0}.{1}.0'.format(
+            x // 32, y // 32), '{0}.{1}.0.map'.format(x, y)), submaps)
+
+# Compress the files of save_dir with each codec. Returns one
+# (codec, seconds, compressed size, total size) tuple per codec.
+def benchmark_codecs(save_dir, codecs=None, progress=None):
+    if codecs is None:
+        codecs = available_codecs()
+
+    files = []
+    for root, dirs, filenames in os.walk(save_dir):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            files.append((path, os.path.relpath(path, os.path.dirname(
+                save_dir)), os.path.getsize(path)))
+    total_size = sum(size for path, arcname, size in files)
+
+    results = []
+    temp_dir = tempfile.mkdtemp(prefix='backup-benchmark-')
+    try:
+        for codec in codecs:
+            report(progress, 'benchmark', len(results), len(codecs), codec)
+
+            zip_path = os.path.join(temp_dir, codec + '.zip')
+            start = time.perf_counter()
+            compress_files(zip_path, files, codec=codec)
+            seconds = time.perf_counter() - start
+
+            results.append((codec, seconds, os.path.getsize(zip_path),
+                total_size))
+            os.remove(zip_path)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    return results
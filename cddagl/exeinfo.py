@@ -0,0 +1,237 @@
+import re
+import struct
+import hashlib
+
+# Version string embedded in the game executable
+GAME_VERSION_RE = re.compile(
+    b'(?P<version>[01]\\.[A-F](-\\d+-g[0-9a-f]+)?)\\x00')
+GAME_VERSION_TEXT_RE = re.compile(r'[01]\.[A-F](-\d+-g[0-9a-f]+)?')
+GAME_VERSION_OVERLAP = 64
+
+RT_VERSION = 16
+IMAGE_DIRECTORY_ENTRY_RESOURCE = 2
+
+PE32_MAGIC = 0x10b
+PE32_PLUS_MAGIC = 0x20b
+
+# Largest version resource we are willing to read
+MAX_VERSION_RESOURCE_SIZE = 64 * 1024
+MAX_RESOURCE_DEPTH = 3
+MAX_RESOURCE_ENTRIES = 4096
+
+
+class PEFormatError(Exception): pass
+
+
+# Hash the content of a game executable and look for its version string as
+# it is being read or written block by block.
+class ExeDigest(object):
+    def __init__(self, scan_version=True):
+        self.sha256 = hashlib.sha256()
+        self.scan_version = scan_version
+        self.version = ''
+        self.last_bytes = b''
+
+    def update(self, data):
+        self.sha256.update(data)
+
+        if self.scan_version:
+            # Keep the tail of the previous block so that a version string
+            # crossing the block boundary is still found
+            for match in GAME_VERSION_RE.finditer(self.last_bytes + data):
+                version = match.group('version').decode('ascii')
+                if len(version) > len(self.version):
+                    self.version = version
+            self.last_bytes = data[-GAME_VERSION_OVERLAP:]
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+
+# Minimal reader for the headers and resources of a PE executable. Only the
+# few structures needed to reach the version resource are read from the file.
+class PEFile(object):
+    def __init__(self, exe_file):
+        self.exe_file = exe_file
+
+        dos_header = self.read_at(0, 64)
+        if dos_header[:2] != b'MZ':
+            raise PEFormatError('Missing MZ signature')
+        pe_offset = struct.unpack_from('<I', dos_header, 0x3c)[0]
+
+        file_header = self.read_at(pe_offset, 24)
+        if file_header[:4] != b'PE\x00\x00':
+            raise PEFormatError('Missing PE signature')
+        (number_of_sections, optional_header_size) = struct.unpack_from(
+            '<2xH12xH', file_header, 4)
+
+        optional_header_offset = pe_offset + 24
+        optional_header = self.read_at(optional_header_offset,
+            optional_header_size)
+        magic = struct.unpack_from('<H', optional_header, 0)[0]
+        if magic == PE32_MAGIC:
+            directories_offset = 96
+        elif magic == PE32_PLUS_MAGIC:
+            directories_offset = 112
+        else:
+            raise PEFormatError('Unknown optional header magic')
+
+        number_of_directories = struct.unpack_from('<I', optional_header,
+            directories_offset - 4)[0]
+        if number_of_directories <= IMAGE_DIRECTORY_ENTRY_RESOURCE:
+            self.resource_rva = 0
+        else:
+            self.resource_rva = struct.unpack_from('<I', optional_header,
+                directories_offset + IMAGE_DIRECTORY_ENTRY_RESOURCE * 8)[0]
+
+        self.sections = []
+        section_table = self.read_at(
+            optional_header_offset + optional_header_size,
+            number_of_sections * 40)
+        for index in range(number_of_sections):
+            (virtual_size, virtual_address, raw_size,
+                raw_offset) = struct.unpack_from('<8x4I', section_table,
+                index * 40)
+            self.sections.append((virtual_address,
+                max(virtual_size, raw_size), raw_offset, raw_size))
+
+    def read_at(self, offset, size):
+        self.exe_file.seek(offset)
+        data = self.exe_file.read(size)
+        if len(data) != size:
+            raise PEFormatError('Unexpected end of file')
+        return data
+
+    def rva_to_offset(self, rva):
+        for virtual_address, virtual_size, raw_offset, raw_size in (
+            self.sections):
+            if virtual_address <= rva < virtual_address + virtual_size:
+                delta = rva - virtual_address
+                if delta >= raw_size:
+                    break
+                return raw_offset + delta
+        raise PEFormatError('RVA outside of any section')
+
+    def read_rva(self, rva, size):
+        return self.read_at(self.rva_to_offset(rva), size)
+
+    def resource_entries(self, directory_offset):
+        directory = self.read_rva(self.resource_rva + directory_offset, 16)
+        named_entries, id_entries = struct.unpack_from('<12xHH', directory)
+        count = named_entries + id_entries
+        if count > MAX_RESOURCE_ENTRIES:
+            raise PEFormatError('Too many resource entries')
+
+        entries = self.read_rva(self.resource_rva + directory_offset + 16,
+            count * 8)
+        for index in range(count):
+            yield struct.unpack_from('<II', entries, index * 8)
+
+    def find_resource(self, type_id):
+        if self.resource_rva == 0:
+            return None
+
+        # The resource tree has three levels: type, name and language. We
+        # follow the requested type and then the first entry on each level.
+        offset = None
+        for name, data_offset in self.resource_entries(0):
+            if not name & 0x80000000 and name == type_id:
+                offset = data_offset
+                break
+        if offset is None:
+            return None
+
+        depth = 1
+        while offset & 0x80000000:
+            if depth > MAX_RESOURCE_DEPTH:
+                raise PEFormatError('Resource tree too deep')
+            entry = next(self.resource_entries(offset & 0x7fffffff), None)
+            if entry is None:
+                return None
+            offset = entry[1]
+            depth += 1
+
+        data_rva, data_size = struct.unpack('<II',
+            self.read_rva(self.resource_rva + offset, 8))
+        if data_size > MAX_VERSION_RESOURCE_SIZE:
+            raise PEFormatError('Resource too large')
+        return self.read_rva(data_rva, data_size)
+
+
+def align4(offset):
+    return (offset + 3) & ~3
+
+# Parse one VS_VERSIONINFO style block and return its key, value, the list of
+# its children offsets and where the block ends.
+def parse_version_block(data, offset):
+    length, value_length, value_type = struct.unpack_from('<HHH', data,
+        offset)
+    if length < 6:
+        raise PEFormatError('Invalid version block')
+    end = min(offset + length, len(data))
+
+    key_end = offset + 6
+    while key_end + 1 < end and data[key_end:key_end + 2] != b'\x00\x00':
+        key_end += 2
+    key = data[offset + 6:key_end].decode('utf-16-le')
+
+    value_offset = align4(key_end + 2)
+    if value_type == 1:
+        # Text values have their length expressed in characters
+        value_size = value_length * 2
+    else:
+        value_size = value_length
+    value = data[value_offset:min(value_offset + value_size, end)]
+
+    children = []
+    child_offset = align4(value_offset + value_size)
+    while child_offset + 6 <= end:
+        children.append(child_offset)
+        child_length = struct.unpack_from('<H', data, child_offset)[0]
+        if child_length == 0:
+            break
+        child_offset = align4(child_offset + child_length)
+
+    return key, value, children, end
+
+def version_strings(data):
+    strings = {}
+
+    key, value, children, end = parse_version_block(data, 0)
+    if key != 'VS_VERSION_INFO':
+        raise PEFormatError('Invalid version resource')
+
+    for child in children:
+        key, value, tables, end = parse_version_block(data, child)
+        if key != 'StringFileInfo':
+            continue
+        for table in tables:
+            key, value, entries, end = parse_version_block(data, table)
+            for entry in entries:
+                key, value, entry_children, end = parse_version_block(data,
+                    entry)
+                strings.setdefault(key,
+                    value.decode('utf-16-le').rstrip('\x00'))
+
+    return strings
+
+# Find the game version in the version resource of the executable without
+# reading the whole file. Returns None if the executable has no version
+# resource or if it does not look like a game version.
+def read_version_resource(exe_path):
+    with open(exe_path, 'rb') as exe_file:
+        try:
+            pe_file = PEFile(exe_file)
+            data = pe_file.find_resource(RT_VERSION)
+            if data is None:
+                return None
+            strings = version_strings(data)
+        except (PEFormatError, struct.error, UnicodeDecodeError):
+            return None
+
+    for key in ('ProductVersion', 'FileVersion'):
+        version = strings.get(key, '').strip()
+        if GAME_VERSION_TEXT_RE.fullmatch(version) is not None:
+            return version
+
+    return None
@@ -1,5 +1,10 @@
 import sys
 import os
+import time
+import shutil
+import signal
+import argparse
+import tempfile
 import traceback
 
 import logging
@@ -25,8 +30,9 @@ else:
     basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     sys.path.append(basedir)
 
-from cddagl.config import init_config, get_config_value, config_true
-from cddagl.ui import start_ui, ui_exception
+from cddagl.config import (
+    init_config, get_config_value, config_true, get_update_journal)
+from cddagl import engine
 
 from cddagl.win32 import get_ui_locale, SingleInstance, write_named_pipe
 
@@ -35,6 +41,9 @@ from cddagl.__version__ import version
 MAX_LOG_SIZE = 1024 * 1024
 MAX_LOG_FILES = 5
 
+# Minimum delay between two progress lines in command line mode
+PROGRESS_INTERVAL = 0.5
+
 available_locales = []
 app_locale = None
 
@@ -83,6 +92,7 @@ def init_gettext():
             languages=[app_locale])
         global _
         _ = t.gettext
+        engine.set_translation(t)
     except FileNotFoundError as e:
         pass
 
@@ -148,17 +158,205 @@ def handle_exception(extype, value, tb):
             version=version, extype=str(extype), value=str(value),
             traceback=tb_io.getvalue()))
 
-    ui_exception(extype, value, tb)
+    if 'cddagl.ui' in sys.modules:
+        from cddagl.ui import ui_exception
+        ui_exception(extype, value, tb)
 
 def init_exception_catcher():
     sys.excepthook = handle_exception
 
+def parse_arguments():
+    parser = argparse.ArgumentParser(description=_('CDDA Game Launcher'))
+    parser.add_argument('--game-dir', help=_('game directory, the one from '
+        'the settings is used by default'))
+    parser.add_argument('--update', action='store_true',
+        help=_('update the game to the latest build and exit'))
+    parser.add_argument('--build', help=_('build number to install with '
+        '--update instead of the latest one'))
+    parser.add_argument('--graphics', choices=sorted(engine.BASE_URLS.keys()),
+        help=_('graphics of the build to install'))
+    parser.add_argument('--platform', choices=('x64', 'x86'),
+        help=_('platform of the build to install'))
+    parser.add_argument('--backup', metavar='NAME',
+        help=_('back up the saves in NAME and exit'))
+    parser.add_argument('--restore', metavar='NAME',
+        help=_('restore the saves backed up in NAME and exit'))
+    parser.add_argument('--benchmark-backup', metavar='SAVE_DIR', nargs='?',
+        const='', help=_('compare the backup compression codecs on SAVE_DIR '
+        'or on generated saves and exit'))
+
+    # Qt has its own arguments which are left alone
+    args, remaining = parser.parse_known_args()
+    return args
+
+def cli_progress():
+    last_report = [0.0, None]
+
+    def progress(stage, done, total, name):
+        now = time.monotonic()
+        if (stage == last_report[1] and done < total
+            and now - last_report[0] < PROGRESS_INTERVAL):
+            return
+        last_report[:] = [now, stage]
+
+        if total > 0:
+            print('{stage}: {percent:.0%} {name}'.format(stage=stage,
+                percent=done / total, name=name))
+        else:
+            print('{stage}: {name}'.format(stage=stage, name=name))
+
+    return progress
+
+def benchmark_backup(save_dir, progress):
+    temp_dir = None
+    if save_dir == '':
+        temp_dir = tempfile.mkdtemp(prefix='synthetic-saves-')
+        save_dir = os.path.join(temp_dir, 'save')
+        print(_('Generating saves in {path}').format(path=save_dir))
+        engine.make_synthetic_saves(save_dir)
+
+    try:
+        results = engine.benchmark_codecs(save_dir, progress=progress)
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    print('{0:<14}{1:>10}{2:>12}{3:>10}'.format(_('Codec'), _('Ratio'),
+        _('Size (MB)'), _('MB/s')))
+    for codec, seconds, compressed_size, total_size in results:
+        ratio = 1.0 - compressed_size / max(total_size, 1)
+        speed = total_size / 1000000 / max(seconds, 1e-9)
+        print('{0:<14}{1:>10.1%}{2:>12.1f}{3:>10.1f}'.format(codec, ratio,
+            compressed_size / 1000000, speed))
+
+def cli_single_instance():
+    # The launcher window and the command line must not change the game
+    # directory at the same time
+    if config_true(get_config_value('allow_multiple_instances', 'False')):
+        return None
+
+    single_instance = SingleInstance()
+    if single_instance.aleradyrunning():
+        single_instance.close()
+        raise engine.EngineError(_('Another instance of the launcher is '
+            'running'))
+
+    return single_instance
+
+def cli_cancellation():
+    # Ctrl+C cancels an update the same way the cancel button does so that
+    # the previous version is put back in place
+    cancelled = [False]
+
+    def interrupt(signum, frame):
+        cancelled[0] = True
+
+    signal.signal(signal.SIGINT, interrupt)
+
+    return lambda: cancelled[0]
+
+def resume_cli_update(game_dir, progress, cancelled):
+    journal = get_update_journal()
+    if journal is None:
+        return
+
+    # Only one update can be in progress, starting another one would lose
+    # what is needed to recover this one
+    journal_dir = os.path.normcase(os.path.abspath(journal['game_dir']))
+    if journal_dir != os.path.normcase(game_dir):
+        raise engine.EngineError(_('The update of {game_dir} was interrupted, '
+            'it must be resumed or rolled back first').format(
+            game_dir=journal['game_dir']))
+
+    print(_('Resuming the interrupted update to build {build}').format(
+        build=journal['build']))
+    engine.resume_update(journal, progress, cancelled)
+
+def run_cli(args):
+    game_dir = args.game_dir
+    if game_dir is None:
+        game_dir = engine.default_game_dir()
+    game_dir = os.path.abspath(game_dir)
+
+    logger = logging.getLogger('cddagl')
+    progress = cli_progress()
+
+    single_instance = None
+    try:
+        if (args.update or args.backup is not None
+            or args.restore is not None):
+            single_instance = cli_single_instance()
+
+        if args.update:
+            cancelled = cli_cancellation()
+            resume_cli_update(game_dir, progress, cancelled)
+
+            graphics, platform = engine.default_channel()
+            if args.graphics is not None:
+                graphics = args.graphics
+            if args.platform is not None:
+                platform = args.platform
+
+            builds = engine.fetch_builds(graphics, platform)
+            if len(builds) == 0:
+                raise engine.EngineError(_('Could not find remote builds'))
+
+            if args.build is None:
+                build = builds[0]
+            else:
+                build = next((build for build in builds
+                    if build['number'] == args.build), None)
+                if build is None:
+                    raise engine.EngineError(_('Build {build} not found'
+                        ).format(build=args.build))
+
+            if engine.installed_build(game_dir) == build['number']:
+                print(_('Build {build} is already installed').format(
+                    build=build['number']))
+            else:
+                engine.update_game(game_dir, build, progress, cancelled)
+                print(_('Build {build} installed in {game_dir}').format(
+                    build=build['number'], game_dir=game_dir))
+
+        if args.backup is not None:
+            path = engine.backup_saves(game_dir, args.backup,
+                progress=progress)
+            print(_('Saves backed up in {path}').format(path=path))
+
+        if args.restore is not None:
+            path = engine.restore_backup(game_dir, args.restore, progress)
+            print(_('Saves restored from {path}').format(path=path))
+
+        if args.benchmark_backup is not None:
+            benchmark_backup(args.benchmark_backup, progress)
+    except engine.EngineError as e:
+        logger.error(str(e))
+        return 1
+    except (OSError, ValueError) as e:
+        logger.exception(str(e))
+        return 1
+    finally:
+        if single_instance is not None:
+            single_instance.close()
+
+    return 0
+
 if __name__ == '__main__':
     init_config(basedir)
-    single_instance = init_single_instance()
-
     app_locale = init_gettext()
+
+    args = parse_arguments()
+    cli_mode = (args.update or args.backup is not None
+        or args.restore is not None or args.benchmark_backup is not None)
+
     init_logging()
     init_exception_catcher()
 
+    if cli_mode:
+        # Without Qt so that it can be run from scripts or scheduled tasks
+        sys.exit(run_cli(args))
+
+    single_instance = init_single_instance()
+
+    from cddagl.ui import start_ui
     start_ui(basedir, app_locale, available_locales, single_instance)
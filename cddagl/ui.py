@@ -9,7 +9,6 @@ import zipfile
 import json
 import traceback
 import html
-import stat
 import logging
 
 try:
@@ -44,7 +43,8 @@ from pywintypes import error as PyWinError
 
 from PyQt5.QtCore import (
     Qt, QTimer, QUrl, QFileInfo, pyqtSignal, QByteArray, QStringListModel,
-    QSize, QRect, QThread, QItemSelectionModel, QItemSelection)
+    QSize, QRect, QThread, QItemSelectionModel, QItemSelection, QObject,
+    QAbstractTableModel, QModelIndex)
 from PyQt5.QtGui import QIcon, QPalette, QPainter, QColor, QFont
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QStatusBar, QGridLayout, QGroupBox, QMainWindow,
@@ -52,12 +52,26 @@ from PyQt5.QtWidgets import (
     QProgressBar, QButtonGroup, QRadioButton, QComboBox, QAction, QDialog,
     QTextBrowser, QTabWidget, QCheckBox, QMessageBox, QStyle, QHBoxLayout,
     QSpinBox, QListView, QAbstractItemView, QTextEdit, QSizePolicy,
-    QTableWidget, QTableWidgetItem, QMenu)
+    QTableView, QMenu)
 from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest
 
 from cddagl.config import (
     get_config_value, set_config_value, new_version, get_build_from_sha256,
-    new_build, config_true)
+    config_true, get_exe_identity, set_exe_identity, get_http_cache,
+    set_http_cache, get_update_journal, delete_update_journal)
+from cddagl.exeinfo import ExeDigest, read_version_resource
+from cddagl.archivecache import (
+    fetch_cached_archive, store_archive, discard_cached_archive,
+    evict_archives)
+from cddagl.zipwriter import available_codecs
+from cddagl.backupstore import (
+    WORLD_FILES, BACKUP_EXTENSIONS, BackupIndex, write_backup, extract_backup,
+    is_incremental, collect_garbage)
+from cddagl.engine import (
+    BASE_URLS, safe_filename, parse_builds, BuildListingParser, alphanum_key,
+    is_64_windows, remove_readonly, find_game_exe, backup_filename,
+    backup_extension, backup_codec, GameUpdate, UpdateCancelled,
+    rollback_update, set_translation as set_engine_translation)
 from cddagl.win32 import (
     find_process_with_file_handle, get_downloads_directory, get_ui_locale,
     activate_window, SimpleNamedPipe, SingleInstance, process_id_from_path,
@@ -73,56 +87,141 @@ app_locale = 'en'
 logger = logging.getLogger('cddagl')
 
 READ_BUFFER_SIZE = 16 * 1024
+EXE_READ_BUFFER_SIZE = 1024 * 1024
 
-MAX_GAME_DIRECTORIES = 6
+PROGRESS_INTERVAL = timedelta(milliseconds=100)
 
-BASE_URLS = {
-    'Tiles': {
-        'x64': ('http://dev.narc.ro/cataclysm/jenkins-latest/'
-            'Windows_x64/Tiles/'),
-        'x86': ('http://dev.narc.ro/cataclysm/jenkins-latest/Windows/Tiles/')
-    },
-    'Console': {
-        'x64': ('http://dev.narc.ro/cataclysm/jenkins-latest/'
-            'Windows_x64/Curses/'),
-        'x86': ('http://dev.narc.ro/cataclysm/jenkins-latest/Windows/Curses/')
-    }
-}
+
+MAX_GAME_DIRECTORIES = 6
 
 SAVES_WARNING_SIZE = 150 * 1024 * 1024
 
+BUILD_LISTING_MAX_AGE = timedelta(minutes=10)
+MAX_DOWNLOAD_CONNECTIONS = 8
+AUTO_REFRESH_JITTER = 0.1
+
 RELEASES_URL = 'https://github.com/remyroy/CDDA-Game-Launcher/releases'
 NEW_ISSUE_URL = 'https://github.com/remyroy/CDDA-Game-Launcher/issues/new'
 
-WORLD_FILES = set(('worldoptions.json', 'worldoptions.txt', 'master.gsav'))
-
 def clean_qt_path(path):
     return path.replace('/', '\\')
 
-def safe_filename(filename):
-    keepcharacters = (' ', '.', '_', '-')
-    return ''.join(c for c in filename if c.isalnum() or c in keepcharacters
-        ).strip()
+# Keep the build listings of every graphics and platform combination in
+# memory. Listings are fetched concurrently with conditional requests and the
+# responses are saved in the http cache.
+class BuildCatalog(QObject):
+    fetched = pyqtSignal(str)
+
+    def __init__(self, qnam):
+        super(BuildCatalog, self).__init__()
+
+        self.qnam = qnam
+        self.listings = {}
+        self.fetches = {}
+
+    def urls(self):
+        urls = []
+        for platforms in BASE_URLS.values():
+            urls.extend(platforms.values())
+        return urls
+
+    def load_listing(self, url):
+        if url not in self.listings:
+            http_cache = get_http_cache(url)
+            if http_cache is None:
+                return None
 
-def tryint(s):
-    try:
-        return int(s)
-    except:
-        return s
+            self.listings[url] = {
+                'builds': parse_builds(BytesIO(http_cache['body']), url),
+                'fetched_on': http_cache['fetched_on']
+            }
+
+        return self.listings[url]
+
+    def builds(self, url):
+        listing = self.load_listing(url)
+        if listing is None:
+            return None
+        return listing['builds']
+
+    def is_stale(self, url):
+        listing = self.load_listing(url)
+        return (listing is None or
+            datetime.utcnow() - listing['fetched_on'] > BUILD_LISTING_MAX_AGE)
+
+    def is_fetching(self, url):
+        return url in self.fetches
+
+    def fetch(self, url):
+        if url in self.fetches:
+            return self.fetches[url]['reply']
+
+        request = QNetworkRequest(QUrl(url))
+
+        http_cache = get_http_cache(url)
+        if http_cache is not None:
+            if http_cache['etag'] is not None:
+                request.setRawHeader(b'If-None-Match',
+                    http_cache['etag'].encode('latin1'))
+            if http_cache['last_modified'] is not None:
+                request.setRawHeader(b'If-Modified-Since',
+                    http_cache['last_modified'].encode('latin1'))
 
-def alphanum_key(s):
-    """ Turn a string into a list of string and number chunks.
-        "z23a" -> ["z", 23, "a"]
-    """
-    return arstrip([tryint(c) for c in re.split('([0-9]+)', s)])
+        reply = self.qnam.get(request)
+        self.fetches[url] = {
+            'reply': reply,
+            'html': BytesIO(),
+            'parser': BuildListingParser(url)
+        }
 
-def arstrip(value):
-    while len(value) > 1 and value[-1:] == ['']:
-        value = value[:-1]
-    return value
+        reply.readyRead.connect(lambda: self.http_ready_read(url))
+        reply.finished.connect(lambda: self.http_finished(url))
 
-def is_64_windows():
-    return 'PROGRAMFILES(X86)' in os.environ
+        return reply
+
+    def fetch_all(self):
+        for url in self.urls():
+            self.fetch(url)
+
+    def http_ready_read(self, url):
+        fetch = self.fetches[url]
+
+        data = bytes(fetch['reply'].readAll())
+        fetch['html'].write(data)
+        fetch['parser'].feed(data)
+
+    def http_finished(self, url):
+        fetch = self.fetches.pop(url)
+        reply = fetch['reply']
+
+        status_code = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+
+        if status_code == 304:
+            # Not modified, reuse what we got the last time
+            listing = self.load_listing(url)
+            if listing is not None:
+                listing['fetched_on'] = datetime.utcnow()
+        elif status_code == 200:
+            builds = fetch['parser'].close()
+
+            etag = None
+            if reply.hasRawHeader(b'ETag'):
+                etag = bytes(reply.rawHeader(b'ETag')).decode('latin1')
+            last_modified = None
+            if reply.hasRawHeader(b'Last-Modified'):
+                last_modified = bytes(reply.rawHeader(b'Last-Modified')
+                    ).decode('latin1')
+
+            set_http_cache(url, etag, last_modified, fetch['html'].getvalue())
+
+            self.listings[url] = {
+                'builds': builds,
+                'fetched_on': datetime.utcnow()
+            }
+
+        reply.deleteLater()
+
+        self.fetched.emit(url)
 
 def sizeof_fmt(num, suffix=None):
     if suffix is None:
@@ -137,10 +236,6 @@ def sizeof_fmt(num, suffix=None):
 def get_data_path():
     return os.path.join(basedir, 'data')
 
-def remove_readonly(func, path, _):
-    os.chmod(path, stat.S_IWRITE)
-    func(path)
-
 def retry_rmtree(path):
     while os.path.isdir(path):
         try:
@@ -713,7 +808,7 @@ class GameDirGroupBox(QGroupBox):
         self.restored_previous = False
         self.current_build = None
 
-        self.exe_reading_timer = None
+        self.exe_identifier = None
         self.update_saves_timer = None
         self.saves_size = 0
 
@@ -1140,6 +1235,9 @@ class GameDirGroupBox(QGroupBox):
         status_bar = main_window.statusBar()
         status_bar.clearMessage()
 
+        if self.last_game_directory != directory:
+            self.stop_exe_identifier()
+
         self.exe_path = None
         
         main_tab = self.get_main_tab()
@@ -1200,139 +1298,153 @@ class GameDirGroupBox(QGroupBox):
             set_config_value('game_directory', directory)
 
     def update_version(self):
-        if (self.exe_reading_timer is not None
-            and self.exe_reading_timer.isActive()):
-            self.exe_reading_timer.stop()
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
 
-            status_bar = main_window.statusBar()
-            status_bar.removeWidget(self.reading_label)
-            status_bar.removeWidget(self.reading_progress_bar)
+        self.stop_exe_identifier()
 
-            status_bar.busy -= 1
+        status_bar.clearMessage()
 
-        main_window = self.get_main_window()
+        exe_path = self.exe_path
+        exe_stat = os.stat(exe_path)
+
+        # Skip reading the whole executable if we already know it
+        identity = get_exe_identity(exe_path, exe_stat)
+        if identity is not None:
+            self.game_version = identity['version']
+            self.version_identified(identity['sha256'])
+            return
+
+        def completed(sha256, game_version):
+            set_exe_identity(exe_path, exe_stat, sha256, game_version)
+
+            self.game_version = game_version
+            self.version_identified(sha256)
+
+        def failed(error):
+            self.game_version = ''
+            self.version_identified(None)
+            status_bar.showMessage(error)
+
+        self.start_exe_identifier(exe_path, exe_stat.st_size, completed,
+            failed)
 
+    def start_exe_identifier(self, exe_path, exe_size, completed, failed):
+        main_window = self.get_main_window()
         status_bar = main_window.statusBar()
-        status_bar.clearMessage()
 
         status_bar.busy += 1
 
         reading_label = QLabel()
-        reading_label.setText(_('Reading: {0}').format(self.exe_path))
+        reading_label.setText(_('Reading: {0}').format(exe_path))
         status_bar.addWidget(reading_label, 100)
         self.reading_label = reading_label
 
         progress_bar = QProgressBar()
+        progress_bar.setRange(0, exe_size)
         status_bar.addWidget(progress_bar)
         self.reading_progress_bar = progress_bar
 
-        timer = QTimer(self)
-        self.exe_reading_timer = timer
+        exe_identifier = ExeIdentifier(exe_path)
+        self.exe_identifier = exe_identifier
 
-        exe_size = os.path.getsize(self.exe_path)
+        # Results from a cancelled identifier can still be queued when a new
+        # one is started, make sure we only handle the current one
+        def progress(total_read):
+            if exe_identifier is self.exe_identifier:
+                progress_bar.setValue(total_read)
 
-        progress_bar.setRange(0, exe_size)
-        self.exe_total_read = 0
+        def identified(sha256, game_version):
+            if exe_identifier is self.exe_identifier:
+                self.remove_exe_identifier()
+                completed(sha256, game_version)
 
-        self.exe_sha256 = hashlib.sha256()
-        self.last_bytes = None
-        self.game_version = ''
-        self.opened_exe = open(self.exe_path, 'rb')
+        def identify_failed(error):
+            if exe_identifier is self.exe_identifier:
+                self.remove_exe_identifier()
+                failed(error)
 
-        def timeout():
-            bytes = self.opened_exe.read(READ_BUFFER_SIZE)
-            if len(bytes) == 0:
-                self.opened_exe.close()
-                self.exe_reading_timer.stop()
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
+        exe_identifier.progress.connect(progress)
+        exe_identifier.completed.connect(identified)
+        exe_identifier.failed.connect(identify_failed)
+        exe_identifier.start()
 
-                if self.game_version == '':
-                    self.game_version = _('Unknown')
-                else:
-                    self.add_game_dir()
+    def stop_exe_identifier(self):
+        if self.exe_identifier is not None:
+            self.exe_identifier.cancel()
+            self.remove_exe_identifier()
 
-                self.version_value_label.setText(
-                    _('{version} ({type})').format(version=self.game_version,
-                    type=self.version_type))
+    def remove_exe_identifier(self):
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
 
-                status_bar.removeWidget(self.reading_label)
-                status_bar.removeWidget(self.reading_progress_bar)
+        status_bar.removeWidget(self.reading_label)
+        status_bar.removeWidget(self.reading_progress_bar)
 
-                status_bar.busy -= 1
-                if status_bar.busy == 0 and not self.game_started:
-                    if self.restored_previous:
-                        status_bar.showMessage(
-                            _('Previous version restored'))
-                    else:
-                        status_bar.showMessage(_('Ready'))
+        status_bar.busy -= 1
 
-                if status_bar.busy == 0 and self.game_started:
-                    status_bar.showMessage(_('Game process is running'))
+        self.exe_identifier = None
 
-                sha256 = self.exe_sha256.hexdigest()
+    def version_identified(self, sha256):
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
 
-                new_version(self.game_version, sha256)
+        if self.game_version == '':
+            self.game_version = _('Unknown')
+        else:
+            self.add_game_dir()
 
-                build = get_build_from_sha256(sha256)
+        self.version_value_label.setText(
+            _('{version} ({type})').format(version=self.game_version,
+            type=self.version_type))
 
-                if build is not None:
-                    build_date = arrow.get(build['released_on'], 'UTC')
-                    human_delta = build_date.humanize(arrow.utcnow(),
-                        locale=app_locale)
-                    self.build_value_label.setText(_('{build} ({time_delta})'
-                        ).format(build=build['build'], time_delta=human_delta))
-                    self.current_build = build['build']
+        if status_bar.busy == 0 and not self.game_started:
+            if self.restored_previous:
+                status_bar.showMessage(
+                    _('Previous version restored'))
+            else:
+                status_bar.showMessage(_('Ready'))
 
-                    main_tab = self.get_main_tab()
-                    update_group_box = main_tab.update_group_box
+        if status_bar.busy == 0 and self.game_started:
+            status_bar.showMessage(_('Game process is running'))
 
-                    if (update_group_box.builds is not None
-                        and len(update_group_box.builds) > 0
-                        and status_bar.busy == 0
-                        and not self.game_started):
-                        last_build = update_group_box.builds[0]
+        if sha256 is None:
+            build = None
+        else:
+            new_version(self.game_version, sha256)
+            build = get_build_from_sha256(sha256)
 
-                        message = status_bar.currentMessage()
-                        if message != '':
-                            message = message + ' - '
+        if build is not None:
+            build_date = arrow.get(build['released_on'], 'UTC')
+            human_delta = build_date.humanize(arrow.utcnow(),
+                locale=app_locale)
+            self.build_value_label.setText(_('{build} ({time_delta})'
+                ).format(build=build['build'], time_delta=human_delta))
+            self.current_build = build['build']
 
-                        if last_build['number'] == self.current_build:
-                            message = message + _('Your game is up to date')
-                        else:
-                            message = message + _('There is a new update '
-                            'available')
-                        status_bar.showMessage(message)
+            main_tab = self.get_main_tab()
+            update_group_box = main_tab.update_group_box
 
-                else:
-                    self.build_value_label.setText(_('Unknown'))
-                    self.current_build = None
+            if (update_group_box.builds is not None
+                and len(update_group_box.builds) > 0
+                and status_bar.busy == 0
+                and not self.game_started):
+                last_build = update_group_box.builds[0]
 
-            else:
-                last_frame = bytes
-                if self.last_bytes is not None:
-                    last_frame = self.last_bytes + last_frame
-
-                match = re.search(
-                    b'(?P<version>[01]\\.[A-F](-\\d+-g[0-9a-f]+)?)\\x00',
-                    last_frame)
-                if match is not None:
-                    game_version = match.group('version').decode('ascii')
-                    if len(game_version) > len(self.game_version):
-                        self.game_version = game_version
-
-                self.exe_total_read += len(bytes)
-                self.reading_progress_bar.setValue(self.exe_total_read)
-                self.exe_sha256.update(bytes)
-                self.last_bytes = bytes
+                message = status_bar.currentMessage()
+                if message != '':
+                    message = message + ' - '
 
-        timer.timeout.connect(timeout)
-        timer.start(0)
+                if last_build['number'] == self.current_build:
+                    message = message + _('Your game is up to date')
+                else:
+                    message = message + _('There is a new update '
+                    'available')
+                status_bar.showMessage(message)
 
-        '''from PyQt5.QtCore import pyqtRemoveInputHook, pyqtRestoreInputHook
-        pyqtRemoveInputHook()
-        import pdb; pdb.set_trace()
-        pyqtRestoreInputHook()'''
+        else:
+            self.build_value_label.setText(_('Unknown'))
+            self.current_build = None
 
     def check_running_process(self, exe_path):
         pid = process_id_from_path(exe_path)
@@ -1511,153 +1623,33 @@ class GameDirGroupBox(QGroupBox):
         timer.timeout.connect(timeout)
         timer.start(0)
 
-    def analyse_new_build(self, build):
+    def game_dir_updated(self):
+        # Show what an update left in the game directory. The engine already
+        # identified a newly installed executable, reading its version only
+        # hits the cache.
         game_dir = self.dir_combo.currentText()
 
-        self.previous_exe_path = self.exe_path
-        self.exe_path = None
+        self.stop_exe_identifier()
 
-        # Check for previous version
         previous_version_dir = os.path.join(game_dir, 'previous_version')
         self.previous_rb_enabled = os.path.isdir(previous_version_dir)
 
-        console_exe = os.path.join(game_dir, 'cataclysm.exe')
-        tiles_exe = os.path.join(game_dir, 'cataclysm-tiles.exe')
-
-        exe_path = None
-        version_type = None
-        if os.path.isfile(console_exe):
-            version_type = _('console')
-            exe_path = console_exe
-        elif os.path.isfile(tiles_exe):
-            version_type = _('tiles')
-            exe_path = tiles_exe
+        self.exe_path = find_game_exe(game_dir)
 
-        if version_type is None:
+        if self.exe_path is None:
             self.version_value_label.setText(_('Not a CDDA directory'))
             self.build_value_label.setText(_('Unknown'))
             self.current_build = None
-            
-            main_tab = self.get_main_tab()
-            update_group_box = main_tab.update_group_box
-            update_group_box.finish_updating()
-
-            self.launch_game_button.setEnabled(False)
-            
-            main_window = self.get_main_window()
-            status_bar = main_window.statusBar()
-            status_bar.showMessage(_('No executable found in the downloaded '
-                'archive. You might want to restore your previous version.'))
-            
-        else:
-            if (self.exe_reading_timer is not None
-                and self.exe_reading_timer.isActive()):
-                self.exe_reading_timer.stop()
-
-                status_bar = main_window.statusBar()
-                status_bar.removeWidget(self.reading_label)
-                status_bar.removeWidget(self.reading_progress_bar)
-
-                status_bar.busy -= 1
-
-            self.exe_path = exe_path
-            self.version_type = version_type
-            self.build_number = build['number']
-            self.build_date = build['date']
-
-            main_window = self.get_main_window()
-
-            status_bar = main_window.statusBar()
-            status_bar.clearMessage()
-
-            status_bar.busy += 1
-
-            reading_label = QLabel()
-            reading_label.setText(_('Reading: {0}').format(self.exe_path))
-            status_bar.addWidget(reading_label, 100)
-            self.reading_label = reading_label
-
-            progress_bar = QProgressBar()
-            status_bar.addWidget(progress_bar)
-            self.reading_progress_bar = progress_bar
-
-            timer = QTimer(self)
-            self.exe_reading_timer = timer
-
-            exe_size = os.path.getsize(self.exe_path)
-
-            progress_bar.setRange(0, exe_size)
-            self.exe_total_read = 0
-
-            self.exe_sha256 = hashlib.sha256()
-            self.last_bytes = None
-            self.game_version = ''
-            self.opened_exe = open(self.exe_path, 'rb')
-
-            def timeout():
-                bytes = self.opened_exe.read(READ_BUFFER_SIZE)
-                if len(bytes) == 0:
-                    self.opened_exe.close()
-                    self.exe_reading_timer.stop()
-                    main_window = self.get_main_window()
-                    status_bar = main_window.statusBar()
-
-                    if self.game_version == '':
-                        self.game_version = _('Unknown')
-                    self.version_value_label.setText(
-                        _('{version} ({type})').format(
-                            version=self.game_version,
-                            type=self.version_type))
-
-                    build_date = arrow.get(self.build_date, 'UTC')
-                    human_delta = build_date.humanize(arrow.utcnow(),
-                        locale=app_locale)
-                    self.build_value_label.setText(_('{build} ({time_delta})'
-                        ).format(build=self.build_number,
-                            time_delta=human_delta))
-                    self.current_build = self.build_number
-
-                    status_bar.removeWidget(self.reading_label)
-                    status_bar.removeWidget(self.reading_progress_bar)
-
-                    status_bar.busy -= 1
-
-                    sha256 = self.exe_sha256.hexdigest()
-
-                    new_build(self.game_version, sha256, self.build_number,
-                        self.build_date)
-
-                    main_tab = self.get_main_tab()
-                    update_group_box = main_tab.update_group_box
-
-                    update_group_box.post_extraction()
-
-                else:
-                    last_frame = bytes
-                    if self.last_bytes is not None:
-                        last_frame = self.last_bytes + last_frame
-
-                    match = re.search(
-                        b'(?P<version>[01]\\.[A-F](-\\d+-g[0-9a-f]+)?)\\x00',
-                        last_frame)
-                    if match is not None:
-                        game_version = match.group('version').decode('ascii')
-                        if len(game_version) > len(self.game_version):
-                            self.game_version = game_version
-
-                    self.exe_total_read += len(bytes)
-                    self.reading_progress_bar.setValue(self.exe_total_read)
-                    self.exe_sha256.update(bytes)
-                    self.last_bytes = bytes
-
-            timer.timeout.connect(timeout)
-            timer.start(0)
-
-        if self.exe_path is None:
             self.previous_lgb_enabled = False
         else:
+            if os.path.basename(self.exe_path) == 'cataclysm.exe':
+                self.version_type = _('console')
+            else:
+                self.version_type = _('tiles')
             self.previous_lgb_enabled = True
 
+            self.update_version()
+
 
 class UpdateGroupBox(QGroupBox):
     def __init__(self):
@@ -1667,10 +1659,13 @@ class UpdateGroupBox(QGroupBox):
         self.updating = False
         self.close_after_update = False
         self.builds = []
-        self.progress_copy = None
+        self.update_worker = None
 
         self.qnam = QNetworkAccessManager()
-        self.http_reply = None
+
+        self.build_catalog = BuildCatalog(self.qnam)
+        self.build_catalog.fetched.connect(self.catalog_fetched)
+        self.lb_url = None
 
         layout = QGridLayout()
 
@@ -1786,17 +1781,84 @@ class UpdateGroupBox(QGroupBox):
 
             self.start_lb_request(BASE_URLS[graphics][platform])
 
+            # Prefetch the other channels so switching between them is
+            # instant
+            self.build_catalog.fetch_all()
+
+            # Once the game directory is shown, deal with an update that was
+            # interrupted the last time the launcher ran
+            QTimer.singleShot(0, self.check_update_journal)
+
         self.shown = True
 
+    def check_update_journal(self):
+        journal = get_update_journal()
+        if journal is None or self.updating:
+            return
+
+        if not os.path.isdir(journal['game_dir']) and (
+            journal['old_dir'] is None
+            or not os.path.isdir(journal['old_dir'])):
+            delete_update_journal()
+            return
+
+        journal_msgbox = QMessageBox()
+        journal_msgbox.setWindowTitle(_('Interrupted update'))
+        journal_msgbox.setText(_('The launcher was closed while the game in '
+            '{game_dir} was being updated.').format(
+            game_dir=journal['game_dir']))
+        journal_msgbox.setInformativeText(_('Do you want to resume the update '
+            'or to go back to the version you had before?'))
+        journal_msgbox.addButton(_('Resume the update'), QMessageBox.YesRole)
+        journal_msgbox.addButton(_('Go back to the previous version'),
+            QMessageBox.NoRole)
+        journal_msgbox.setIcon(QMessageBox.Question)
+
+        main_tab = self.get_main_tab()
+        game_dir_group_box = main_tab.game_dir_group_box
+        if game_dir_group_box.dir_combo.currentText() != journal['game_dir']:
+            game_dir_group_box.set_dir_combo_value(journal['game_dir'])
+
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+
+        if journal_msgbox.exec() == 0:
+            self.start_update_worker(UpdateWorker(journal=journal))
+            return
+
+        try:
+            rollback_update(journal)
+            status_bar.showMessage(_('Interrupted update rolled back'))
+        except OSError as e:
+            delete_update_journal()
+            status_bar.showMessage(str(e))
+
+        game_dir_group_box.game_directory_changed()
+
+    def disable_update_controls(self):
+        main_tab = self.get_main_tab()
+        game_dir_group_box = main_tab.game_dir_group_box
+
+        game_dir_group_box.disable_controls()
+        self.disable_controls()
+
+        soundpacks_tab = main_tab.get_soundpacks_tab()
+        mods_tab = main_tab.get_mods_tab()
+        settings_tab = main_tab.get_settings_tab()
+        backups_tab = main_tab.get_backups_tab()
+
+        soundpacks_tab.disable_tab()
+        mods_tab.disable_tab()
+        settings_tab.disable_tab()
+        backups_tab.disable_tab()
+
+        if game_dir_group_box.exe_path is not None:
+            self.update_button.setText(_('Cancel update'))
+        else:
+            self.update_button.setText(_('Cancel installation'))
+
     def update_game(self):
         if not self.updating:
-            self.updating = True
-            self.download_aborted = False
-            self.backing_up_game = False
-            self.extracting_new_build = False
-            self.analysing_new_build = False
-            self.in_post_extraction = False
-
             self.selected_build = self.builds[self.builds_combo.currentIndex()]
 
             main_tab = self.get_main_tab()
@@ -1817,236 +1879,166 @@ class UpdateGroupBox(QGroupBox):
                 confirm_msgbox.setIcon(QMessageBox.Question)
 
                 if confirm_msgbox.exec() == 1:
-                    self.updating = False
                     return
 
-            game_dir_group_box.disable_controls()
-            self.disable_controls()
-
-            soundpacks_tab = main_tab.get_soundpacks_tab()
-            mods_tab = main_tab.get_mods_tab()
-            settings_tab = main_tab.get_settings_tab()
-            backups_tab = main_tab.get_backups_tab()
-
-            soundpacks_tab.disable_tab()
-            mods_tab.disable_tab()
-            settings_tab.disable_tab()
-            backups_tab.disable_tab()
-
             game_dir = game_dir_group_box.dir_combo.currentText()
 
-            try:
-                if not os.path.exists(game_dir):
-                    os.makedirs(game_dir)
-                elif os.path.isfile(game_dir):
-                    main_window = self.get_main_window()
-                    status_bar = main_window.statusBar()
+            self.start_update_worker(UpdateWorker(game_dir,
+                self.selected_build))
+        else:
+            # The update stops as soon as it can and puts the previous
+            # version back in place before finishing
+            self.update_worker.cancel()
+            self.update_button.setEnabled(False)
 
-                    status_bar.showMessage(_('Cannot install game on a file'))
+    def start_update_worker(self, update_worker):
+        self.updating = True
 
-                    self.finish_updating()
-                    return
+        main_tab = self.get_main_tab()
+        game_dir_group_box = main_tab.game_dir_group_box
+        self.installing = game_dir_group_box.exe_path is None
 
-                temp_dir = os.path.join(os.environ['TEMP'],
-                    'CDDA Game Launcher')
-                if not os.path.exists(temp_dir):
-                    os.makedirs(temp_dir)
-                
-                download_dir = os.path.join(temp_dir, 'newbuild')
-                while os.path.exists(download_dir):
-                    download_dir = os.path.join(temp_dir, 'newbuild-{0}'.format(
-                        '%08x' % random.randrange(16**8)))
-                os.makedirs(download_dir)
+        self.disable_update_controls()
 
-                download_url = self.selected_build['url']
-                
-                url = QUrl(download_url)
-                file_info = QFileInfo(url.path())
-                file_name = file_info.fileName()
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+        status_bar.clearMessage()
 
-                self.downloaded_file = os.path.join(download_dir, file_name)
-                self.downloading_file = open(self.downloaded_file, 'wb')
+        status_bar.busy += 1
 
-                self.download_game_update(download_url)
+        update_label = QLabel()
+        status_bar.addWidget(update_label, 100)
+        self.update_label = update_label
 
-            except OSError as e:
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
+        update_speed_label = QLabel()
+        status_bar.addWidget(update_speed_label)
+        self.update_speed_label = update_speed_label
 
-                self.finish_updating()
+        update_size_label = QLabel()
+        status_bar.addWidget(update_size_label)
+        self.update_size_label = update_size_label
 
-                status_bar.showMessage(str(e))
-        else:
-            main_tab = self.get_main_tab()
-            game_dir_group_box = main_tab.game_dir_group_box
+        progress_bar = QProgressBar()
+        progress_bar.setMinimum(0)
+        status_bar.addWidget(progress_bar)
+        self.update_progress_bar = progress_bar
 
-            # Are we downloading the file?
-            if self.download_http_reply.isRunning():
-                self.download_aborted = True
-                self.download_http_reply.abort()
+        self.update_stage = None
+        self.update_last_done = 0
+        self.update_last_time = datetime.utcnow()
 
-                main_window = self.get_main_window()
+        update_worker.finished.connect(self.update_worker_finished)
+        self.update_worker = update_worker
 
-                status_bar = main_window.statusBar()
+        timer = QTimer(self)
+        timer.timeout.connect(self.show_update_progress)
+        self.update_timer = timer
 
-                if game_dir_group_box.exe_path is not None:
-                    if status_bar.busy == 0:
-                        status_bar.showMessage(_('Update cancelled'))
-                else:
-                    if status_bar.busy == 0:
-                        status_bar.showMessage(_('Installation cancelled'))
-            elif self.backing_up_game:
-                self.backup_timer.stop()
+        update_worker.start()
+        timer.start(int(PROGRESS_INTERVAL.total_seconds() * 1000))
 
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
+    def show_update_progress(self):
+        stage, done, total, name = self.update_worker.state
+        if stage is None:
+            return
 
-                status_bar.removeWidget(self.backup_label)
-                status_bar.removeWidget(self.backup_progress_bar)
+        if stage != self.update_stage:
+            self.update_stage = stage
+            self.update_last_done = done
+            self.update_last_time = datetime.utcnow()
+            self.update_speed_label.setText('')
+            self.update_size_label.setText('')
+
+        if stage == 'download':
+            text = _('Downloading: {0}').format(name)
+        elif stage == 'backup':
+            text = _('Backing up {0}').format(name)
+        elif stage == 'extract':
+            text = _('Extracting {0}').format(name)
+        elif stage == 'analysis':
+            text = _('Reading: {0}').format(name)
+        elif stage == 'copy':
+            text = _('Copying {0}').format(name)
+        elif name == 'tilesets':
+            text = _('Restoring custom tilesets')
+        elif name == 'soundpacks':
+            text = _('Restoring custom soundpacks')
+        elif name == 'mods':
+            text = _('Restoring custom mods')
+        else:
+            text = _('Restoring custom fonts')
+        self.update_label.setText(text)
 
-                status_bar.busy -= 1
+        # The progress bar only holds an int, count sizes in KiB
+        if stage in ('download', 'extract', 'copy'):
+            self.update_progress_bar.setMaximum(total // 1024)
+            self.update_progress_bar.setValue(done // 1024)
+        else:
+            self.update_progress_bar.setMaximum(total)
+            self.update_progress_bar.setValue(done)
 
-                self.restore_backup()
+        if stage in ('download', 'copy'):
+            self.update_size_label.setText(_('{bytes_read}/{total_bytes}'
+                ).format(bytes_read=sizeof_fmt(done),
+                    total_bytes=sizeof_fmt(total)))
 
-                if game_dir_group_box.exe_path is not None:
-                    if status_bar.busy == 0:
-                        status_bar.showMessage(_('Update cancelled'))
-                else:
-                    if status_bar.busy == 0:
-                        status_bar.showMessage(_('Installation cancelled'))
+            delta_time = datetime.utcnow() - self.update_last_time
+            if delta_time >= 5 * PROGRESS_INTERVAL:
+                bytes_secs = ((done - self.update_last_done)
+                    / delta_time.total_seconds())
+                self.update_speed_label.setText(_('{bytes_sec}/s').format(
+                    bytes_sec=sizeof_fmt(bytes_secs)))
 
-            elif self.extracting_new_build:
-                self.extracting_timer.stop()
+                self.update_last_done = done
+                self.update_last_time = datetime.utcnow()
 
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
+    def update_worker_finished(self):
+        self.update_timer.stop()
+        self.update_timer = None
 
-                status_bar.removeWidget(self.extracting_label)
-                status_bar.removeWidget(self.extracting_progress_bar)
+        update_worker = self.update_worker
+        self.update_worker = None
 
-                status_bar.busy -= 1
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
 
-                self.extracting_zipfile.close()
+        status_bar.removeWidget(self.update_label)
+        status_bar.removeWidget(self.update_speed_label)
+        status_bar.removeWidget(self.update_size_label)
+        status_bar.removeWidget(self.update_progress_bar)
 
-                download_dir = os.path.dirname(self.downloaded_file)
-                retry_rmtree(download_dir)
+        status_bar.busy -= 1
 
-                path = self.clean_game_dir()
-                self.restore_backup()
-                self.restore_previous_content(path)
+        main_tab = self.get_main_tab()
+        game_dir_group_box = main_tab.game_dir_group_box
+        game_dir_group_box.game_dir_updated()
 
-                if game_dir_group_box.exe_path is not None:
-                    if status_bar.busy == 0:
-                        status_bar.showMessage(_('Update cancelled'))
+        if update_worker.stopped:
+            if status_bar.busy == 0:
+                if self.installing:
+                    status_bar.showMessage(_('Installation cancelled'))
                 else:
-                    if status_bar.busy == 0:
-                        status_bar.showMessage(_('Installation cancelled'))
-            elif self.analysing_new_build:
-                game_dir_group_box.opened_exe.close()
-                game_dir_group_box.exe_reading_timer.stop()
-
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
-
-                status_bar.removeWidget(game_dir_group_box.reading_label)
-                status_bar.removeWidget(game_dir_group_box.reading_progress_bar)
-
-                status_bar.busy -= 1
+                    status_bar.showMessage(_('Update cancelled'))
+        elif update_worker.error is not None:
+            status_bar.showMessage(update_worker.error)
+        else:
+            if self.installing:
+                message = _('Installation completed')
+            else:
+                message = _('Update completed')
 
-                path = self.clean_game_dir()
-                self.restore_backup()
-                self.restore_previous_content(path)
+            if status_bar.busy == 0 and len(self.builds) > 0:
+                last_build = self.builds[0]
+                build = update_worker.update.build
 
-                if game_dir_group_box.exe_path is not None:
-                    if status_bar.busy == 0:
-                        status_bar.showMessage(_('Update cancelled'))
+                if last_build['number'] == build['number']:
+                    message = message + ' - ' + _('Your game is up to date')
                 else:
-                    if status_bar.busy == 0:
-                        status_bar.showMessage(_('Installation cancelled'))
-            elif self.in_post_extraction:
-                self.in_post_extraction = False
+                    message = message + ' - ' + _('There is a new update '
+                        'available')
+            status_bar.showMessage(message)
 
-                if self.progress_copy is not None:
-                    self.progress_copy.stop()
-
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
-                status_bar.clearMessage()
-
-                path = self.clean_game_dir()
-                self.restore_backup()
-                self.restore_previous_content(path)
-
-                if game_dir_group_box.exe_path is not None:
-                    if status_bar.busy == 0:
-                        status_bar.showMessage(_('Update cancelled'))
-                else:
-                    if status_bar.busy == 0:
-                        status_bar.showMessage(_('Installation cancelled'))
-
-            self.finish_updating()
-
-    def clean_game_dir(self):
-        game_dir = self.game_dir
-        dir_list = os.listdir(game_dir)
-        if len(dir_list) == 0 or (
-            len(dir_list) == 1 and dir_list[0] == 'previous_version'):
-            return None
-
-        temp_dir = os.path.join(os.environ['TEMP'], 'CDDA Game Launcher')
-        if not os.path.exists(temp_dir):
-            os.makedirs(temp_dir)
-
-        temp_move_dir = os.path.join(temp_dir, 'moved')
-        while os.path.exists(temp_move_dir):
-            temp_move_dir = os.path.join(temp_dir, 'moved-{0}'.format(
-                '%08x' % random.randrange(16**8)))
-        os.makedirs(temp_move_dir)
-
-        excluded_entries = set(['previous_version'])
-        if config_true(get_config_value('prevent_save_move', 'False')):
-            excluded_entries.add('save')
-        # Prevent moving the launcher if it's in the game directory
-        if getattr(sys, 'frozen', False):
-            launcher_exe = os.path.abspath(sys.executable)
-            launcher_dir = os.path.dirname(launcher_exe)
-            if os.path.abspath(game_dir) == launcher_dir:
-                excluded_entries.add(os.path.basename(launcher_exe))
-        for entry in dir_list:
-            if entry not in excluded_entries:
-                entry_path = os.path.join(game_dir, entry)
-                shutil.move(entry_path, temp_move_dir)
-
-        return temp_move_dir
-
-    def restore_previous_content(self, path):
-        if path is None:
-            return
-
-        game_dir = self.game_dir
-        previous_version_dir = os.path.join(game_dir, 'previous_version')
-        if not os.path.exists(previous_version_dir):
-            os.makedirs(previous_version_dir)
-
-        for entry in os.listdir(path):
-            entry_path = os.path.join(path, entry)
-            shutil.move(entry_path, previous_version_dir)
-
-    def restore_backup(self):
-        game_dir = self.game_dir
-        previous_version_dir = os.path.join(game_dir, 'previous_version')
-
-        if os.path.isdir(previous_version_dir) and os.path.isdir(game_dir):
-
-            for entry in os.listdir(previous_version_dir):
-                if (entry == 'save' and
-                    config_true(get_config_value('prevent_save_move',
-                        'False'))):
-                    continue
-                entry_path = os.path.join(previous_version_dir, entry)
-                shutil.move(entry_path, game_dir)
-
-            retry_rmtree(previous_version_dir)
+        self.finish_updating()
 
     def get_main_tab(self):
         return self.parentWidget()
@@ -2084,655 +2076,9 @@ class UpdateGroupBox(QGroupBox):
 
         self.update_button.setEnabled(self.previous_ub_enabled)
 
-    def download_game_update(self, url):
-        main_window = self.get_main_window()
-
-        status_bar = main_window.statusBar()
-        status_bar.clearMessage()
-
-        status_bar.busy += 1
-
-        downloading_label = QLabel()
-        downloading_label.setText(_('Downloading: {0}').format(url))
-        status_bar.addWidget(downloading_label, 100)
-        self.downloading_label = downloading_label
-
-        dowloading_speed_label = QLabel()
-        status_bar.addWidget(dowloading_speed_label)
-        self.dowloading_speed_label = dowloading_speed_label
-
-        downloading_size_label = QLabel()
-        status_bar.addWidget(downloading_size_label)
-        self.downloading_size_label = downloading_size_label
-
-        progress_bar = QProgressBar()
-        status_bar.addWidget(progress_bar)
-        self.downloading_progress_bar = progress_bar
-        progress_bar.setMinimum(0)
-
-        self.download_last_read = datetime.utcnow()
-        self.download_last_bytes_read = 0
-        self.download_speed_count = 0
-
-        self.download_http_reply = self.qnam.get(QNetworkRequest(QUrl(url)))
-        self.download_http_reply.finished.connect(self.download_http_finished)
-        self.download_http_reply.readyRead.connect(
-            self.download_http_ready_read)
-        self.download_http_reply.downloadProgress.connect(
-            self.download_dl_progress)
-
-        main_tab = self.get_main_tab()
-        game_dir_group_box = main_tab.game_dir_group_box
-
-        if game_dir_group_box.exe_path is not None:
-            self.update_button.setText(_('Cancel update'))
-        else:
-            self.update_button.setText(_('Cancel installation'))
-
-    def download_http_finished(self):
-        self.downloading_file.close()
-
-        main_window = self.get_main_window()
-
-        status_bar = main_window.statusBar()
-        status_bar.removeWidget(self.downloading_label)
-        status_bar.removeWidget(self.dowloading_speed_label)
-        status_bar.removeWidget(self.downloading_size_label)
-        status_bar.removeWidget(self.downloading_progress_bar)
-
-        status_bar.busy -= 1
-
-        if self.download_aborted:
-            download_dir = os.path.dirname(self.downloaded_file)
-            retry_rmtree(download_dir)
-        else:
-            # Test downloaded file
-            status_bar.showMessage(_('Testing downloaded file archive'))
-
-            class TestingZipThread(QThread):
-                completed = pyqtSignal()
-                invalid = pyqtSignal()
-                not_downloaded = pyqtSignal()
-
-                def __init__(self, downloaded_file):
-                    super(TestingZipThread, self).__init__()
-
-                    self.downloaded_file = downloaded_file                    
-
-                def __del__(self):
-                    self.wait()
-
-                def run(self):
-                    try:
-                        with zipfile.ZipFile(self.downloaded_file) as z:
-                            if z.testzip() is not None:
-                                self.invalid.emit()
-                                return
-                    except zipfile.BadZipFile:
-                        self.not_downloaded.emit()
-                        return
-
-                    self.completed.emit()
-
-            def completed_test():
-                self.test_thread = None
-
-                status_bar.clearMessage()
-                self.backup_current_game()
-
-            def invalid():
-                self.test_thread = None
-
-                status_bar.clearMessage()
-                status_bar.showMessage(_('Downloaded archive is invalid'))
-
-                download_dir = os.path.dirname(self.downloaded_file)
-                retry_rmtree(download_dir)
-                self.finish_updating()
-
-            def not_downloaded():
-                self.test_thread = None
-
-                status_bar.clearMessage()
-                status_bar.showMessage(_('Could not download game'))
-
-                download_dir = os.path.dirname(self.downloaded_file)
-                retry_rmtree(download_dir)
-                self.finish_updating()
-
-            test_thread = TestingZipThread(self.downloaded_file)
-            test_thread.completed.connect(completed_test)
-            test_thread.invalid.connect(invalid)
-            test_thread.not_downloaded.connect(not_downloaded)
-            test_thread.start()
-
-            self.test_thread = test_thread
-
-    def backup_current_game(self):
-        self.backing_up_game = True
-
-        main_tab = self.get_main_tab()
-        game_dir_group_box = main_tab.game_dir_group_box
-
-        game_dir = game_dir_group_box.dir_combo.currentText()
-        self.game_dir = game_dir
-
-        main_window = self.get_main_window()
-        status_bar = main_window.statusBar()
-
-        backup_dir = os.path.join(game_dir, 'previous_version')
-        if os.path.isdir(backup_dir):
-            status_bar.showMessage(_('Deleting previous_version directory'))
-            if not retry_rmtree(backup_dir):
-                self.backing_up_game = False
-
-                if game_dir_group_box.exe_path is not None:
-                    if status_bar.busy == 0:
-                        status_bar.showMessage(_('Update cancelled'))
-                else:
-                    if status_bar.busy == 0:
-                        status_bar.showMessage(_('Installation cancelled'))
-
-                self.finish_updating()
-                return
-            status_bar.clearMessage()
-
-        dir_list = os.listdir(game_dir)
-        self.backup_dir_list = dir_list
-
-        if (config_true(get_config_value('prevent_save_move', 'False'))
-            and 'save' in dir_list):
-            dir_list.remove('save')
-
-        if getattr(sys, 'frozen', False):
-            launcher_exe = os.path.abspath(sys.executable)
-            launcher_dir = os.path.dirname(launcher_exe)
-            if os.path.abspath(game_dir) == launcher_dir:
-                launcher_name = os.path.basename(launcher_exe)
-                if launcher_name in dir_list:
-                    dir_list.remove(launcher_name)
-
-        if len(dir_list) > 0:
-            status_bar.showMessage(_('Backing up current game'))
-
-            status_bar.busy += 1
-
-            backup_label = QLabel()
-            status_bar.addWidget(backup_label, 100)
-            self.backup_label = backup_label
-
-            progress_bar = QProgressBar()
-            status_bar.addWidget(progress_bar)
-            self.backup_progress_bar = progress_bar
-
-            timer = QTimer(self)
-            self.backup_timer = timer
-
-            progress_bar.setRange(0, len(dir_list))
-
-            os.makedirs(backup_dir)
-            self.backup_dir = backup_dir
-            self.backup_index = 0
-            self.backup_current_display = True
-
-            def timeout():
-                self.backup_progress_bar.setValue(self.backup_index)
-
-                if self.backup_index == len(self.backup_dir_list):
-                    self.backup_timer.stop()
-
-                    main_window = self.get_main_window()
-                    status_bar = main_window.statusBar()
-
-                    status_bar.removeWidget(self.backup_label)
-                    status_bar.removeWidget(self.backup_progress_bar)
-
-                    status_bar.busy -= 1
-                    status_bar.clearMessage()
-
-                    self.backing_up_game = False
-                    self.extract_new_build()
-
-                else:
-                    backup_element = self.backup_dir_list[self.backup_index]
-
-                    if self.backup_current_display:
-                        self.backup_label.setText(_('Backing up {0}').format(
-                            backup_element))
-                        self.backup_current_display = False
-                    else:
-                        try:
-                            shutil.move(os.path.join(self.game_dir,
-                                backup_element), self.backup_dir)
-                        except OSError as e:
-                            self.backup_timer.stop()
-                            
-                            main_window = self.get_main_window()
-                            status_bar = main_window.statusBar()
-
-                            status_bar.removeWidget(self.backup_label)
-                            status_bar.removeWidget(self.backup_progress_bar)
-
-                            status_bar.busy -= 1
-                            status_bar.clearMessage()
-
-                            self.finish_updating()
-
-                            status_bar.showMessage(str(e))
-
-                        self.backup_index += 1
-                        self.backup_current_display = True
-
-            timer.timeout.connect(timeout)
-            timer.start(0)
-        else:
-            self.backing_up_game = False
-            self.extract_new_build()
-
-    def extract_new_build(self):
-        self.extracting_new_build = True
-        
-        z = zipfile.ZipFile(self.downloaded_file)
-        self.extracting_zipfile = z
-
-        self.extracting_infolist = z.infolist()
-        self.extracting_index = 0
-
-        main_window = self.get_main_window()
-        status_bar = main_window.statusBar()
-
-        status_bar.busy += 1
-
-        extracting_label = QLabel()
-        status_bar.addWidget(extracting_label, 100)
-        self.extracting_label = extracting_label
-
-        progress_bar = QProgressBar()
-        status_bar.addWidget(progress_bar)
-        self.extracting_progress_bar = progress_bar
-
-        timer = QTimer(self)
-        self.extracting_timer = timer
-
-        progress_bar.setRange(0, len(self.extracting_infolist))
-
-        def timeout():
-            self.extracting_progress_bar.setValue(self.extracting_index)
-
-            if self.extracting_index == len(self.extracting_infolist):
-                self.extracting_timer.stop()
-
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
-
-                status_bar.removeWidget(self.extracting_label)
-                status_bar.removeWidget(self.extracting_progress_bar)
-
-                status_bar.busy -= 1
-
-                self.extracting_new_build = False
-
-                self.extracting_zipfile.close()
-
-                # Keep a copy of the archive if selected in the settings
-                if config_true(get_config_value('keep_archive_copy', 'False')):
-                    archive_dir = get_config_value('archive_directory', '')
-                    archive_name = os.path.basename(self.downloaded_file)
-                    move_target = os.path.join(archive_dir, archive_name)
-                    if (os.path.isdir(archive_dir)
-                        and not os.path.exists(move_target)):
-                        shutil.move(self.downloaded_file, archive_dir)
-
-                download_dir = os.path.dirname(self.downloaded_file)
-                retry_rmtree(download_dir)
-
-                main_tab = self.get_main_tab()
-                game_dir_group_box = main_tab.game_dir_group_box
-
-                self.analysing_new_build = True
-                game_dir_group_box.analyse_new_build(self.selected_build)
-
-            else:
-                extracting_element = self.extracting_infolist[
-                    self.extracting_index]
-                self.extracting_label.setText(_('Extracting {0}').format(
-                    extracting_element.filename))
-                
-                self.extracting_zipfile.extract(extracting_element,
-                    self.game_dir)
-
-                self.extracting_index += 1
-
-        timer.timeout.connect(timeout)
-        timer.start(0)
-
-    def asset_name(self, path, filename):
-        asset_file = os.path.join(path, filename)
-
-        if not os.path.isfile(asset_file):
-            disabled_asset_file = os.path.join(path, filename + '.disabled')
-            if not os.path.isfile(disabled_asset_file):
-                return None
-            else:
-                asset_file_path = disabled_asset_file
-        else:
-            asset_file_path = asset_file
-
-        try:
-            with open(asset_file_path, 'r') as f:
-                for line in f:
-                    if line.startswith('NAME'):
-                        space_index = line.find(' ')
-                        name = line[space_index:].strip().replace(
-                            ',', '')
-                        return name
-        except FileNotFoundError:
-            return None
-        return None
-
-    def mod_ident(self, path):
-        json_file = os.path.join(path, 'modinfo.json')
-        if not os.path.isfile(json_file):
-            json_file = os.path.join(path, 'modinfo.json.disabled')
-        if os.path.isfile(json_file):
-            try:
-                with open(json_file, 'r') as f:
-                    try:
-                        values = json.load(f)
-                        if isinstance(values, dict):
-                            if values.get('type', '') == 'MOD_INFO':
-                                return values.get('ident', None)
-                        elif isinstance(values, list):
-                            for item in values:
-                                if (isinstance(item, dict)
-                                    and item.get('type', '') == 'MOD_INFO'):
-                                        return item.get('ident', None)
-                    except ValueError:
-                        pass
-            except FileNotFoundError:
-                return None
-
-        return None
-
-    def copy_next_dir(self):
-        if self.in_post_extraction and len(self.previous_dirs) > 0:
-            next_dir = self.previous_dirs.pop()
-            src_path = os.path.join(self.previous_version_dir, next_dir)
-            dst_path = os.path.join(self.game_dir, next_dir)
-            if os.path.isdir(src_path) and not os.path.exists(dst_path):
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
-
-                progress_copy = ProgressCopyTree(src_path, dst_path, status_bar,
-                    _('{0} directory').format(next_dir))
-                progress_copy.completed.connect(self.copy_next_dir)
-                self.progress_copy = progress_copy
-                progress_copy.start()
-            else:
-                self.copy_next_dir()
-        elif self.in_post_extraction:
-            self.progress_copy = None
-            self.post_extraction_step2()
-
-    def post_extraction(self):
-        self.analysing_new_build = False
-        self.in_post_extraction = True
-
-        main_window = self.get_main_window()
-        status_bar = main_window.statusBar()
-
-        # Copy config, save, templates and memorial directory from previous
-        # version
-        previous_version_dir = os.path.join(self.game_dir, 'previous_version')
-        if os.path.isdir(previous_version_dir) and self.in_post_extraction:
-
-            previous_dirs = ['config', 'save', 'templates', 'memorial',
-                'graveyard', 'save_backups']
-            if (config_true(get_config_value('prevent_save_move', 'False')) and
-                'save' in previous_dirs):
-                previous_dirs.remove('save')
-
-            self.previous_dirs = previous_dirs
-            self.previous_version_dir = previous_version_dir
-
-            self.progress_copy = None
-            self.copy_next_dir()
-        elif self.in_post_extraction:
-            # New install
-            self.in_post_extraction = False
-            self.finish_updating()
-
-    def post_extraction_step2(self):
-        main_window = self.get_main_window()
-        status_bar = main_window.statusBar()
-
-        # Copy custom tilesets, mods and soundpack from previous version
-        # tilesets
-        tilesets_dir = os.path.join(self.game_dir, 'gfx')
-        previous_tilesets_dir = os.path.join(self.game_dir, 'previous_version',
-            'gfx')
-
-        if (os.path.isdir(tilesets_dir) and os.path.isdir(previous_tilesets_dir)
-            and self.in_post_extraction):
-            status_bar.showMessage(_('Restoring custom tilesets'))
-
-            official_set = {}
-            for entry in os.listdir(tilesets_dir):
-                if not self.in_post_extraction:
-                    break
-
-                entry_path = os.path.join(tilesets_dir, entry)
-                if os.path.isdir(entry_path):
-                    name = self.asset_name(entry_path, 'tileset.txt')
-                    if name is not None and name not in official_set:
-                        official_set[name] = entry_path
-
-            previous_set = {}
-            for entry in os.listdir(previous_tilesets_dir):
-                if not self.in_post_extraction:
-                    break
-
-                entry_path = os.path.join(previous_tilesets_dir, entry)
-                if os.path.isdir(entry_path):
-                    name = self.asset_name(entry_path, 'tileset.txt')
-                    if name is not None and name not in previous_set:
-                        previous_set[name] = entry_path
-
-            custom_set = set(previous_set.keys()) - set(official_set.keys())
-            for item in custom_set:
-                if not self.in_post_extraction:
-                    break
-
-                target_dir = os.path.join(tilesets_dir, os.path.basename(
-                    previous_set[item]))
-                if not os.path.exists(target_dir):
-                    shutil.copytree(previous_set[item], target_dir)
-
-            status_bar.clearMessage()
-
-        # soundpacks
-        soundpack_dir = os.path.join(self.game_dir, 'data', 'sound')
-        previous_soundpack_dir = os.path.join(self.game_dir, 'previous_version',
-            'data', 'sound')
-
-        if (os.path.isdir(soundpack_dir) and os.path.isdir(
-            previous_soundpack_dir) and self.in_post_extraction):
-            status_bar.showMessage(_('Restoring custom soundpacks'))
-
-            official_set = {}
-            for entry in os.listdir(soundpack_dir):
-                if not self.in_post_extraction:
-                    break
-
-                entry_path = os.path.join(soundpack_dir, entry)
-                if os.path.isdir(entry_path):
-                    name = self.asset_name(entry_path, 'soundpack.txt')
-                    if name is not None and name not in official_set:
-                        official_set[name] = entry_path
-
-            previous_set = {}
-            for entry in os.listdir(previous_soundpack_dir):
-                if not self.in_post_extraction:
-                    break
-
-                entry_path = os.path.join(previous_soundpack_dir, entry)
-                if os.path.isdir(entry_path):
-                    name = self.asset_name(entry_path, 'soundpack.txt')
-                    if name is not None and name not in previous_set:
-                        previous_set[name] = entry_path
-
-            custom_set = set(previous_set.keys()) - set(official_set.keys())
-            if len(custom_set) > 0:
-                self.soundpack_dir = soundpack_dir
-                self.previous_soundpack_set = previous_set
-                self.custom_soundpacks = list(custom_set)
-
-                self.copy_next_soundpack()
-            else:
-                status_bar.clearMessage()
-                self.post_extraction_step3()
-            
-        else:
-            self.post_extraction_step3()
-
-    def copy_next_soundpack(self):
-        if self.in_post_extraction and len(self.custom_soundpacks) > 0:
-            next_item = self.custom_soundpacks.pop()
-            dst_path = os.path.join(self.soundpack_dir, os.path.basename(
-                self.previous_soundpack_set[next_item]))
-            src_path = self.previous_soundpack_set[next_item]
-            if os.path.isdir(src_path) and not os.path.exists(dst_path):
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
-
-                progress_copy = ProgressCopyTree(src_path, dst_path, status_bar,
-                    _('{name} soundpack').format(name=next_item))
-                progress_copy.completed.connect(self.copy_next_soundpack)
-                self.progress_copy = progress_copy
-                progress_copy.start()
-            else:
-                self.copy_next_soundpack()
-        elif self.in_post_extraction:
-            self.progress_copy = None
-
-            main_window = self.get_main_window()
-            status_bar = main_window.statusBar()
-            status_bar.clearMessage()
-
-            self.post_extraction_step3()
-    
-    def post_extraction_step3(self):
-        if not self.in_post_extraction:
-            return
-
-        main_window = self.get_main_window()
-        status_bar = main_window.statusBar()
-
-        # mods
-        mods_dir = os.path.join(self.game_dir, 'data', 'mods')
-        previous_mods_dir = os.path.join(self.game_dir, 'previous_version',
-            'data', 'mods')
-
-        if (os.path.isdir(mods_dir) and os.path.isdir(previous_mods_dir) and
-            self.in_post_extraction):
-            status_bar.showMessage(_('Restoring custom mods'))
-
-            official_set = {}
-            for entry in os.listdir(mods_dir):
-                entry_path = os.path.join(mods_dir, entry)
-                if os.path.isdir(entry_path):
-                    name = self.mod_ident(entry_path)
-                    if name is not None and name not in official_set:
-                        official_set[name] = entry_path
-            previous_set = {}
-            for entry in os.listdir(previous_mods_dir):
-                entry_path = os.path.join(previous_mods_dir, entry)
-                if os.path.isdir(entry_path):
-                    name = self.mod_ident(entry_path)
-                    if name is not None and name not in previous_set:
-                        previous_set[name] = entry_path
-
-            custom_set = set(previous_set.keys()) - set(official_set.keys())
-            for item in custom_set:
-                target_dir = os.path.join(mods_dir, os.path.basename(
-                    previous_set[item]))
-                if not os.path.exists(target_dir):
-                    shutil.copytree(previous_set[item], target_dir)
-
-            status_bar.clearMessage()
-
-        if not self.in_post_extraction:
-            return
-
-        # Copy user-default-mods.json if present
-        user_default_mods_file = os.path.join(mods_dir,
-            'user-default-mods.json')
-        previous_user_default_mods_file = os.path.join(previous_mods_dir,
-            'user-default-mods.json')
-
-        if (not os.path.exists(user_default_mods_file)
-            and os.path.isfile(previous_user_default_mods_file)):
-            status_bar.showMessage(_('Restoring user-default-mods.json'))
-
-            shutil.copy2(previous_user_default_mods_file,
-                user_default_mods_file)
-
-            status_bar.clearMessage()
-
-        # Copy custom fonts
-        fonts_dir = os.path.join(self.game_dir, 'data', 'font')
-        previous_fonts_dir = os.path.join(self.game_dir, 'previous_version',
-            'data', 'font')
-
-        if (os.path.isdir(fonts_dir) and os.path.isdir(previous_fonts_dir) and
-            self.in_post_extraction):
-            status_bar.showMessage(_('Restoring custom fonts'))
-
-            official_set = set(os.listdir(fonts_dir))
-            previous_set = set(os.listdir(previous_fonts_dir))
-
-            custom_set = previous_set - official_set
-            for entry in custom_set:
-                source = os.path.join(previous_fonts_dir, entry)
-                target = os.path.join(fonts_dir, entry)
-                if os.path.isfile(source):
-                    shutil.copy2(source, target)
-                elif os.path.isdir(source):
-                    shutil.copytree(source, target)
-
-            status_bar.clearMessage()
-
-        if not self.in_post_extraction:
-            return
-
-        main_tab = self.get_main_tab()
-        game_dir_group_box = main_tab.game_dir_group_box
-
-        if game_dir_group_box.previous_exe_path is not None:
-            status_bar.showMessage(_('Update completed'))
-        else:
-            status_bar.showMessage(_('Installation completed'))
-
-        if (game_dir_group_box.current_build is not None
-            and status_bar.busy == 0):
-            last_build = self.builds[0]
-
-            message = status_bar.currentMessage()
-            if message != '':
-                message = message + ' - '
-
-            if last_build['number'] == game_dir_group_box.current_build:
-                message = message + _('Your game is up to date')
-            else:
-                message = message + _('There is a new update available')
-            status_bar.showMessage(message)
-
-        self.in_post_extraction = False
-
-        self.finish_updating()
-
     def finish_updating(self):
         self.updating = False
+
         main_tab = self.get_main_tab()
         game_dir_group_box = main_tab.game_dir_group_box
 
@@ -2761,30 +2107,6 @@ class UpdateGroupBox(QGroupBox):
         if self.close_after_update:
             self.get_main_window().close()
 
-    def download_http_ready_read(self):
-        self.downloading_file.write(self.download_http_reply.readAll())
-
-    def download_dl_progress(self, bytes_read, total_bytes):
-        self.downloading_progress_bar.setMaximum(total_bytes)
-        self.downloading_progress_bar.setValue(bytes_read)
-
-        self.download_speed_count += 1
-
-        self.downloading_size_label.setText(_('{bytes_read}/{total_bytes}'
-            ).format(bytes_read=sizeof_fmt(bytes_read),
-                total_bytes=sizeof_fmt(total_bytes)))
-
-        if self.download_speed_count % 5 == 0:
-            delta_bytes = bytes_read - self.download_last_bytes_read
-            delta_time = datetime.utcnow() - self.download_last_read
-
-            bytes_secs = delta_bytes / delta_time.total_seconds()
-            self.dowloading_speed_label.setText(_('{bytes_sec}/s').format(
-                bytes_sec=sizeof_fmt(bytes_secs)))
-
-            self.download_last_bytes_read = bytes_read
-            self.download_last_read = datetime.utcnow()
-
     def start_lb_request(self, url):
         self.disable_controls(True)
 
@@ -2795,12 +2117,17 @@ class UpdateGroupBox(QGroupBox):
 
         status_bar.busy += 1
 
-        self.builds_combo.clear()
-        self.builds_combo.addItem(_('Fetching remote builds'))
+        # Show the builds we already know while we check for new ones
+        builds = self.build_catalog.builds(url)
+        if builds is not None and len(builds) > 0:
+            self.builds = builds
+            self.fill_builds_combo(builds)
+        else:
+            self.builds_combo.clear()
+            self.builds_combo.addItem(_('Fetching remote builds'))
 
         fetching_label = QLabel()
         fetching_label.setText(_('Fetching: {url}').format(url=url))
-        self.base_url = url
         status_bar.addWidget(fetching_label, 100)
         self.fetching_label = fetching_label
 
@@ -2810,13 +2137,22 @@ class UpdateGroupBox(QGroupBox):
 
         progress_bar.setMinimum(0)
 
-        self.lb_html = BytesIO()
-        self.http_reply = self.qnam.get(QNetworkRequest(QUrl(url)))
-        self.http_reply.finished.connect(self.lb_http_finished)
-        self.http_reply.readyRead.connect(self.lb_http_ready_read)
-        self.http_reply.downloadProgress.connect(self.lb_dl_progress)
-
-    def lb_http_finished(self):
+        self.lb_url = url
+        reply = self.build_catalog.fetch(url)
+        reply.downloadProgress.connect(self.lb_dl_progress)
+
+    def catalog_fetched(self, url):
+        if url == self.lb_url:
+            self.lb_url = None
+            self.lb_http_finished(url)
+        elif (url == self.selected_url() and self.lb_url is None
+            and not self.updating and self.refresh_builds_button.isEnabled()):
+            # A background refresh found new builds for the listing shown
+            builds = self.build_catalog.builds(url)
+            if builds is not None and builds is not self.builds:
+                self.show_builds(builds)
+
+    def lb_http_finished(self, url):
         main_window = self.get_main_window()
 
         status_bar = main_window.statusBar()
@@ -2837,58 +2173,28 @@ class UpdateGroupBox(QGroupBox):
             if status_bar.busy == 0:
                 status_bar.showMessage(_('Game process is running'))
 
-        self.lb_html.seek(0)
-        document = html5lib.parse(self.lb_html, treebuilder='lxml',
-            encoding='utf8', namespaceHTMLElements=False)
+        builds = self.build_catalog.builds(url)
+        if builds is None:
+            builds = []
+
+        self.show_builds(builds)
+
+    def show_builds(self, builds):
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
 
-        builds = []
-        for row in document.getroot().cssselect('tr'):
-            build = {}
-            for index, cell in enumerate(row.cssselect('td')):
-                if index == 1:
-                    if len(cell) > 0 and cell[0].text.startswith(
-                        'cataclysmdda'):
-                        anchor = cell[0]
-                        url = urljoin(self.base_url, anchor.get('href'))
-                        name = anchor.text
-
-                        build_number = None
-                        match = re.search(
-                            'cataclysmdda-[01]\\.[A-F]-(?P<build>\d+)', name)
-                        if match is not None:
-                            build_number = match.group('build')
-
-                        build['url'] = url
-                        build['name'] = name
-                        build['number'] = build_number
-                elif index == 2:
-                    # build date
-                    str_date = cell.text.strip()
-                    if str_date != '':
-                        build_date = datetime.strptime(str_date,
-                            '%Y-%m-%d %H:%M')
-                        build['date'] = build_date
-
-            if 'url' in build:
-                builds.append(build)
+        main_tab = self.get_main_tab()
+        game_dir_group_box = main_tab.game_dir_group_box
 
         if len(builds) > 0:
-            builds.reverse()
             self.builds = builds
 
-            self.builds_combo.clear()
-            for index, build in enumerate(builds):
-                build_date = arrow.get(build['date'], 'UTC')
-                human_delta = build_date.humanize(arrow.utcnow(),
-                    locale=app_locale)
-
-                if index == 0:
-                    self.builds_combo.addItem(
-                        _('{number} ({delta}) - latest').format(
-                        number=build['number'], delta=human_delta))
-                else:
-                    self.builds_combo.addItem(_('{number} ({delta})').format(
-                        number=build['number'], delta=human_delta))
+            self.fill_builds_combo(builds)
+
+            if self.updating:
+                # The controls are enabled again once the update is done
+                self.previous_bc_enabled = True
+                return
 
             if not game_dir_group_box.game_started:
                 self.builds_combo.setEnabled(True)
@@ -2924,14 +2230,26 @@ class UpdateGroupBox(QGroupBox):
             self.builds_combo.addItem(_('Could not find remote builds'))
             self.builds_combo.setEnabled(False)
 
-    def lb_http_ready_read(self):
-        self.lb_html.write(self.http_reply.readAll())
+    def fill_builds_combo(self, builds):
+        self.builds_combo.clear()
+        for index, build in enumerate(builds):
+            build_date = arrow.get(build['date'], 'UTC')
+            human_delta = build_date.humanize(arrow.utcnow(),
+                locale=app_locale)
+
+            if index == 0:
+                self.builds_combo.addItem(
+                    _('{number} ({delta}) - latest').format(
+                    number=build['number'], delta=human_delta))
+            else:
+                self.builds_combo.addItem(_('{number} ({delta})').format(
+                    number=build['number'], delta=human_delta))
 
     def lb_dl_progress(self, bytes_read, total_bytes):
         self.fetching_progress_bar.setMaximum(total_bytes)
         self.fetching_progress_bar.setValue(bytes_read)
 
-    def refresh_builds(self):
+    def selected_url(self):
         selected_graphics = self.graphics_button_group.checkedButton()
         selected_platform = self.platform_button_group.checkedButton()
 
@@ -2945,9 +2263,25 @@ class UpdateGroupBox(QGroupBox):
         elif selected_platform is self.x86_radio_button:
             selected_platform = 'x86'
 
-        url = BASE_URLS[selected_graphics][selected_platform]
+        return BASE_URLS[selected_graphics][selected_platform]
+
+    def refresh_builds(self):
+        self.start_lb_request(self.selected_url())
+        self.build_catalog.fetch_all()
+
+    def switch_builds(self):
+        url = self.selected_url()
+
+        builds = self.build_catalog.builds(url)
+        if builds is None or len(builds) == 0:
+            self.start_lb_request(url)
+            return
 
-        self.start_lb_request(url)
+        # Serve the listing we already have and refresh it in the background
+        # when it gets old
+        self.show_builds(builds)
+        if self.build_catalog.is_stale(url):
+            self.build_catalog.fetch(url)
 
     def graphics_clicked(self, button):
         if button is self.tiles_radio_button:
@@ -2957,7 +2291,7 @@ class UpdateGroupBox(QGroupBox):
 
         set_config_value('graphics', config_value)
 
-        self.refresh_builds()
+        self.switch_builds()
 
     def platform_clicked(self, button):
         if button is self.x64_radio_button:
@@ -2967,7 +2301,7 @@ class UpdateGroupBox(QGroupBox):
 
         set_config_value('platform', config_value)
 
-        self.refresh_builds()
+        self.switch_builds()
 
 
 class AboutDialog(QDialog):
@@ -3301,9 +2635,32 @@ class UpdateSettingsGroupBox(QGroupBox):
         layout.addWidget(ka_dir_change_button, 1, 2)
         self.ka_dir_change_button = ka_dir_change_button
 
+        acs_group = QWidget()
+        acs_group.setSizePolicy(QSizePolicy.Maximum, QSizePolicy.Maximum)
+        acs_layout = QHBoxLayout()
+        acs_layout.setContentsMargins(0, 0, 0, 0)
+
+        archive_cache_size_label = QLabel()
+        acs_layout.addWidget(archive_cache_size_label)
+        self.archive_cache_size_label = archive_cache_size_label
+
+        acs_spinbox = QSpinBox()
+        acs_spinbox.setMinimum(0)
+        acs_spinbox.setMaximum(1024 * 1024)
+        acs_spinbox.setSingleStep(256)
+        acs_spinbox.setValue(int(get_config_value('archive_cache_size', '0')))
+        acs_spinbox.valueChanged.connect(self.acss_changed)
+        acs_layout.addWidget(acs_spinbox)
+        self.acs_spinbox = acs_spinbox
+
+        acs_group.setLayout(acs_layout)
+        layout.addWidget(acs_group, 2, 0, 1, 3)
+        self.acs_group = acs_group
+        self.acs_layout = acs_layout
+
         arb_timer = QTimer()
-        arb_timer.setInterval(int(get_config_value(
-            'auto_refresh_builds_minutes', '30')) * 1000 * 60)
+        arb_timer.setInterval(self.arb_interval(int(get_config_value(
+            'auto_refresh_builds_minutes', '30'))))
         arb_timer.timeout.connect(self.arb_timeout)
         self.arb_timer = arb_timer
         if config_true(get_config_value('auto_refresh_builds', 'False')):
@@ -3335,10 +2692,48 @@ class UpdateSettingsGroupBox(QGroupBox):
         self.arb_min_label = arb_min_label
 
         arb_group.setLayout(arb_layout)
-        layout.addWidget(arb_group, 2, 0, 1, 3)
+        layout.addWidget(arb_group, 3, 0, 1, 3)
         self.arb_group = arb_group
         self.arb_layout = arb_layout
 
+        dc_group = QWidget()
+        dc_group.setSizePolicy(QSizePolicy.Maximum, QSizePolicy.Maximum)
+        dc_layout = QHBoxLayout()
+        dc_layout.setContentsMargins(0, 0, 0, 0)
+
+        download_connections_label = QLabel()
+        dc_layout.addWidget(download_connections_label)
+        self.download_connections_label = download_connections_label
+
+        dc_spinbox = QSpinBox()
+        dc_spinbox.setMinimum(1)
+        dc_spinbox.setMaximum(MAX_DOWNLOAD_CONNECTIONS)
+        dc_spinbox.setValue(int(get_config_value('download_connections', '1')))
+        dc_spinbox.valueChanged.connect(self.dcs_changed)
+        dc_layout.addWidget(dc_spinbox)
+        self.dc_spinbox = dc_spinbox
+
+        dc_group.setLayout(dc_layout)
+        layout.addWidget(dc_group, 4, 0, 1, 3)
+        self.dc_group = dc_group
+        self.dc_layout = dc_layout
+
+        delta_updates_checkbox = QCheckBox()
+        check_state = (Qt.Checked if config_true(get_config_value(
+            'delta_updates', 'False')) else Qt.Unchecked)
+        delta_updates_checkbox.setCheckState(check_state)
+        delta_updates_checkbox.stateChanged.connect(self.duc_changed)
+        layout.addWidget(delta_updates_checkbox, 5, 0, 1, 3)
+        self.delta_updates_checkbox = delta_updates_checkbox
+
+        staged_install_checkbox = QCheckBox()
+        check_state = (Qt.Checked if config_true(get_config_value(
+            'staged_install', 'False')) else Qt.Unchecked)
+        staged_install_checkbox.setCheckState(check_state)
+        staged_install_checkbox.stateChanged.connect(self.sic_changed)
+        layout.addWidget(staged_install_checkbox, 6, 0, 1, 3)
+        self.staged_install_checkbox = staged_install_checkbox
+
         self.setLayout(layout)
         self.set_text()
 
@@ -3353,9 +2748,35 @@ class UpdateSettingsGroupBox(QGroupBox):
         self.keep_archive_copy_checkbox.setText(
             _('Keep a copy of the downloaded '
             'archive in the following directory:'))
+        self.archive_cache_size_label.setText(
+            _('Maximum size of the archive directory:'))
+        self.acs_spinbox.setSuffix(_(' MiB'))
+        self.acs_spinbox.setSpecialValueText(_('Unlimited'))
+        self.acs_spinbox.setToolTip(
+            _('The least recently used archives are removed when the '
+            'directory grows over this size.'))
         self.auto_refresh_builds_checkbox.setText(
             _('Automatically refresh builds list every'))
         self.arb_min_label.setText(_('minutes'))
+        self.download_connections_label.setText(
+            _('Connections used to download the game:'))
+        self.dc_spinbox.setToolTip(
+            _('Using more than one connection splits the download in parts '
+            'downloaded at the same time when the server allows it.'))
+        self.delta_updates_checkbox.setText(
+            _('Only download the files that changed when updating the game'))
+        self.delta_updates_checkbox.setToolTip(
+            _('The files that did not change since the installed build are '
+            'linked from the previous_version directory instead of being '
+            'downloaded and extracted again.'))
+        self.staged_install_checkbox.setText(
+            _('Extract new builds next to the game directory before switching '
+            'to them'))
+        self.staged_install_checkbox.setToolTip(
+            _('The current version is left untouched until the new build is '
+            'completely extracted and is then replaced by renaming '
+            'directories.\nThe game directory must not be in use by another '
+            'program while updating.'))
         self.setTitle(_('Update/Installation'))
 
     def get_settings_tab(self):
@@ -3364,17 +2785,38 @@ class UpdateSettingsGroupBox(QGroupBox):
     def get_main_tab(self):
         return self.get_settings_tab().get_main_tab()
 
+    def arb_interval(self, minutes):
+        # Spread the refreshes a bit so they do not all hit the server at the
+        # same moment
+        jitter = random.uniform(1 - AUTO_REFRESH_JITTER,
+            1 + AUTO_REFRESH_JITTER)
+        return int(minutes * 1000 * 60 * jitter)
+
     def arb_timeout(self):
         main_tab = self.get_main_tab()
         update_group_box = main_tab.update_group_box
-        refresh_builds_button = update_group_box.refresh_builds_button
 
-        if refresh_builds_button.isEnabled():
-            update_group_box.refresh_builds()
+        update_group_box.build_catalog.fetch_all()
+
+        self.arb_timer.setInterval(self.arb_interval(int(get_config_value(
+            'auto_refresh_builds_minutes', '30'))))
+
+    def acss_changed(self, value):
+        set_config_value('archive_cache_size', value)
+        evict_archives()
+
+    def dcs_changed(self, value):
+        set_config_value('download_connections', value)
+
+    def duc_changed(self, state):
+        set_config_value('delta_updates', str(state != Qt.Unchecked))
+
+    def sic_changed(self, state):
+        set_config_value('staged_install', str(state != Qt.Unchecked))
 
     def ams_changed(self, value):
         set_config_value('auto_refresh_builds_minutes', value)
-        self.arb_timer.setInterval(value * 1000 * 60)
+        self.arb_timer.setInterval(self.arb_interval(value))
 
     def arbc_changed(self, state):
         set_config_value('auto_refresh_builds', str(state != Qt.Unchecked))
@@ -3719,6 +3161,8 @@ class SoundpacksTab(QTabWidget):
         self.installing_new_soundpack = False
         self.downloading_new_soundpack = False
         self.extracting_new_soundpack = False
+        self.archive_cache_worker = None
+        self.archive_storers = []
 
         self.close_after_install = False
 
@@ -4036,52 +3480,10 @@ class SoundpacksTab(QTabWidget):
                 file_name = file_info.fileName()
 
                 self.downloaded_file = os.path.join(download_dir, file_name)
-                self.downloading_file = open(self.downloaded_file, 'wb')
-
-                main_window = self.get_main_window()
-
-                status_bar = main_window.statusBar()
-                status_bar.clearMessage()
-
-                status_bar.busy += 1
-
-                downloading_label = QLabel()
-                downloading_label.setText(_('Downloading: {0}').format(
-                    selected_info['url']))
-                status_bar.addWidget(downloading_label, 100)
-                self.downloading_label = downloading_label
-
-                dowloading_speed_label = QLabel()
-                status_bar.addWidget(dowloading_speed_label)
-                self.dowloading_speed_label = dowloading_speed_label
-
-                downloading_size_label = QLabel()
-                status_bar.addWidget(downloading_size_label)
-                self.downloading_size_label = downloading_size_label
-
-                progress_bar = QProgressBar()
-                status_bar.addWidget(progress_bar)
-                self.downloading_progress_bar = progress_bar
-                progress_bar.setMinimum(0)
-
-                self.download_last_read = datetime.utcnow()
-                self.download_last_bytes_read = 0
-                self.download_speed_count = 0
-
-                self.downloading_new_soundpack = True
-
-                request = QNetworkRequest(QUrl(url))
-                request.setRawHeader(b'User-Agent', b'Mozilla/5.0 (Windows NT '
-                    b'6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) '
-                    b'Chrome/49.0.2623.87 Safari/537.36')
+                self.download_url = download_url
 
-                self.download_http_reply = self.qnam.get(request)
-                self.download_http_reply.finished.connect(
-                    self.download_http_finished)
-                self.download_http_reply.readyRead.connect(
-                    self.download_http_ready_read)
-                self.download_http_reply.downloadProgress.connect(
-                    self.download_dl_progress)
+                self.downloaded_from_cache = False
+                self.fetch_cached_soundpack()
 
                 self.install_new_button.setText(_('Cancel soundpack '
                     'installation'))
@@ -4153,7 +3555,11 @@ class SoundpacksTab(QTabWidget):
             status_bar = main_window.statusBar()
 
             # Cancel installation
-            if self.downloading_new_soundpack:
+            if self.archive_cache_worker is not None:
+                # The download directory is removed once the worker finishes
+                self.archive_cache_worker = None
+                status_bar.busy -= 1
+            elif self.downloading_new_soundpack:
                 self.download_aborted = True
                 self.download_http_reply.abort()
             elif self.extracting_new_soundpack:
@@ -4246,36 +3652,147 @@ class SoundpacksTab(QTabWidget):
                 self.download_http_reply.downloadProgress.connect(
                     self.download_dl_progress)
             else:
-                # Test downloaded file
-                status_bar.showMessage(_('Testing downloaded file archive'))
+                self.test_downloaded_soundpack()
 
-                try:
-                    with zipfile.ZipFile(self.downloaded_file) as z:
-                        if z.testzip() is not None:
-                            status_bar.clearMessage()
-                            status_bar.showMessage(_('Downloaded archive is '
-                                'invalid'))
-
-                            download_dir = os.path.dirname(self.downloaded_file)
-                            retry_rmtree(download_dir)
-                            self.downloading_new_soundpack = False
-
-                            self.finish_install_new_soundpack()
-                            return
-                except zipfile.BadZipFile:
+    def download_soundpack(self, download_url):
+        url = QUrl(download_url)
+
+        self.downloading_file = open(self.downloaded_file, 'wb')
+
+        main_window = self.get_main_window()
+
+        status_bar = main_window.statusBar()
+        status_bar.clearMessage()
+
+        status_bar.busy += 1
+
+        downloading_label = QLabel()
+        downloading_label.setText(_('Downloading: {0}').format(
+            download_url))
+        status_bar.addWidget(downloading_label, 100)
+        self.downloading_label = downloading_label
+
+        dowloading_speed_label = QLabel()
+        status_bar.addWidget(dowloading_speed_label)
+        self.dowloading_speed_label = dowloading_speed_label
+
+        downloading_size_label = QLabel()
+        status_bar.addWidget(downloading_size_label)
+        self.downloading_size_label = downloading_size_label
+
+        progress_bar = QProgressBar()
+        status_bar.addWidget(progress_bar)
+        self.downloading_progress_bar = progress_bar
+        progress_bar.setMinimum(0)
+
+        self.download_last_read = datetime.utcnow()
+        self.download_last_bytes_read = 0
+        self.download_speed_count = 0
+
+        self.downloading_new_soundpack = True
+
+        request = QNetworkRequest(QUrl(url))
+        request.setRawHeader(b'User-Agent', b'Mozilla/5.0 (Windows NT '
+            b'6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) '
+            b'Chrome/49.0.2623.87 Safari/537.36')
+
+        self.download_http_reply = self.qnam.get(request)
+        self.download_http_reply.finished.connect(
+            self.download_http_finished)
+        self.download_http_reply.readyRead.connect(
+            self.download_http_ready_read)
+        self.download_http_reply.downloadProgress.connect(
+            self.download_dl_progress)
+
+    def fetch_cached_soundpack(self):
+        # Reuse a previously downloaded archive when we have one. The cached
+        # archive is checked against its hash in a worker thread.
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+
+        status_bar.busy += 1
+        status_bar.showMessage(_('Looking for the archive in the cache'))
+
+        archive_cache_worker = ArchiveCacheWorker(self.download_url,
+            self.downloaded_file)
+        self.archive_cache_worker = archive_cache_worker
+
+        def finished():
+            if archive_cache_worker is not self.archive_cache_worker:
+                # The installation was cancelled in the meantime
+                retry_rmtree(os.path.dirname(archive_cache_worker.path))
+                return
+
+            self.archive_cache_worker = None
+
+            status_bar.busy -= 1
+            status_bar.clearMessage()
+
+            self.downloaded_from_cache = archive_cache_worker.found
+            if self.downloaded_from_cache:
+                self.test_downloaded_soundpack()
+            else:
+                self.download_soundpack(self.download_url)
+
+        archive_cache_worker.finished.connect(finished)
+        archive_cache_worker.start()
+
+    def store_downloaded_archive(self):
+        # Keep a copy of the archive if selected in the settings. It is
+        # hashed in a worker thread while the installation goes on.
+        download_dir = os.path.dirname(self.downloaded_file)
+
+        archive_storer = ArchiveCacheWorker(self.download_url,
+            self.downloaded_file, True)
+
+        def finished():
+            self.archive_storers.remove(archive_storer)
+            retry_rmtree(download_dir)
+
+        archive_storer.finished.connect(finished)
+        self.archive_storers.append(archive_storer)
+        archive_storer.start()
+
+    def test_downloaded_soundpack(self):
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+
+        # Test downloaded file
+        status_bar.showMessage(_('Testing downloaded file archive'))
+
+        try:
+            with zipfile.ZipFile(self.downloaded_file) as z:
+                if z.testzip() is not None:
                     status_bar.clearMessage()
-                    status_bar.showMessage(_('Could not download soundpack'))
+                    status_bar.showMessage(_('Downloaded archive is '
+                        'invalid'))
 
                     download_dir = os.path.dirname(self.downloaded_file)
                     retry_rmtree(download_dir)
                     self.downloading_new_soundpack = False
 
+                    if self.downloaded_from_cache:
+                        discard_cached_archive(self.download_url)
+
                     self.finish_install_new_soundpack()
                     return
+        except zipfile.BadZipFile:
+            status_bar.clearMessage()
+            status_bar.showMessage(_('Could not download soundpack'))
 
-                status_bar.clearMessage()
-                self.downloading_new_soundpack = False
-                self.extract_new_soundpack()
+            download_dir = os.path.dirname(self.downloaded_file)
+            retry_rmtree(download_dir)
+            self.downloading_new_soundpack = False
+
+            if self.downloaded_from_cache:
+                discard_cached_archive(self.download_url)
+
+            self.finish_install_new_soundpack()
+            return
+
+        status_bar.clearMessage()
+        self.downloading_new_soundpack = False
+        self.extract_new_soundpack()
 
     def finish_install_new_soundpack(self):
         self.installing_new_soundpack = False
@@ -4369,8 +3886,11 @@ class SoundpacksTab(QTabWidget):
                 self.extracting_zipfile.close()
 
                 if self.install_type == 'direct_download':
-                    download_dir = os.path.dirname(self.downloaded_file)
-                    retry_rmtree(download_dir)
+                    if not self.downloaded_from_cache:
+                        self.store_downloaded_archive()
+                    else:
+                        download_dir = os.path.dirname(self.downloaded_file)
+                        retry_rmtree(download_dir)
 
                 self.move_new_soundpack()
 
@@ -4794,6 +4314,12 @@ class BackupsTab(QTabWidget):
         self.backup_compressing = False
 
         self.compressing_timer = None
+        self.extracting_timer = None
+        self.extracting_thread = None
+        self.garbage_collector = None
+
+        # Unused content of incremental backups is removed by the next backup
+        self.collect_pending = False
 
         current_backups_gb = QGroupBox()
         self.current_backups_gb = current_backups_gb
@@ -4802,14 +4328,17 @@ class BackupsTab(QTabWidget):
         current_backups_gb.setLayout(current_backups_gb_layout)
         self.current_backups_gb_layout = current_backups_gb_layout
 
-        backups_table = QTableWidget()
-        backups_table.setColumnCount(8)
+        backups_model = BackupsModel()
+        self.backups_model = backups_model
+
+        backups_table = QTableView()
+        backups_table.setModel(backups_model)
         backups_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         backups_table.setSelectionMode(QAbstractItemView.SingleSelection)
         backups_table.verticalHeader().setVisible(False)
         backups_table.horizontalHeader().sortIndicatorChanged.connect(
             self.backups_table_header_sort)
-        backups_table.itemSelectionChanged.connect(
+        backups_table.selectionModel().selectionChanged.connect(
             self.backups_table_selection_changed)
         current_backups_gb_layout.addWidget(backups_table, 0, 0, 1, 3)
         self.backups_table = backups_table
@@ -4819,7 +4348,7 @@ class BackupsTab(QTabWidget):
             columns_width = json.loads(columns_width)
 
             for index, value in enumerate(columns_width):
-                if index < self.backups_table.columnCount():
+                if index < self.backups_model.columnCount():
                     self.backups_table.setColumnWidth(index, value)
 
         restore_button = QPushButton()
@@ -4928,6 +4457,37 @@ class BackupsTab(QTabWidget):
         self.mab_group = mab_group
         self.mab_layout = mab_layout
 
+        incremental_backups_cb = QCheckBox()
+        check_state = (Qt.Checked if config_true(get_config_value(
+            'incremental_backups', 'False')) else Qt.Unchecked)
+        incremental_backups_cb.setCheckState(check_state)
+        incremental_backups_cb.stateChanged.connect(self.ib_changed)
+        automatic_backups_layout.addWidget(incremental_backups_cb, 3, 0, 1, 2)
+        self.incremental_backups_cb = incremental_backups_cb
+
+        codec_group = QWidget()
+        codec_group.setSizePolicy(QSizePolicy.Maximum, QSizePolicy.Maximum)
+        codec_layout = QHBoxLayout()
+        codec_layout.setContentsMargins(0, 0, 0, 0)
+
+        backup_codec_label = QLabel()
+        codec_layout.addWidget(backup_codec_label)
+        self.backup_codec_label = backup_codec_label
+
+        backup_codec_combo = QComboBox()
+        for codec in available_codecs():
+            backup_codec_combo.addItem(codec, codec)
+        backup_codec_combo.setCurrentIndex(backup_codec_combo.findData(
+            backup_codec()))
+        backup_codec_combo.currentIndexChanged.connect(self.bc_changed)
+        codec_layout.addWidget(backup_codec_combo)
+        self.backup_codec_combo = backup_codec_combo
+
+        codec_group.setLayout(codec_layout)
+        automatic_backups_layout.addWidget(codec_group, 4, 0, 1, 2)
+        self.codec_group = codec_group
+        self.codec_layout = codec_layout
+
         layout = QGridLayout()
         layout.addWidget(current_backups_gb, 0, 0, 1, 2)
         layout.addWidget(manual_backups_gb, 1, 0)
@@ -4946,9 +4506,10 @@ class BackupsTab(QTabWidget):
         self.delete_button.setText(_('Delete backup'))
         self.do_not_backup_previous_cb.setText(_('Do not backup the current '
             'saves before restoring a backup'))
-        self.backups_table.setHorizontalHeaderLabels((_('Name'),
+        self.backups_model.set_headers((_('Name'),
             _('Modified'), _('Worlds'), _('Characters'), _('Actual size'),
-            _('Compressed size'), _('Compression ratio'), _('Modified date')))
+            _('Compressed size'), _('Compression ratio'), _('Modified date'),
+            _('Compression')))
 
         self.name_label.setText(_('Name:'))
         self.backup_current_button.setText(_('Backup current saves'))
@@ -4962,6 +4523,13 @@ class BackupsTab(QTabWidget):
 
         self.max_auto_backups_label.setText(_('Maximum automatic backups '
             'count:'))
+        self.incremental_backups_cb.setText(_('Only store the files that '
+            'changed since the last backup (incremental backups)'))
+
+        self.backup_codec_label.setText(_('Backup compression:'))
+        for index in range(self.backup_codec_combo.count()):
+            self.backup_codec_combo.setItemText(index, codec_label(
+                self.backup_codec_combo.itemData(index)))
 
     def get_main_window(self):
         return self.parentWidget().parentWidget().parentWidget()
@@ -5008,7 +4576,7 @@ class BackupsTab(QTabWidget):
     def save_geometry(self):
         columns_width = []
 
-        for index in range(self.backups_table.columnCount()):
+        for index in range(self.backups_model.columnCount()):
             columns_width.append(self.backups_table.columnWidth(index))
 
         set_config_value('backups_columns_width', json.dumps(columns_width))
@@ -5022,6 +4590,13 @@ class BackupsTab(QTabWidget):
     def bol_changed(self, state):
         set_config_value('backup_on_launch', str(state != Qt.Unchecked))
 
+    def ib_changed(self, state):
+        set_config_value('incremental_backups', str(state != Qt.Unchecked))
+
+    def bc_changed(self, index):
+        set_config_value('backup_codec', self.backup_codec_combo.itemData(
+            index))
+
     def boe_changed(self, state):
         checked = state != Qt.Unchecked
 
@@ -5070,7 +4645,7 @@ class BackupsTab(QTabWidget):
         elif self.backup_compressing:
             if self.compress_thread is not None:
                 self.backup_current_button.setEnabled(False)
-                self.compress_thread.quit()
+                self.compress_thread.cancel()
 
                 def completed():
                     self.finish_backup_saves()
@@ -5098,7 +4673,7 @@ class BackupsTab(QTabWidget):
         elif self.extracting_backup:
             if self.extracting_thread is not None:
                 self.restore_button.setEnabled(False)
-                self.extracting_thread.quit()
+                self.extracting_thread.cancel()
 
                 def completed():
                     save_dir = os.path.join(self.game_dir, 'save')
@@ -5126,15 +4701,13 @@ class BackupsTab(QTabWidget):
 
             status_bar.showMessage(_('Restore backup cancelled'))
         else:
-            selection_model = self.backups_table.selectionModel()
-            if selection_model is None or not selection_model.hasSelection():
+            selected_row = self.selected_backup_row()
+            if selected_row is None:
                 return
 
-            selected = selection_model.currentIndex()
-            table_item = self.backups_table.item(selected.row(), 0)
-            selected_info = self.backups[table_item]
+            selected_info = self.backups_model.records[selected_row]
 
-            if not os.path.isfile(selected_info['path']):
+            if not os.path.isfile(selected_info.path):
                 return
 
             backup_previous = not config_true(get_config_value(
@@ -5145,8 +4718,7 @@ class BackupsTab(QTabWidget):
                 If restoring the before_last_restore, we rename it to make sure
                 we make a proper backup first.
                 '''
-                model = selection_model.model()
-                backup_name = model.data(model.index(selected.row(), 0))
+                backup_name = selected_info.name
 
                 before_last_restore_name = _('before_last_restore')
 
@@ -5159,7 +4731,7 @@ class BackupsTab(QTabWidget):
 
                     for entry in scandir(backup_dir):
                         filename, ext = os.path.splitext(entry.name)
-                        if ext.lower() == '.zip':
+                        if ext.lower() in BACKUP_EXTENSIONS:
                             filename_lower = filename.lower()
 
                             filename_key = alphanum_key(filename_lower)
@@ -5175,12 +4747,13 @@ class BackupsTab(QTabWidget):
                     new_backup_name = (before_last_restore_name +
                         str(max_counter + 1))
                     new_backup_path = os.path.join(backup_dir,
-                        new_backup_name + '.zip')
+                        new_backup_name + os.path.splitext(
+                        selected_info.path)[1])
                     
-                    if not retry_rename(selected_info['path'], new_backup_path):
+                    if not retry_rename(selected_info.path, new_backup_path):
                         return
 
-                    selected_info['path'] = new_backup_path
+                    selected_info.path = new_backup_path
 
                 def next_step():
                     self.restore_backup()
@@ -5195,18 +4768,14 @@ class BackupsTab(QTabWidget):
                 self.restore_backup()
 
     def restore_backup(self):
-        selection_model = self.backups_table.selectionModel()
-        if selection_model is None or not selection_model.hasSelection():
+        selected_row = self.selected_backup_row()
+        if selected_row is None:
             return
 
-        selected = selection_model.currentIndex()
-        table_item = self.backups_table.item(selected.row(), 0)
-        selected_info = self.backups[table_item]
-
-        model = selection_model.model()
-        backup_name = model.data(model.index(selected.row(), 0))
+        selected_info = self.backups_model.records[selected_row]
+        backup_name = selected_info.name
 
-        if not os.path.isfile(selected_info['path']):
+        if not os.path.isfile(selected_info.path):
             return
 
         main_window = self.get_main_window()
@@ -5239,7 +4808,7 @@ class BackupsTab(QTabWidget):
         status_bar.clearMessage()
         status_bar.busy += 1
 
-        self.total_extract_size = selected_info['actual_size']
+        self.total_extract_size = selected_info.actual_size
 
         extracting_label = QLabel()
         extracting_label.setText(_('Extracting backup'))
@@ -5268,10 +4837,8 @@ class BackupsTab(QTabWidget):
         self.extracting_progress_bar = progress_bar
 
         self.extract_size = 0
-        self.extract_files = 0
         self.last_extract_bytes = 0
         self.last_extract = datetime.utcnow()
-        self.next_backup_file = None
 
         self.disable_tab()
         self.get_main_tab().disable_tab()
@@ -5283,77 +4850,79 @@ class BackupsTab(QTabWidget):
         self.restore_button.setEnabled(True)
         self.restore_button.setText(_('Cancel restore backup'))
 
-        class ExtractingThread(QThread):
-            completed = pyqtSignal()
+        self.restoring_backup_name = backup_name
 
-            def __init__(self, zfile, element, dir):
-                super(ExtractingThread, self).__init__()
+        extracting_thread = BackupExtractor(selected_info.path,
+            self.extract_dir)
+        extracting_thread.finished.connect(self.backup_extracted)
+        self.extracting_thread = extracting_thread
 
-                self.zfile = zfile
-                self.element = element
-                self.dir = dir
+        timer = QTimer(self)
+        timer.timeout.connect(self.display_extracting_progress)
+        self.extracting_timer = timer
 
-            def __del__(self):
-                self.wait()
+        extracting_thread.start()
+        timer.start(int(PROGRESS_INTERVAL.total_seconds() * 1000))
 
-            def run(self):
-                self.zfile.extract(self.element, self.dir)
-                self.completed.emit()
+    def display_extracting_progress(self):
+        extracting_thread = self.extracting_thread
+        if extracting_thread is None:
+            return
 
-        def extract_next_file():
-            try:
-                if self.extracting_backup:
-                    extracting_element = self.extracting_infolist.popleft()
-                    self.extracting_label.setText(_('Extracting {filename}'
-                        ).format(filename=extracting_element.filename))
-                    self.next_extract_file = extracting_element
-
-                    extracting_thread = ExtractingThread(
-                        self.extracting_zipfile, extracting_element,
-                        self.extract_dir)
-                    extracting_thread.completed.connect(completed_extract)
-                    self.extracting_thread = extracting_thread
+        self.extract_size = extracting_thread.extracted_size
+        if extracting_thread.current_file != '':
+            self.extracting_label.setText(_('Extracting {filename}'
+                ).format(filename=extracting_thread.current_file))
 
-                    extracting_thread.start()
-                    
-            except IndexError:
-                self.extracting_backup = False
-                self.extracting_thread = None
+        self.extracting_progress_bar.setValue(self.extract_size)
+        self.extracting_size_label.setText(
+            _('{bytes_read}/{total_bytes}').format(
+            bytes_read=sizeof_fmt(self.extract_size),
+            total_bytes=sizeof_fmt(self.total_extract_size)))
 
-                self.finish_restore_backup()
+        delta_bytes = self.extract_size - self.last_extract_bytes
+        delta_time = datetime.utcnow() - self.last_extract
+        if delta_time.total_seconds() == 0:
+            delta_time = timedelta.resolution
 
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
+        bytes_secs = delta_bytes / delta_time.total_seconds()
+        self.extracting_speed_label.setText(_('{bytes_sec}/s'
+            ).format(bytes_sec=sizeof_fmt(bytes_secs)))
 
-                status_bar.showMessage(_('{backup_name} backup restored'
-                    ).format(backup_name=backup_name))
+        self.last_extract_bytes = self.extract_size
+        self.last_extract = datetime.utcnow()
 
-        def completed_extract():
-            self.extract_size += self.next_extract_file.file_size
-            self.extracting_progress_bar.setValue(self.extract_size)
+    def backup_extracted(self):
+        extracting_thread = self.extracting_thread
+        if (extracting_thread is None or extracting_thread.cancelled
+            or not self.extracting_backup):
+            return
 
-            self.extracting_size_label.setText(
-                _('{bytes_read}/{total_bytes}').format(
-                bytes_read=sizeof_fmt(self.extract_size),
-                total_bytes=sizeof_fmt(self.total_extract_size)))
+        self.extracting_backup = False
+        self.extracting_thread = None
 
-            delta_bytes = self.extract_size - self.last_extract_bytes
-            delta_time = datetime.utcnow() - self.last_extract
-            if delta_time.total_seconds() == 0:
-                delta_time = timedelta.resolution
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
 
-            bytes_secs = delta_bytes / delta_time.total_seconds()
-            self.extracting_speed_label.setText(_('{bytes_sec}/s'
-                ).format(bytes_sec=sizeof_fmt(bytes_secs)))
+        if extracting_thread.error is not None:
+            # Put the saves that were there before back in place
+            save_dir = os.path.join(self.game_dir, 'save')
+            retry_rmtree(save_dir)
+            if self.temp_save_dir is not None:
+                retry_rename(self.temp_save_dir, save_dir)
+            self.temp_save_dir = None
 
-            self.last_extract_bytes = self.extract_size
-            self.last_extract = datetime.utcnow()
+            self.finish_restore_backup()
 
-            extract_next_file()
+            status_bar.showMessage(_('Could not restore {backup_name} '
+                'backup: {error}').format(
+                backup_name=self.restoring_backup_name,
+                error=str(extracting_thread.error)))
+        else:
+            self.finish_restore_backup()
 
-        self.extracting_zipfile = zipfile.ZipFile(selected_info['path'])
-        self.extracting_infolist = deque(self.extracting_zipfile.infolist())
-        extract_next_file()
+            status_bar.showMessage(_('{backup_name} backup restored'
+                ).format(backup_name=self.restoring_backup_name))
 
     def finish_restore_backup(self):
         main_window = self.get_main_window()
@@ -5368,8 +4937,9 @@ class BackupsTab(QTabWidget):
 
         self.extracting_backup = False
 
-        if self.extracting_zipfile is not None:
-            self.extracting_zipfile.close()
+        if self.extracting_timer is not None:
+            self.extracting_timer.stop()
+            self.extracting_timer = None
 
         if self.temp_save_dir is not None:
             retry_rmtree(self.temp_save_dir)
@@ -5389,15 +4959,13 @@ class BackupsTab(QTabWidget):
         self.update_backups_table()
 
     def delete_button_clicked(self):
-        selection_model = self.backups_table.selectionModel()
-        if selection_model is None or not selection_model.hasSelection():
+        selected_row = self.selected_backup_row()
+        if selected_row is None:
             return
 
-        selected = selection_model.currentIndex()
-        table_item = self.backups_table.item(selected.row(), 0)
-        selected_info = self.backups[table_item]
+        selected_info = self.backups_model.records[selected_row]
 
-        if not os.path.isfile(selected_info['path']):
+        if not os.path.isfile(selected_info.path):
             return
 
         confirm_msgbox = QMessageBox()
@@ -5406,7 +4974,7 @@ class BackupsTab(QTabWidget):
             'cannot be undone.'))
         confirm_msgbox.setInformativeText(_('Are you sure you want to '
             'delete the <strong>{filename}</strong> backup?').format(
-            filename=selected_info['path']))
+            filename=selected_info.path))
         confirm_msgbox.addButton(_('Delete the backup'),
             QMessageBox.YesRole)
         confirm_msgbox.addButton(_('I want to keep the backup'),
@@ -5417,14 +4985,59 @@ class BackupsTab(QTabWidget):
             main_window = self.get_main_window()
             status_bar = main_window.statusBar()
 
-            if not retry_delfile(selected_info['path']):
+            if not retry_delfile(selected_info.path):
                 status_bar.showMessage(_('Backup deletion cancelled'))
+            elif is_incremental(selected_info.path):
+                self.collect_deleted_backup(selected_info.path)
             else:
-                self.backups_table.removeRow(selected.row())
-                del self.backups[table_item]
+                self.backups_model.remove_record(selected_row)
+
+                status_bar.showMessage(_('Backup deleted'))
+
+    def collect_deleted_backup(self, path):
+        # Remove the content only the deleted backup used in the background.
+        # Nothing can be backed up until it is done.
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+
+        status_bar.showMessage(_('Removing the content of the deleted '
+            'backup'))
+        status_bar.busy += 1
+
+        self.disable_tab()
+        self.get_main_tab().disable_tab()
+        self.get_soundpacks_tab().disable_tab()
+        self.get_settings_tab().disable_tab()
+        self.get_mods_tab().disable_tab()
+
+        garbage_collector = GarbageCollector(os.path.dirname(path))
+        self.garbage_collector = garbage_collector
+
+        def finished():
+            self.garbage_collector = None
+            status_bar.busy -= 1
+
+            self.enable_tab()
+            self.get_main_tab().enable_tab()
+            self.get_soundpacks_tab().enable_tab()
+            self.get_settings_tab().enable_tab()
+            self.get_mods_tab().enable_tab()
+
+            for row, record in enumerate(self.backups_model.records):
+                if record.path == path:
+                    self.backups_model.remove_record(row)
+                    break
 
+            if garbage_collector.error is not None:
+                status_bar.showMessage(_('Could not remove the content of '
+                    'the deleted backup: {error}').format(
+                    error=str(garbage_collector.error)))
+            else:
                 status_bar.showMessage(_('Backup deleted'))
 
+        garbage_collector.finished.connect(finished)
+        garbage_collector.start()
+
     def backup_current_clicked(self):
         if self.manual_backup and self.backup_searching:
             if (self.compressing_timer is not None and
@@ -5458,7 +5071,7 @@ class BackupsTab(QTabWidget):
 
             if self.compress_thread is not None:
                 self.backup_current_button.setEnabled(False)
-                self.compress_thread.quit()
+                self.compress_thread.cancel()
 
                 def completed():
                     self.finish_backup_saves()
@@ -5507,7 +5120,7 @@ class BackupsTab(QTabWidget):
 
         for entry in scandir(backup_dir):
             filename, ext = os.path.splitext(entry.name)
-            if entry.is_file() and ext.lower() == '.zip':
+            if entry.is_file() and ext.lower() in BACKUP_EXTENSIONS:
                 filename_lower = filename.lower()
 
                 if filename_lower.startswith(search_start):
@@ -5527,6 +5140,9 @@ class BackupsTab(QTabWidget):
             for backup in to_remove:
                 retry_delfile(backup['path'])
 
+            if any(is_incremental(backup['path']) for backup in to_remove):
+                self.collect_pending = True
+
     def backup_saves(self, name, single=False):
         main_window = self.get_main_window()
         status_bar = main_window.statusBar()
@@ -5544,65 +5160,27 @@ class BackupsTab(QTabWidget):
 
             os.makedirs(backup_dir)
 
+        ext = backup_extension()
         if single:
-            backup_filename = name + '.zip'
-            self.backup_path = os.path.join(backup_dir, backup_filename)
-            if os.path.isfile(self.backup_path):
-                if not retry_delfile(self.backup_path):
-                    status_bar.showMessage(_('Could not delete previous '
-                        'backup archive'))
-                    return
-        else:
-            '''
-            Finding a backup filename which does not already exists or is the
-            next backup name based on an incremental counter placed at the end
-            of the filename without the extension.
-            '''
-
-            name_lower = name.lower()
-            name_key = alphanum_key(name_lower)
-            if len(name_key) > 1 and isinstance(name_key[-1:][0], int):
-                name_key = name_key[:-1]
-
-            duplicate_name = False
-            duplicate_basename = False
-            max_counter = 0
-
-            for entry in scandir(backup_dir):
-                filename, ext = os.path.splitext(entry.name)
-                if entry.is_file() and ext.lower() == '.zip':
-                    filename_lower = filename.lower()
-
-                    if filename_lower == name_lower:
-                        duplicate_name = True
-                    else:
-                        filename_key = alphanum_key(filename_lower)
-
-                        counter = filename_key[-1:][0]
-                        if len(filename_key) > 1 and isinstance(counter, int):
-                            filename_key = filename_key[:-1]
-
-                            if name_key == filename_key:
-                                duplicate_basename = True
-                                max_counter = max(max_counter, counter)
-
-            if duplicate_basename:
-                name_key = alphanum_key(name)
-                if len(name_key) > 1 and isinstance(name_key[-1:][0], int):
-                    name_key = name_key[:-1]
-
-                name_key.append(max_counter + 1)
-                backup_filename = ''.join(map(lambda x: str(x), name_key))
-            elif duplicate_name:
-                backup_filename = name + '2'
-            else:
-                backup_filename = name
-
-            backup_filename = backup_filename + '.zip'
+            # Replace the previous backup whatever its format was
+            replaced_incremental = False
+            for previous_ext in BACKUP_EXTENSIONS:
+                previous_path = os.path.join(backup_dir, name + previous_ext)
+                if os.path.isfile(previous_path):
+                    if not retry_delfile(previous_path):
+                        status_bar.showMessage(_('Could not delete previous '
+                            'backup archive'))
+                        return
+                    replaced_incremental = (replaced_incremental
+                        or is_incremental(previous_path))
 
-            self.backup_path = os.path.join(backup_dir, backup_filename)
+            if replaced_incremental:
+                self.collect_pending = True
 
-        self.backup_file = None
+            self.backup_path = os.path.join(backup_dir, name + ext)
+        else:
+            self.backup_path = os.path.join(backup_dir,
+                backup_filename(backup_dir, name, ext))
 
         status_bar.clearMessage()
         status_bar.busy += 1
@@ -5695,11 +5273,8 @@ class BackupsTab(QTabWidget):
                         status_bar.addWidget(progress_bar)
                         self.compressing_progress_bar = progress_bar
 
-                        self.comp_size = 0
-                        self.comp_files = 0
                         self.last_comp_bytes = 0
                         self.last_comp = datetime.utcnow()
-                        self.next_backup_file = None
 
                         self.compressing_timer.stop()
                         self.compressing_timer = None
@@ -5710,88 +5285,80 @@ class BackupsTab(QTabWidget):
         timer.start(0)
 
     def backup_saves_step2(self):
+        files = [(path, os.path.relpath(path, self.game_dir),
+            self.backup_file_sizes[path]) for path in self.backup_files]
 
-        class CompressThread(QThread):
-            completed = pyqtSignal()
-
-            def __init__(self, zfile, filename, arcname):
-                super(CompressThread, self).__init__()
-
-                self.zfile = zfile
-                self.filename = filename
-                self.arcname = arcname
-
-            def __del__(self):
-                self.wait()
-
-            def run(self):
-                self.zfile.write(self.filename, self.arcname)
-                self.completed.emit()
+        compress_thread = BackupCompressor(self.backup_path, files,
+            backup_codec(), self.collect_pending)
+        self.collect_pending = False
+        compress_thread.finished.connect(self.backup_compressed)
+        self.compress_thread = compress_thread
 
-        def backup_next_file():
-            try:
-                if self.backup_compressing:
-                    next_file = self.backup_files.popleft()
-                    relpath = os.path.relpath(next_file, self.game_dir)
-                    self.next_backup_file = next_file
+        timer = QTimer(self)
+        timer.timeout.connect(self.display_compressing_progress)
+        self.compressing_timer = timer
 
-                    self.compressing_label.setText(
-                        _('Compressing {filename}').format(filename=relpath))
+        compress_thread.start()
+        timer.start(int(PROGRESS_INTERVAL.total_seconds() * 1000))
 
-                    compress_thread = CompressThread(self.backup_file,
-                        next_file, relpath)
-                    compress_thread.completed.connect(completed_compress)
-                    self.compress_thread = compress_thread
+    def display_compressing_progress(self):
+        compress_thread = self.compress_thread
+        if compress_thread is None:
+            return
 
-                    compress_thread.start()
-                    
-            except IndexError:
-                self.backup_compressing = False
-                self.compress_thread = None
+        comp_size = compress_thread.compressed_size
+        if compress_thread.current_file != '':
+            self.compressing_label.setText(_('Compressing {filename}'
+                ).format(filename=compress_thread.current_file))
 
-                self.finish_backup_saves()
+        self.compressing_progress_bar.setValue(comp_size)
+        self.compressing_size_label.setText(
+            _('{bytes_read}/{total_bytes}').format(
+            bytes_read=sizeof_fmt(comp_size),
+            total_bytes=sizeof_fmt(self.total_backup_size)))
 
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
+        delta_bytes = comp_size - self.last_comp_bytes
+        delta_time = datetime.utcnow() - self.last_comp
+        if delta_time.total_seconds() == 0:
+            delta_time = timedelta.resolution
 
-                if self.after_backup is not None:
-                    self.after_update_backups = self.after_backup
-                    self.after_backup = None
-                else:
-                    status_bar.showMessage(_('Saves backup completed'))
-                
-                self.update_backups_table()
+        bytes_secs = delta_bytes / delta_time.total_seconds()
+        self.compressing_speed_label.setText(_('{bytes_sec}/s'
+            ).format(bytes_sec=sizeof_fmt(bytes_secs)))
 
-        def completed_compress():
-            self.comp_size += self.backup_file_sizes[self.next_backup_file]
-            self.compressing_progress_bar.setValue(self.comp_size)
+        self.last_comp_bytes = comp_size
+        self.last_comp = datetime.utcnow()
 
-            self.compressing_size_label.setText(
-                _('{bytes_read}/{total_bytes}').format(
-                bytes_read=sizeof_fmt(self.comp_size),
-                total_bytes=sizeof_fmt(self.total_backup_size)))
+    def backup_compressed(self):
+        compress_thread = self.compress_thread
+        if (compress_thread is None or compress_thread.cancelled
+            or not self.backup_compressing):
+            return
 
-            delta_bytes = self.comp_size - self.last_comp_bytes
-            delta_time = datetime.utcnow() - self.last_comp
-            if delta_time.total_seconds() == 0:
-                delta_time = timedelta.resolution
+        self.backup_compressing = False
+        self.compress_thread = None
 
-            bytes_secs = delta_bytes / delta_time.total_seconds()
-            self.compressing_speed_label.setText(_('{bytes_sec}/s'
-                ).format(bytes_sec=sizeof_fmt(bytes_secs)))
+        self.finish_backup_saves()
 
-            self.last_comp_bytes = self.comp_size
-            self.last_comp = datetime.utcnow()
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
 
-            backup_next_file()
+        if compress_thread.error is not None:
+            self.after_backup = None
+            status_bar.showMessage(_('Could not backup saves: {error}'
+                ).format(error=str(compress_thread.error)))
+        elif self.after_backup is not None:
+            self.after_update_backups = self.after_backup
+            self.after_backup = None
+        else:
+            status_bar.showMessage(_('Saves backup completed'))
 
-        self.backup_file = zipfile.ZipFile(self.backup_path, 'w',
-            zipfile.ZIP_DEFLATED)
-        backup_next_file()
+        self.update_backups_table()
 
     def finish_backup_saves(self):
-        if self.backup_file is not None:
-            self.backup_file.close()
+        if self.compressing_timer is not None:
+            self.compressing_timer.stop()
+            self.compressing_timer = None
 
         main_window = self.get_main_window()
         status_bar = main_window.statusBar()
@@ -5827,18 +5394,27 @@ class BackupsTab(QTabWidget):
         self.update_backups_table()
 
     def backups_table_header_sort(self, index, order):
-        self.backups_table.sortItems(index, order)
+        self.backups_model.sort(index, order)
 
     def backups_table_selection_changed(self):
-        items = self.backups_table.selectedItems()
-        has_items = len(items) > 0
+        has_items = self.backups_table.selectionModel().hasSelection()
         
         self.restore_button.setEnabled(has_items)
         self.delete_button.setEnabled(has_items)
 
+    def selected_backup_row(self):
+        selection_model = self.backups_table.selectionModel()
+        if selection_model is None or not selection_model.hasSelection():
+            return None
+
+        selected = selection_model.currentIndex()
+        if not selected.isValid():
+            return None
+
+        return selected.row()
+
     def clear_backups(self):
         self.game_dir = None
-        self.backups = {}
 
         self.restore_button.setEnabled(False)
         self.refresh_list_button.setEnabled(False)
@@ -5848,30 +5424,22 @@ class BackupsTab(QTabWidget):
 
         self.backups_table.horizontalHeader().setSortIndicatorShown(False)
 
-        self.backups_table.clearContents()
-        for i in range(self.backups_table.rowCount()):
-            self.backups_table.removeRow(0)
+        self.backups_model.set_records([])
 
     def update_backups_table(self):
-        selection_model = self.backups_table.selectionModel()
-        if selection_model is None or not selection_model.hasSelection():
+        selected_row = self.selected_backup_row()
+        if selected_row is None:
             self.previous_selection = None
         else:
-            selected = selection_model.currentIndex()
-            table_item = self.backups_table.item(selected.row(), 0)
-            selected_info = self.backups[table_item]
-
-            self.previous_selection = selected_info['path']
-
-        self.previous_selection_index = None
+            self.previous_selection = self.backups_model.records[
+                selected_row].path
 
         self.backups_table.horizontalHeader().setSortIndicatorShown(False)
 
-        self.backups_table.clearContents()
-        for i in range(self.backups_table.rowCount()):
-            self.backups_table.removeRow(0)
-
-        self.backups = {}
+        # Backups are collected first and shown with a single model reset
+        self.backups_model.set_records([])
+        self.backups_records = []
+        self.backups_table_selection_changed()
 
         if self.game_dir is None:
             return
@@ -5889,38 +5457,27 @@ class BackupsTab(QTabWidget):
         timer = QTimer(self)
         self.update_backups_timer = timer
 
+        self.backups_index = BackupIndex(backup_dir)
         self.backups_scan = scandir(backup_dir)
 
         def timeout():
             try:
                 entry = next(self.backups_scan)
                 filename, ext = os.path.splitext(entry.name)
-                if ext.lower() == '.zip':
-                    uncompressed_size = 0
-                    character_count = 0
-                    worlds_set = set()
-                    try:
-                        with zipfile.ZipFile(entry.path) as zfile:
-                            for info in zfile.infolist():
-                                if not info.filename.startswith('save/'):
-                                    return
-
-                                uncompressed_size += info.file_size
-                                
-                                path_items = info.filename.split('/')
-                                
-                                if len(path_items) == 3:
-                                    save_file = path_items[-1]
-                                    if save_file.endswith('.sav'):
-                                        character_count += 1
-                                    if save_file in WORLD_FILES:
-                                        worlds_set.add(path_items[1])
-                    except zipfile.BadZipFile:
-                        pass
+                if entry.is_file() and ext.lower() in BACKUP_EXTENSIONS:
+                    # Archives are only opened when the index does not
+                    # already know them
+                    record = self.backups_index.record(entry.path)
+                    if record is None:
+                        return
 
                     # We found a valid backup
 
-                    compressed_size = entry.stat().st_size
+                    uncompressed_size = record['actual_size']
+                    compressed_size = record['compressed_size']
+                    character_count = record['characters']
+                    worlds_set = set(record['worlds'])
+
                     modified_date = datetime.fromtimestamp(
                         entry.stat().st_mtime)
                     formated_date = format_datetime(modified_date,
@@ -5929,11 +5486,6 @@ class BackupsTab(QTabWidget):
                     human_delta = arrow_date.humanize(arrow.utcnow(),
                         locale=app_locale)
 
-                    row_index = self.backups_table.rowCount()
-                    self.backups_table.insertRow(row_index)
-
-                    flags = (Qt.ItemIsSelectable | Qt.ItemIsEnabled)
-
                     if uncompressed_size == 0:
                         compression_ratio = 0
                     else:
@@ -5943,10 +5495,6 @@ class BackupsTab(QTabWidget):
                     ratio_percent = format_percent(rounded_ratio,
                         format='#.##%', locale=app_locale)
 
-                    if self.previous_selection is not None:
-                        if entry.path == self.previous_selection:
-                            self.previous_selection_index = row_index
-
                     fields = (
                         (filename, alphanum_key(filename)),
                         (human_delta, modified_date),
@@ -5955,40 +5503,46 @@ class BackupsTab(QTabWidget):
                         (sizeof_fmt(uncompressed_size), uncompressed_size),
                         (sizeof_fmt(compressed_size), compressed_size),
                         (ratio_percent, compression_ratio),
-                        (formated_date, modified_date)
+                        (formated_date, modified_date),
+                        (codec_label(record['codec']), record['codec'] or '')
                         )
 
-                    for index, value in enumerate(fields):
-                        item = SortEnabledTableWidgetItem(value[0], value[1])
-                        item.setFlags(flags)
-                        self.backups_table.setItem(row_index, index, item)
-
-                        if index == 0:
-                            self.backups[item] = {
-                                'path': entry.path,
-                                'actual_size': uncompressed_size
-                            }
+                    self.backups_records.append(BackupRecord(entry.path,
+                        uncompressed_size,
+                        tuple(value[0] for value in fields),
+                        tuple(value[1] for value in fields)))
 
             except StopIteration:
                 self.update_backups_timer.stop()
 
-                if self.previous_selection_index is not None:
-                    selection_model = self.backups_table.selectionModel()
-                    model = selection_model.model()
-
-                    first_index = model.index(self.previous_selection_index, 0)
-                    last_index = model.index(self.previous_selection_index,
-                        self.backups_table.columnCount() - 1)
-                    row_selection = QItemSelection(first_index, last_index)
-
-                    selection_model.select(row_selection,
-                        QItemSelectionModel.Select)
-                    selection_model.setCurrentIndex(first_index,
-                        QItemSelectionModel.Select)
-
-                self.backups_table.sortItems(1, Qt.DescendingOrder)
-                self.backups_table.horizontalHeader().setSortIndicatorShown(
-                    True)
+                self.backups_index.prune()
+                self.backups_index.save()
+
+                self.backups_model.set_records(self.backups_records)
+                self.backups_records = []
+
+                # The model keeps its sort order when the records are set
+                # and the sort indicator only sorts again when it changes
+                header = self.backups_table.horizontalHeader()
+                header.setSortIndicator(1, Qt.DescendingOrder)
+                header.setSortIndicatorShown(True)
+
+                if self.previous_selection is not None:
+                    for row, record in enumerate(self.backups_model.records):
+                        if record.path == self.previous_selection:
+                            first_index = self.backups_model.index(row, 0)
+                            last_index = self.backups_model.index(row,
+                                self.backups_model.columnCount() - 1)
+                            row_selection = QItemSelection(first_index,
+                                last_index)
+
+                            selection_model = (
+                                self.backups_table.selectionModel())
+                            selection_model.select(row_selection,
+                                QItemSelectionModel.Select)
+                            selection_model.setCurrentIndex(first_index,
+                                QItemSelectionModel.Select)
+                            break
 
                 if self.after_update_backups is not None:
                     self.after_update_backups()
@@ -5998,17 +5552,118 @@ class BackupsTab(QTabWidget):
         timer.start(0)
 
 
-class SortEnabledTableWidgetItem(QTableWidgetItem):
-    def __init__(self, value, sort_data):
-        super(SortEnabledTableWidgetItem, self).__init__(value)
+def codec_label(codec):
+    labels = {
+        'store': _('Stored'),
+        'deflate_fast': _('Deflate (fast)'),
+        'deflate': _('Deflate'),
+        'deflate_max': _('Deflate (maximum)'),
+        'bzip2': _('bzip2'),
+        'lzma': _('LZMA'),
+        'zstd': _('Zstandard'),
+        'adaptive': _('Adaptive'),
+        'incremental': _('Incremental'),
+        'mixed': _('Mixed')
+    }
+    return labels.get(codec, _('Unknown'))
+
+
+class BackupRecord(object):
+    __slots__ = ('path', 'actual_size', 'texts', 'sort_keys')
+
+    def __init__(self, path, actual_size, texts, sort_keys):
+        self.path = path
+        self.actual_size = actual_size
+        self.texts = texts
+        self.sort_keys = sort_keys
 
-        self.sort_data = sort_data
+    @property
+    def name(self):
+        return self.texts[0]
 
-    def __lt__(self, other):
-        return self.sort_data < other.sort_data
 
-    def __hash__(self):
-        return id(self)
+# Table of the backups found in the save_backups directory. The sort keys of
+# every column are computed once when a backup is found so sorting does not
+# call back into Qt for each comparison.
+class BackupsModel(QAbstractTableModel):
+    COLUMN_COUNT = 9
+
+    def __init__(self):
+        super(BackupsModel, self).__init__()
+
+        self.records = []
+        self.headers = ('',) * self.COLUMN_COUNT
+
+        self.sort_column = None
+        self.sort_order = Qt.AscendingOrder
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.records)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.COLUMN_COUNT
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+
+        return self.records[index.row()].texts[index.column()]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+
+        return super(BackupsModel, self).headerData(section, orientation,
+            role)
+
+    def set_headers(self, headers):
+        self.headers = tuple(headers)
+        self.headerDataChanged.emit(Qt.Horizontal, 0, self.COLUMN_COUNT - 1)
+
+    def sort_records(self):
+        if self.sort_column is None:
+            return
+
+        column = self.sort_column
+        self.records.sort(key=lambda record: record.sort_keys[column],
+            reverse=self.sort_order == Qt.DescendingOrder)
+
+    def set_records(self, records):
+        self.beginResetModel()
+
+        self.records = records
+        self.sort_records()
+
+        self.endResetModel()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+
+        # Selected rows follow their record to its new position
+        persistent_indexes = self.persistentIndexList()
+        persistent_records = [self.records[index.row()]
+            for index in persistent_indexes]
+
+        self.sort_column = column
+        self.sort_order = order
+        self.sort_records()
+
+        rows = dict((id(record), row)
+            for row, record in enumerate(self.records))
+        self.changePersistentIndexList(persistent_indexes,
+            [self.index(rows[id(record)], index.column())
+            for record, index in zip(persistent_records, persistent_indexes)])
+
+        self.layoutChanged.emit()
+
+    def remove_record(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.records[row]
+        self.endRemoveRows()
 
 
 class ModsTab(QTabWidget):
@@ -6026,6 +5681,8 @@ class ModsTab(QTabWidget):
         self.installing_new_mod = False
         self.downloading_new_mod = False
         self.extracting_new_mod = False
+        self.archive_cache_worker = None
+        self.archive_storers = []
 
         self.install_type = None
         self.extracting_file = None
@@ -6375,50 +6032,10 @@ class ModsTab(QTabWidget):
                 file_name = file_info.fileName()
 
                 self.downloaded_file = os.path.join(download_dir, file_name)
-                self.downloading_file = open(self.downloaded_file, 'wb')
-
-                main_window = self.get_main_window()
-
-                status_bar = main_window.statusBar()
-                status_bar.clearMessage()
-
-                status_bar.busy += 1
+                self.download_url = download_url
 
-                downloading_label = QLabel()
-                downloading_label.setText(_('Downloading: {0}').format(
-                    selected_info['url']))
-                status_bar.addWidget(downloading_label, 100)
-                self.downloading_label = downloading_label
-
-                dowloading_speed_label = QLabel()
-                status_bar.addWidget(dowloading_speed_label)
-                self.dowloading_speed_label = dowloading_speed_label
-
-                downloading_size_label = QLabel()
-                status_bar.addWidget(downloading_size_label)
-                self.downloading_size_label = downloading_size_label
-
-                progress_bar = QProgressBar()
-                status_bar.addWidget(progress_bar)
-                self.downloading_progress_bar = progress_bar
-                progress_bar.setMinimum(0)
-
-                self.download_last_read = datetime.utcnow()
-                self.download_last_bytes_read = 0
-                self.download_speed_count = 0
-
-                self.downloading_new_mod = True
-
-                request = QNetworkRequest(QUrl(url))
-                request.setRawHeader(b'User-Agent', b'Mozilla /5.0 (linux-gnu)')
-
-                self.download_http_reply = self.qnam.get(request)
-                self.download_http_reply.finished.connect(
-                    self.download_http_finished)
-                self.download_http_reply.readyRead.connect(
-                    self.download_http_ready_read)
-                self.download_http_reply.downloadProgress.connect(
-                    self.download_dl_progress)
+                self.downloaded_from_cache = False
+                self.fetch_cached_mod()
 
                 self.install_new_button.setText(_('Cancel mod installation'))
                 self.installed_lv.setEnabled(False)
@@ -6513,7 +6130,11 @@ class ModsTab(QTabWidget):
             status_bar = main_window.statusBar()
 
             # Cancel installation
-            if self.downloading_new_mod:
+            if self.archive_cache_worker is not None:
+                # The download directory is removed once the worker finishes
+                self.archive_cache_worker = None
+                status_bar.busy -= 1
+            elif self.downloading_new_mod:
                 self.download_aborted = True
                 self.download_http_reply.abort()
             elif self.extracting_new_mod:
@@ -6606,59 +6227,174 @@ class ModsTab(QTabWidget):
                 self.download_http_reply.downloadProgress.connect(
                     self.download_dl_progress)
             else:
-                # Test downloaded file
+                self.test_downloaded_mod()
 
-                status_bar.showMessage(_('Testing downloaded file archive'))
+    def download_mod(self, download_url):
+        url = QUrl(download_url)
 
-                if self.downloaded_file.lower().endswith('.7z'):
-                    try:
-                        with open(self.downloaded_file, 'rb') as f:
-                            archive = Archive7z(f)
-                    except FormatError:
-                        status_bar.clearMessage()
-                        status_bar.showMessage(_('Selected file is a '
-                            'bad archive file'))
+        self.downloading_file = open(self.downloaded_file, 'wb')
 
-                        self.finish_install_new_mod()
-                        return
-                    except NoPasswordGivenError:
-                        status_bar.clearMessage()
-                        status_bar.showMessage(_('Selected file is a '
-                            'password protected archive file'))
+        main_window = self.get_main_window()
 
-                        self.finish_install_new_mod()
-                        return
-                else:
-                    if self.downloaded_file.lower().endswith('.zip'):
-                        archive_class = zipfile.ZipFile
-                        archive_exception = zipfile.BadZipFile
-                        test_method = 'testzip'
-                    elif self.downloaded_file.lower().endswith('.rar'):
-                        archive_class = rarfile.RarFile
-                        archive_exception = rarfile.BadRarFile
-                        test_method = 'testrar'
+        status_bar = main_window.statusBar()
+        status_bar.clearMessage()
 
-                    try:
-                        with archive_class(self.downloaded_file) as z:
-                            test = getattr(z, test_method)
-                            if test() is not None:
-                                status_bar.clearMessage()
-                                status_bar.showMessage(
-                                    _('Downloaded archive is invalid'))
+        status_bar.busy += 1
 
-                                self.finish_install_new_mod()
-                                return
-                    except archive_exception:
+        downloading_label = QLabel()
+        downloading_label.setText(_('Downloading: {0}').format(
+            download_url))
+        status_bar.addWidget(downloading_label, 100)
+        self.downloading_label = downloading_label
+
+        dowloading_speed_label = QLabel()
+        status_bar.addWidget(dowloading_speed_label)
+        self.dowloading_speed_label = dowloading_speed_label
+
+        downloading_size_label = QLabel()
+        status_bar.addWidget(downloading_size_label)
+        self.downloading_size_label = downloading_size_label
+
+        progress_bar = QProgressBar()
+        status_bar.addWidget(progress_bar)
+        self.downloading_progress_bar = progress_bar
+        progress_bar.setMinimum(0)
+
+        self.download_last_read = datetime.utcnow()
+        self.download_last_bytes_read = 0
+        self.download_speed_count = 0
+
+        self.downloading_new_mod = True
+
+        request = QNetworkRequest(QUrl(url))
+        request.setRawHeader(b'User-Agent', b'Mozilla /5.0 (linux-gnu)')
+
+        self.download_http_reply = self.qnam.get(request)
+        self.download_http_reply.finished.connect(
+            self.download_http_finished)
+        self.download_http_reply.readyRead.connect(
+            self.download_http_ready_read)
+        self.download_http_reply.downloadProgress.connect(
+            self.download_dl_progress)
+
+    def fetch_cached_mod(self):
+        # Reuse a previously downloaded archive when we have one. The cached
+        # archive is checked against its hash in a worker thread.
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+
+        status_bar.busy += 1
+        status_bar.showMessage(_('Looking for the archive in the cache'))
+
+        archive_cache_worker = ArchiveCacheWorker(self.download_url,
+            self.downloaded_file)
+        self.archive_cache_worker = archive_cache_worker
+
+        def finished():
+            if archive_cache_worker is not self.archive_cache_worker:
+                # The installation was cancelled in the meantime
+                retry_rmtree(os.path.dirname(archive_cache_worker.path))
+                return
+
+            self.archive_cache_worker = None
+
+            status_bar.busy -= 1
+            status_bar.clearMessage()
+
+            self.downloaded_from_cache = archive_cache_worker.found
+            if self.downloaded_from_cache:
+                self.test_downloaded_mod()
+            else:
+                self.download_mod(self.download_url)
+
+        archive_cache_worker.finished.connect(finished)
+        archive_cache_worker.start()
+
+    def store_downloaded_archive(self):
+        # Keep a copy of the archive if selected in the settings. It is
+        # hashed in a worker thread while the installation goes on.
+        download_dir = os.path.dirname(self.downloaded_file)
+
+        archive_storer = ArchiveCacheWorker(self.download_url,
+            self.downloaded_file, True)
+
+        def finished():
+            self.archive_storers.remove(archive_storer)
+            retry_rmtree(download_dir)
+
+        archive_storer.finished.connect(finished)
+        self.archive_storers.append(archive_storer)
+        archive_storer.start()
+
+    def test_downloaded_mod(self):
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+
+        # Test downloaded file
+
+        status_bar.showMessage(_('Testing downloaded file archive'))
+
+        if self.downloaded_file.lower().endswith('.7z'):
+            try:
+                with open(self.downloaded_file, 'rb') as f:
+                    archive = Archive7z(f)
+            except FormatError:
+                status_bar.clearMessage()
+                status_bar.showMessage(_('Selected file is a '
+                    'bad archive file'))
+
+                if self.downloaded_from_cache:
+                    discard_cached_archive(self.download_url)
+
+                self.finish_install_new_mod()
+                return
+            except NoPasswordGivenError:
+                status_bar.clearMessage()
+                status_bar.showMessage(_('Selected file is a '
+                    'password protected archive file'))
+
+                if self.downloaded_from_cache:
+                    discard_cached_archive(self.download_url)
+
+                self.finish_install_new_mod()
+                return
+        else:
+            if self.downloaded_file.lower().endswith('.zip'):
+                archive_class = zipfile.ZipFile
+                archive_exception = zipfile.BadZipFile
+                test_method = 'testzip'
+            elif self.downloaded_file.lower().endswith('.rar'):
+                archive_class = rarfile.RarFile
+                archive_exception = rarfile.BadRarFile
+                test_method = 'testrar'
+
+            try:
+                with archive_class(self.downloaded_file) as z:
+                    test = getattr(z, test_method)
+                    if test() is not None:
                         status_bar.clearMessage()
-                        status_bar.showMessage(_('Selected file is a '
-                            'bad archive file'))
+                        status_bar.showMessage(
+                            _('Downloaded archive is invalid'))
+
+                        if self.downloaded_from_cache:
+                            discard_cached_archive(self.download_url)
 
                         self.finish_install_new_mod()
                         return
-
+            except archive_exception:
                 status_bar.clearMessage()
-                self.downloading_new_mod = False
-                self.extract_new_mod()
+                status_bar.showMessage(_('Selected file is a '
+                    'bad archive file'))
+
+                if self.downloaded_from_cache:
+                    discard_cached_archive(self.download_url)
+
+                self.finish_install_new_mod()
+                return
+
+        status_bar.clearMessage()
+        self.downloading_new_mod = False
+        self.extract_new_mod()
 
     def finish_install_new_mod(self):
         self.installing_new_mod = False
@@ -6769,8 +6505,11 @@ class ModsTab(QTabWidget):
                     self.extracting_archive = None
 
                 if self.install_type == 'direct_download':
-                    download_dir = os.path.dirname(self.downloaded_file)
-                    retry_rmtree(download_dir)
+                    if not self.downloaded_from_cache:
+                        self.store_downloaded_archive()
+                    else:
+                        download_dir = os.path.dirname(self.downloaded_file)
+                        retry_rmtree(download_dir)
 
                 self.move_new_mod()
 
@@ -7291,221 +7030,223 @@ class CataWindow(QWidget):
         painter.fillRect(rect, Qt.green)
             
 
-# Recursively copy an entire directory tree while showing progress in a
-# status bar.
-class ProgressCopyTree(QTimer):
-    completed = pyqtSignal()
-    aborted = pyqtSignal()
+# Compute the sha256 of a game executable and find its embedded version in a
+# background thread.
+class ExeIdentifier(QThread):
+    progress = pyqtSignal(int)
+    completed = pyqtSignal(str, str)
+    failed = pyqtSignal(str)
 
-    def __init__(self, src, dst, status_bar, name):
-        if not os.path.isdir(src):
-            raise OSError(_("Source path '%s' is not a directory") % src)
-        if os.path.exists(dst):
-            raise OSError(_("Destination path '%s' already exists") % dst)
+    def __init__(self, exe_path):
+        super(ExeIdentifier, self).__init__()
 
-        super(ProgressCopyTree, self).__init__()
+        self.exe_path = exe_path
+        self.cancelled = False
 
-        self.src = src
-        self.dst = dst
+    def __del__(self):
+        self.wait()
 
-        self.status_bar = status_bar
-        self.name = name
+    def cancel(self):
+        self.cancelled = True
 
-        self.started = False
-        self.callback = None
+    def run(self):
+        total_read = 0
+        last_progress = datetime.utcnow()
 
-        self.status_label = None
-        self.copying_speed_label = None
-        self.copying_size_label = None
-        self.progress_bar = None
+        try:
+            # The version resource only needs a few reads, fall back on
+            # scanning the whole executable when it is missing
+            resource_version = read_version_resource(self.exe_path)
+            digest = ExeDigest(scan_version=resource_version is None)
+
+            with open(self.exe_path, 'rb') as exe_file:
+                while not self.cancelled:
+                    bytes = exe_file.read(EXE_READ_BUFFER_SIZE)
+                    if len(bytes) == 0:
+                        break
 
-        self.source_file = None
-        self.destination_file = None
+                    digest.update(bytes)
 
-        self.analysing = False
-        self.copying = False
-        self.copy_completed = False
+                    total_read += len(bytes)
+                    now = datetime.utcnow()
+                    if now - last_progress >= PROGRESS_INTERVAL:
+                        last_progress = now
+                        self.progress.emit(total_read)
+        except OSError as e:
+            if not self.cancelled:
+                self.failed.emit(_('Could not read {path}: {error}').format(
+                    path=self.exe_path, error=str(e)))
+            return
 
-    def step(self):
-        if self.analysing:
-            if self.current_scan is None:
-                self.current_scan = scandir(self.src)
+        if not self.cancelled:
+            if resource_version is not None:
+                game_version = resource_version
             else:
-                try:
-                    entry = next(self.current_scan)
-                    self.source_entries.append(entry)
-                    if entry.is_dir():
-                        self.next_scans.append(entry.path)
-                    elif entry.is_file():
-                        self.total_files += 1
-                        self.total_copy_size += entry.stat().st_size
+                game_version = digest.version
 
-                        files_text = ngettext('file', 'files', self.total_files)
+            self.progress.emit(total_read)
+            self.completed.emit(digest.hexdigest(), game_version)
 
-                        self.status_label.setText(_('Analysing {name} - Found '
-                            '{file_count} {files} ({size})').format(
-                                name=self.name,
-                                file_count=self.total_files,
-                                files=files_text,
-                                size=sizeof_fmt(self.total_copy_size)))
 
-                except StopIteration:
-                    if len(self.next_scans) > 0:
-                        self.current_scan = scandir(self.next_scans.popleft())
-                    else:
-                        self.analysing = False
-
-                        os.makedirs(self.dst)
-
-                        if len(self.source_entries) > 0:
-                            self.copying = True
-
-                            copying_speed_label = QLabel()
-                            copying_speed_label.setText(_('{bytes_sec}/s'
-                                ).format(bytes_sec=sizeof_fmt(0)))
-                            self.status_bar.addWidget(copying_speed_label)
-                            self.copying_speed_label = copying_speed_label
-
-                            copying_size_label = QLabel()
-                            copying_size_label.setText(
-                                _('{bytes_read}/{total_bytes}').format(
-                                bytes_read=sizeof_fmt(0),
-                                total_bytes=sizeof_fmt(self.total_copy_size)))
-                            self.status_bar.addWidget(copying_size_label)
-                            self.copying_size_label = copying_size_label
-
-                            progress_bar = QProgressBar()
-                            progress_bar.setRange(0, self.total_copy_size)
-                            progress_bar.setValue(0)
-                            self.status_bar.addWidget(progress_bar)
-                            self.progress_bar = progress_bar
-
-                            self.copied_size = 0
-                            self.copied_files = 0
-                            self.copy_speed_count = 0
-                            self.last_copied_bytes = 0
-                            self.last_copied = datetime.utcnow()
-                            self.current_entry = None
-                            self.source_file = None
-                            self.destination_file = None
-                        else:
-                            self.copy_completed = True
-                            self.stop()
-
-        elif self.copying:
-            if self.current_entry is None:
-                if len(self.source_entries) > 0:
-                    self.current_entry = self.source_entries.popleft()
-                    self.display_entry(self.current_entry)
-                else:
-                    self.copying = False
-                    self.copy_completed = True
-                    self.stop()
-            elif self.source_file is None and self.destination_file is None:
-                relpath = os.path.relpath(self.current_entry.path, self.src)
-                dstpath = os.path.join(self.dst, relpath)
-                self.dstpath = dstpath
-
-                if self.current_entry.is_dir():
-                    os.makedirs(dstpath)
-                    self.current_entry = None
-                elif self.current_entry.is_file():
-                    filedir = os.path.dirname(dstpath)
-                    if not os.path.isdir(filedir):
-                        os.makedirs(filedir)
-                    self.source_file = open(self.current_entry.path, 'rb')
-                    self.destination_file = open(dstpath, 'wb')
+# Run a game update from the engine in a worker thread. An interrupted update
+# is resumed from its journal. The window polls state to show the progress.
+class UpdateWorker(QThread):
+    def __init__(self, game_dir=None, build=None, journal=None):
+        super(UpdateWorker, self).__init__()
+
+        if journal is None:
+            self.update = GameUpdate(game_dir, build, self.report,
+                self.is_cancelled)
+        else:
+            self.update = GameUpdate.from_journal(journal, self.report,
+                self.is_cancelled)
+        self.journal = journal
+
+        self.state = (None, 0, 0, '')
+        self.cancelled = False
+        self.stopped = False
+        self.error = None
+
+    def __del__(self):
+        self.wait()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def is_cancelled(self):
+        return self.cancelled
+
+    def report(self, stage, done, total, name):
+        self.state = (stage, done, total, name)
+
+    def run(self):
+        try:
+            if self.journal is None:
+                self.update.run()
             else:
-                buf = self.source_file.read(READ_BUFFER_SIZE)
-                buf_len = len(buf)
-                if buf_len == 0:
-                    self.source_file.close()
-                    self.destination_file.close()
-                    shutil.copystat(self.current_entry.path, self.dstpath)
-                    self.source_file = None
-                    self.destination_file = None
-                    self.current_entry = None
-
-                    self.copied_files += 1
-                else:
-                    self.destination_file.write(buf)
-                    
-                    self.copied_size += buf_len
-                    self.progress_bar.setValue(self.copied_size)
+                self.update.resume(self.journal)
+        except UpdateCancelled:
+            self.stopped = True
+        except Exception as e:
+            # The launcher must not be left waiting for the update
+            self.error = str(e)
 
-                    self.copy_speed_count += 1
 
-                    if self.copy_speed_count % 10 == 0:
-                        self.copying_size_label.setText(
-                            _('{bytes_read}/{total_bytes}').format(
-                            bytes_read=sizeof_fmt(self.copied_size),
-                            total_bytes=sizeof_fmt(self.total_copy_size)))
+# Compress save files into a backup archive with a pool of workers. With
+# collect, the content no incremental backup refers to anymore is removed
+# once the backup is written.
+class BackupCompressor(QThread):
+    def __init__(self, backup_path, files, codec, collect=False):
+        super(BackupCompressor, self).__init__()
 
-                        delta_bytes = self.copied_size - self.last_copied_bytes
-                        delta_time = datetime.utcnow() - self.last_copied
-                        if delta_time.total_seconds() == 0:
-                            delta_time = timedelta.resolution
+        self.backup_path = backup_path
+        self.files = files
+        self.codec = codec
+        self.collect = collect
 
-                        bytes_secs = delta_bytes / delta_time.total_seconds()
-                        self.copying_speed_label.setText(_('{bytes_sec}/s'
-                            ).format(bytes_sec=sizeof_fmt(bytes_secs)))
+        self.compressed_size = 0
+        self.current_file = ''
 
-                        self.last_copied_bytes = self.copied_size
-                        self.last_copied = datetime.utcnow()
+        self.error = None
+        self.cancelled = False
 
+    def __del__(self):
+        self.wait()
 
-    def display_entry(self, entry):
-        if self.status_label is not None:
-            entry_rel_path = os.path.relpath(entry.path, self.src)
-            self.status_label.setText(
-                _('Copying {name} - {entry}').format(name=self.name,
-                    entry=entry_rel_path))
+    def cancel(self):
+        self.cancelled = True
 
-    def start(self):
-        self.started = True
-        self.status_bar.clearMessage()
-        self.status_bar.busy += 1
+    def progress(self, done, total, arcname):
+        self.compressed_size = done
+        self.current_file = arcname
 
-        self.analysing = True
-        status_label = QLabel()
-        status_label.setText(_('Analysing {name}').format(name=self.name))
-        self.status_bar.addWidget(status_label, 100)
-        self.status_label = status_label
+    def run(self):
+        try:
+            write_backup(self.backup_path, self.files, self.progress,
+                lambda: self.cancelled, self.codec)
+            if self.collect and not self.cancelled:
+                collect_garbage(os.path.dirname(self.backup_path))
+        except Exception as e:
+            self.error = e
 
-        self.total_copy_size = 0
-        self.total_files = 0
 
-        self.timeout.connect(self.step)
+# Restore a backup in a directory with a pool of workers
+class BackupExtractor(QThread):
+    def __init__(self, backup_path, extract_dir):
+        super(BackupExtractor, self).__init__()
 
-        self.current_scan = None
-        self.next_scans = deque()
-        self.source_entries = deque()
+        self.backup_path = backup_path
+        self.extract_dir = extract_dir
 
-        super(ProgressCopyTree, self).start(0)
+        self.extracted_size = 0
+        self.current_file = ''
 
-    def stop(self):
-        super(ProgressCopyTree, self).stop()
+        self.error = None
+        self.cancelled = False
 
-        if self.started:
-            self.status_bar.busy -= 1
-            if self.status_label is not None:
-                self.status_bar.removeWidget(self.status_label)
-            if self.progress_bar is not None:
-                self.status_bar.removeWidget(self.progress_bar)
-            if self.copying_speed_label is not None:
-                self.status_bar.removeWidget(self.copying_speed_label)
-            if self.copying_size_label is not None:
-                self.status_bar.removeWidget(self.copying_size_label)
+    def __del__(self):
+        self.wait()
 
-            if self.source_file is not None:
-                self.source_file.close()
-            if self.destination_file is not None:
-                self.destination_file.close()
+    def cancel(self):
+        self.cancelled = True
 
-        if self.copy_completed:
-            self.completed.emit()
-        else:
-            self.aborted.emit()
+    def progress(self, done, total, filename):
+        self.extracted_size = done
+        self.current_file = filename
+
+    def run(self):
+        try:
+            extract_backup(self.backup_path, self.extract_dir, self.progress,
+                lambda: self.cancelled)
+        except Exception as e:
+            # Any failure must roll back to the previous saves
+            self.error = e
+
+
+# Remove the content of incremental backups that none of them refers to
+class GarbageCollector(QThread):
+    def __init__(self, backup_dir):
+        super(GarbageCollector, self).__init__()
+
+        self.backup_dir = backup_dir
+
+        self.freed = 0
+        self.error = None
+
+    def __del__(self):
+        self.wait()
+
+    def run(self):
+        try:
+            self.freed = collect_garbage(self.backup_dir)
+        except OSError as e:
+            self.error = e
+
+
+# Look for an archive in the archive cache or store one there in a worker
+# thread since both hash the whole archive. The cache is optional, errors
+# only mean the archive is downloaded again the next time.
+class ArchiveCacheWorker(QThread):
+    def __init__(self, url, path, store=False):
+        super(ArchiveCacheWorker, self).__init__()
+
+        self.url = url
+        self.path = path
+        self.store = store
+
+        self.found = False
+
+    def __del__(self):
+        self.wait()
+
+    def run(self):
+        try:
+            if self.store:
+                store_archive(self.path, self.url)
+            else:
+                self.found = fetch_cached_archive(self.url, self.path)
+        except OSError:
+            self.found = False
 
 
 class ExceptionWindow(QWidget):
@@ -7582,6 +7323,7 @@ def init_gettext(locale):
         _ = t.gettext
         global ngettext
         ngettext = t.ngettext
+        set_engine_translation(t)
     except FileNotFoundError as e:
         logger.warning(_('Could not find translations for {locale} in '
             '{locale_dir} ({info})'
@@ -0,0 +1,201 @@
+import os
+import json
+import struct
+import zipfile
+
+# Manifest of the files extracted from the last build archive
+BUILD_MANIFEST_NAME = 'launcher_manifest.json'
+
+# Enough to contain the end of central directory record with the longest
+# possible comment and the zip64 end of central directory records
+ZIP_TAIL_SIZE = 66 * 1024
+
+# Ranges closer than this are fetched with a single request
+DELTA_RANGE_GAP = 64 * 1024
+
+# Download the whole archive when more than this fraction of it changed
+DELTA_MAX_RATIO = 0.6
+
+EOCD_SIGNATURE = b'PK\x05\x06'
+ZIP64_EOCD_LOCATOR_SIGNATURE = b'PK\x06\x07'
+ZIP64_EOCD_SIGNATURE = b'PK\x06\x06'
+ZIP64_EOCD_LOCATOR_SIZE = 20
+
+# Characters zipfile replaces in member names on Windows
+ILLEGAL_NAME_CHARACTERS = set(':<>|"?*')
+
+
+def read_manifest(game_dir):
+    manifest_path = os.path.join(game_dir, BUILD_MANIFEST_NAME)
+    if not os.path.isfile(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path, 'r', encoding='utf8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(manifest, dict) or not isinstance(
+        manifest.get('files'), dict):
+        return None
+
+    return manifest
+
+def write_manifest(game_dir, infolist):
+    manifest = {
+        'files': dict((info.filename, [info.CRC, info.file_size])
+            for info in infolist if not info.is_dir())
+    }
+
+    manifest_path = os.path.join(game_dir, BUILD_MANIFEST_NAME)
+    with open(manifest_path, 'w', encoding='utf8') as f:
+        json.dump(manifest, f)
+
+# Path where a member is extracted or None when its name needs to be
+# sanitized by zipfile first
+def member_target(game_dir, filename):
+    name = os.path.normpath(filename)
+    if (os.path.isabs(name) or name == os.curdir
+        or name.split(os.sep)[0] == os.pardir
+        or any(c in ILLEGAL_NAME_CHARACTERS for c in name)):
+        return None
+    return os.path.join(game_dir, name)
+
+# Find where the central directory is from the last bytes of an archive
+def central_directory_range(tail, tail_offset):
+    index = tail.rfind(EOCD_SIGNATURE)
+    if index < 0 or index + 22 > len(tail):
+        raise zipfile.BadZipFile('End of central directory not found')
+
+    cd_size, cd_offset = struct.unpack_from('<12xLL', tail, index)
+    if cd_size == 0xffffffff or cd_offset == 0xffffffff:
+        locator = index - ZIP64_EOCD_LOCATOR_SIZE
+        if locator < 0 or tail[locator:locator + 4] != (
+            ZIP64_EOCD_LOCATOR_SIGNATURE):
+            raise zipfile.BadZipFile('Zip64 locator not found')
+
+        record = struct.unpack_from('<8xQ', tail, locator)[0] - tail_offset
+        if record < 0 or tail[record:record + 4] != ZIP64_EOCD_SIGNATURE:
+            raise zipfile.BadZipFile('Zip64 end of central directory not '
+                'found')
+
+        cd_size, cd_offset = struct.unpack_from('<40xQQ', tail, record)
+
+    return cd_offset, cd_size
+
+# Split the members of the new archive between the ones that are already
+# installed and the ones that need to be downloaded
+def plan_delta(infolist, manifest, game_dir):
+    files = manifest['files']
+
+    changed = []
+    unchanged = set()
+    for info in infolist:
+        if info.is_dir():
+            continue
+
+        path = member_target(game_dir, info.filename)
+        if (files.get(info.filename) == [info.CRC, info.file_size]
+            and path is not None
+            and os.path.isfile(path)
+            and os.path.getsize(path) == info.file_size):
+            unchanged.add(info.filename)
+        else:
+            changed.append(info)
+
+    return changed, unchanged
+
+# Byte ranges of the archive holding the changed members. A member spans from
+# its local header to the next member or to the central directory.
+def member_ranges(infolist, changed, cd_offset):
+    offsets = sorted(set(info.header_offset for info in infolist))
+    offsets.append(cd_offset)
+    next_offsets = dict(zip(offsets, offsets[1:]))
+
+    ranges = []
+    for info in sorted(changed, key=lambda info: info.header_offset):
+        start = info.header_offset
+        end = next_offsets[start]
+        if len(ranges) > 0 and start - ranges[-1][1] < DELTA_RANGE_GAP:
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([start, end])
+
+    return ranges
+
+
+# Read only file over the parts of an archive that were downloaded. Ranges
+# are stored one after the other in a local file.
+class RangeFile(object):
+    def __init__(self, path, size, ranges):
+        self.file = open(path, 'rb')
+        self.size = size
+        self.ranges = sorted(ranges)
+        self.position = 0
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            position = offset
+        elif whence == os.SEEK_CUR:
+            position = self.position + offset
+        elif whence == os.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError('Invalid whence value')
+
+        if position < 0:
+            raise OSError('Negative seek position')
+
+        self.position = position
+        return position
+
+    def tell(self):
+        return self.position
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self.position
+        size = min(size, self.size - self.position)
+        if size <= 0:
+            return b''
+
+        # A read can span ranges that follow each other
+        chunks = []
+        while size > 0:
+            for start, end, local_offset in self.ranges:
+                if start <= self.position < end:
+                    self.file.seek(local_offset + self.position - start)
+                    data = self.file.read(min(size, end - self.position))
+                    break
+            else:
+                data = b''
+
+            if len(data) == 0:
+                raise OSError('Archive range not downloaded')
+
+            chunks.append(data)
+            self.position += len(data)
+            size -= len(data)
+
+        return b''.join(chunks)
+
+    def close(self):
+        self.file.close()
+
+
+class RangeZipFile(zipfile.ZipFile):
+    def __init__(self, path, size, ranges):
+        self.range_file = RangeFile(path, size, ranges)
+        try:
+            super(RangeZipFile, self).__init__(self.range_file)
+        except:
+            self.range_file.close()
+            raise
+
+    def close(self):
+        super(RangeZipFile, self).close()
+        self.range_file.close()
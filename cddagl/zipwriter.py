@@ -0,0 +1,393 @@
+import os
+import sys
+import bz2
+import time
+import zlib
+import struct
+import zipfile
+import tempfile
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Files are compressed in parallel by a pool of workers into spools and a
+# single writer appends the compressed entries to the archive in the order
+# they were given.
+
+COMPRESS_WORKERS = max(1, min(os.cpu_count() or 1, 8))
+COMPRESS_BUFFER_SIZE = 1024 * 1024
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Compressed entries larger than this are spooled to a temporary file
+SPOOL_MAX_SIZE = 4 * 1024 * 1024
+
+# Number of files each worker can compress ahead of the writer
+COMPRESS_QUEUE_DEPTH = 2
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+ZIP_BZIP2 = 12
+ZIP_LZMA = 14
+ZIP_ZSTANDARD = 93
+ZIP_VERSION = 20
+ZIP64_VERSION = 45
+ZIP64_LIMIT = 0xffffffff
+ZIP_MAX_ENTRIES = 0xffff
+UTF8_FLAG = 0x800
+
+# Version needed to extract each compression method
+METHOD_VERSIONS = {
+    ZIP_STORED: ZIP_VERSION,
+    ZIP_DEFLATED: ZIP_VERSION,
+    ZIP_BZIP2: 46,
+    ZIP_LZMA: 63,
+    ZIP_ZSTANDARD: 63
+}
+
+# General purpose flags telling how members were compressed
+DEFLATE_MAX_FLAG = 0x2
+DEFLATE_FAST_FLAG = 0x4
+LZMA_EOS_FLAG = 0x2
+
+# Compression method and level of each codec offered for backups. zipfile
+# cannot read zstd members, backupstore decompresses them itself.
+BACKUP_CODECS = {
+    'store': (ZIP_STORED, None),
+    'deflate_fast': (ZIP_DEFLATED, 1),
+    'deflate': (ZIP_DEFLATED, zlib.Z_DEFAULT_COMPRESSION),
+    'deflate_max': (ZIP_DEFLATED, 9),
+    'bzip2': (ZIP_BZIP2, 9),
+    'lzma': (ZIP_LZMA, None),
+    'zstd': (ZIP_ZSTANDARD, 3),
+    'adaptive': (ZIP_DEFLATED, zlib.Z_DEFAULT_COMPRESSION)
+}
+DEFAULT_CODEC = 'deflate'
+
+# With the adaptive codec, files with these extensions or smaller than
+# ADAPTIVE_MIN_SIZE are stored as is
+ADAPTIVE_STORED_EXTENSIONS = set(('.zip', '.gz', '.bz2', '.xz', '.7z',
+    '.rar', '.zst', '.png', '.jpg', '.jpeg', '.gif', '.ogg', '.mp3',
+    '.flac'))
+ADAPTIVE_MIN_SIZE = 128
+
+LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+CENTRAL_HEADER = struct.Struct('<4s6H3L5H2L')
+CENTRAL_HEADER_SIGNATURE = b'PK\x01\x02'
+EOCD = struct.Struct('<4s4H2LH')
+EOCD_SIGNATURE = b'PK\x05\x06'
+ZIP64_EOCD = struct.Struct('<4sQ2H2L4Q')
+ZIP64_EOCD_SIGNATURE = b'PK\x06\x06'
+ZIP64_EOCD_LOCATOR = struct.Struct('<4sLQL')
+ZIP64_EOCD_LOCATOR_SIGNATURE = b'PK\x06\x07'
+ZIP64_EXTRA_ID = 0x0001
+
+if sys.platform == 'win32':
+    CREATE_SYSTEM = 0
+else:
+    CREATE_SYSTEM = 3
+
+
+class CompressionCancelled(Exception): pass
+
+
+class CompressedEntry(object):
+    def __init__(self, arcname, mtime, mode):
+        self.arcname = arcname
+        self.mtime = mtime
+        self.mode = mode
+        self.method = ZIP_STORED
+        self.flags = 0
+        self.crc = 0
+        self.file_size = 0
+        self.compress_size = 0
+        self.header_offset = 0
+        self.spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+
+    def close(self):
+        self.spool.close()
+
+
+def available_codecs():
+    codecs = ['store', 'deflate_fast', 'deflate', 'deflate_max', 'bzip2',
+        'lzma']
+    if zstandard is not None:
+        codecs.append('zstd')
+    codecs.append('adaptive')
+    return codecs
+
+def codec_available(codec):
+    return codec in BACKUP_CODECS and (codec != 'zstd'
+        or zstandard is not None)
+
+
+class StoredCompressor(object):
+    def compress(self, data):
+        return data
+
+    def flush(self):
+        return b''
+
+
+def member_compressor(method, level):
+    # Returns the compressor and the general purpose flags of a member
+    if method == ZIP_STORED:
+        return StoredCompressor(), 0
+    elif method == ZIP_DEFLATED:
+        flags = 0
+        if level == 9:
+            flags = DEFLATE_MAX_FLAG
+        elif level in (1, 2):
+            flags = DEFLATE_FAST_FLAG
+        return zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS), flags
+    elif method == ZIP_BZIP2:
+        return bz2.BZ2Compressor(level), 0
+    elif method == ZIP_LZMA:
+        return zipfile.LZMACompressor(), LZMA_EOS_FLAG
+    elif method == ZIP_ZSTANDARD:
+        return zstandard.ZstdCompressor(level=level).compressobj(), 0
+    raise ValueError('Unsupported compression method {0}'.format(method))
+
+def compress_file(path, arcname, codec=DEFAULT_CODEC, stopped=None):
+    stat_result = os.stat(path)
+    entry = CompressedEntry(arcname, stat_result.st_mtime,
+        stat_result.st_mode)
+
+    method, level = BACKUP_CODECS[codec]
+    adaptive = codec == 'adaptive'
+    if adaptive and (stat_result.st_size < ADAPTIVE_MIN_SIZE
+        or os.path.splitext(path)[1].lower() in ADAPTIVE_STORED_EXTENSIONS):
+        method = ZIP_STORED
+
+    try:
+        write_member(entry, path, method, level, stopped)
+
+        # Keep the file as is when compressing it did not make it smaller
+        if (adaptive and method != ZIP_STORED
+            and entry.compress_size >= entry.file_size):
+            entry.spool.seek(0)
+            entry.spool.truncate()
+            write_member(entry, path, ZIP_STORED, None, stopped)
+    except:
+        entry.close()
+        raise
+
+    return entry
+
+def write_member(entry, path, method, level, stopped):
+    compressor, entry.flags = member_compressor(method, level)
+    entry.method = method
+    entry.crc = 0
+    entry.file_size = 0
+
+    with open(path, 'rb') as f:
+        while True:
+            if stopped is not None and stopped():
+                raise CompressionCancelled()
+
+            data = f.read(COMPRESS_BUFFER_SIZE)
+            if len(data) == 0:
+                break
+
+            entry.crc = zlib.crc32(data, entry.crc)
+            entry.file_size += len(data)
+            entry.spool.write(compressor.compress(data))
+    entry.spool.write(compressor.flush())
+    entry.compress_size = entry.spool.tell()
+
+def dos_date_time(mtime):
+    date_time = time.localtime(mtime)
+    if date_time.tm_year < 1980:
+        return (1 << 5) | 1, 0
+
+    dos_date = ((date_time.tm_year - 1980) << 9 | date_time.tm_mon << 5
+        | date_time.tm_mday)
+    dos_time = (date_time.tm_hour << 11 | date_time.tm_min << 5
+        | date_time.tm_sec // 2)
+    return dos_date, dos_time
+
+
+# Write zip archives from entries that were already compressed. Zip64
+# records are only added when the sizes, the offsets or the number of entries
+# need them.
+class ZipWriter(object):
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.entries = []
+
+    def encoded_name(self, arcname):
+        arcname = arcname.replace(os.sep, '/')
+        try:
+            return arcname.encode('ascii'), 0
+        except UnicodeEncodeError:
+            return arcname.encode('utf-8'), UTF8_FLAG
+
+    def write_entry(self, entry):
+        name, flags = self.encoded_name(entry.arcname)
+        flags |= entry.flags
+        dos_date, dos_time = dos_date_time(entry.mtime)
+        entry.header_offset = self.file.tell()
+
+        zip64 = (entry.file_size > ZIP64_LIMIT
+            or entry.compress_size > ZIP64_LIMIT)
+        if zip64:
+            extra = struct.pack('<2H2Q', ZIP64_EXTRA_ID, 16, entry.file_size,
+                entry.compress_size)
+            file_size = compress_size = ZIP64_LIMIT
+            version = max(ZIP64_VERSION, METHOD_VERSIONS[entry.method])
+        else:
+            extra = b''
+            file_size = entry.file_size
+            compress_size = entry.compress_size
+            version = METHOD_VERSIONS[entry.method]
+
+        self.file.write(LOCAL_HEADER.pack(LOCAL_HEADER_SIGNATURE, version,
+            flags, entry.method, dos_time, dos_date, entry.crc,
+            compress_size, file_size, len(name), len(extra)))
+        self.file.write(name)
+        self.file.write(extra)
+
+        entry.spool.seek(0)
+        while True:
+            data = entry.spool.read(COPY_BUFFER_SIZE)
+            if len(data) == 0:
+                break
+            self.file.write(data)
+
+        entry.close()
+        self.entries.append(entry)
+
+    def central_header(self, entry):
+        name, flags = self.encoded_name(entry.arcname)
+        flags |= entry.flags
+        dos_date, dos_time = dos_date_time(entry.mtime)
+
+        # Only the values that do not fit are stored in the zip64 extra
+        # field, in this order
+        zip64_values = []
+        file_size = entry.file_size
+        if file_size > ZIP64_LIMIT:
+            zip64_values.append(file_size)
+            file_size = ZIP64_LIMIT
+        compress_size = entry.compress_size
+        if compress_size > ZIP64_LIMIT:
+            zip64_values.append(compress_size)
+            compress_size = ZIP64_LIMIT
+        header_offset = entry.header_offset
+        if header_offset > ZIP64_LIMIT:
+            zip64_values.append(header_offset)
+            header_offset = ZIP64_LIMIT
+
+        if len(zip64_values) > 0:
+            extra = struct.pack('<2H{0}Q'.format(len(zip64_values)),
+                ZIP64_EXTRA_ID, 8 * len(zip64_values), *zip64_values)
+            version = max(ZIP64_VERSION, METHOD_VERSIONS[entry.method])
+        else:
+            extra = b''
+            version = METHOD_VERSIONS[entry.method]
+
+        external_attr = (entry.mode & 0xffff) << 16
+
+        return CENTRAL_HEADER.pack(CENTRAL_HEADER_SIGNATURE,
+            CREATE_SYSTEM << 8 | version, version, flags, entry.method,
+            dos_time, dos_date, entry.crc, compress_size, file_size,
+            len(name), len(extra), 0, 0, 0, external_attr, header_offset
+            ) + name + extra
+
+    def close(self):
+        cd_offset = self.file.tell()
+        for entry in self.entries:
+            self.file.write(self.central_header(entry))
+        cd_end = self.file.tell()
+        cd_size = cd_end - cd_offset
+        count = len(self.entries)
+
+        if (count >= ZIP_MAX_ENTRIES or cd_offset > ZIP64_LIMIT
+            or cd_size > ZIP64_LIMIT):
+            self.file.write(ZIP64_EOCD.pack(ZIP64_EOCD_SIGNATURE,
+                ZIP64_EOCD.size - 12, ZIP64_VERSION, ZIP64_VERSION, 0, 0,
+                count, count, cd_size, cd_offset))
+            self.file.write(ZIP64_EOCD_LOCATOR.pack(
+                ZIP64_EOCD_LOCATOR_SIGNATURE, 0, cd_end, 1))
+
+            count = min(count, ZIP_MAX_ENTRIES)
+            cd_size = min(cd_size, ZIP64_LIMIT)
+            cd_offset = min(cd_offset, ZIP64_LIMIT)
+
+        self.file.write(EOCD.pack(EOCD_SIGNATURE, 0, 0, count, count,
+            cd_size, cd_offset, 0))
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+
+# Compress files, a list of (path, arcname, size), into a new archive at
+# zip_path. progress(done, total, arcname) is called after each entry is
+# written and the archive is removed if it could not be completed. Returns
+# False when cancelled() became true before the end. codec is one of
+# BACKUP_CODECS.
+def compress_files(zip_path, files, progress=None, cancelled=None,
+    codec=DEFAULT_CODEC, workers=COMPRESS_WORKERS):
+    stop_event = threading.Event()
+
+    def stopped():
+        return stop_event.is_set() or (cancelled is not None and cancelled())
+
+    total_size = sum(size for path, arcname, size in files)
+    done_size = 0
+
+    writer = ZipWriter(zip_path)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+    remaining = iter(files)
+
+    def submit_next():
+        for path, arcname, size in remaining:
+            pending.append((executor.submit(compress_file, path, arcname,
+                codec, stopped), size))
+            return
+
+    try:
+        for i in range(workers * COMPRESS_QUEUE_DEPTH):
+            submit_next()
+
+        while len(pending) > 0:
+            if stopped():
+                raise CompressionCancelled()
+
+            future, size = pending.popleft()
+            entry = future.result()
+            submit_next()
+
+            writer.write_entry(entry)
+            done_size += size
+            if progress is not None:
+                progress(done_size, total_size, entry.arcname)
+
+        writer.close()
+    except BaseException as e:
+        stop_event.set()
+        for future, size in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+        for future, size in pending:
+            if (not future.cancelled() and future.exception() is None):
+                future.result().close()
+
+        writer.abort()
+        if os.path.isfile(zip_path):
+            os.remove(zip_path)
+
+        if isinstance(e, CompressionCancelled):
+            return False
+        raise
+
+    executor.shutdown(wait=True)
+    return True